@@ -1,51 +1,56 @@
 from rich.console import Console
-from rich.prompt import IntPrompt, Prompt, Confirm
+from rich.prompt import Prompt, Confirm
 from rich.table import Table
-from sqlalchemy import select, func, exc
 from sqlalchemy.orm import Session
+
+import banco
+import paginacao
+import servico
 from models import Categoria
 
+# Quantos nomes de produtos a confirmação da remoção de uma categoria mostra
+QTD_NOMES_REMOCAO = 10
+
 
-def lista_categorias(engine: Session, console: Console):
-    tabela = Table(title="Lista de categorias cadastradas")
+def _tabela_categorias(titulo: str, caption: str = None, com_id: bool = False):
+    if caption is None:
+        tabela = Table(title=titulo)
+    else:
+        tabela = Table(title=titulo, caption=caption)
+    if com_id:
+        tabela.add_column("Id", justify="right", no_wrap=True)
     tabela.add_column("Nome", justify="left", no_wrap=True)
     tabela.add_column("Cadastro", justify="left", no_wrap=True)
     tabela.add_column("Atualizado", justify="left", no_wrap=True)
     tabela.add_column("# produtos", justify="right", no_wrap=True)
+    return tabela
+
 
-    with Session(engine) as sessao:
-        categorias = sessao.scalars(select(Categoria).order_by(Categoria.nome))
-        for categoria in categorias.yield_per(100):
-            tabela.add_row(categoria.nome, f"{categoria.dta_cadastro.strftime('%Y-%m-%d')}",
-                           f"{categoria.dta_atualizacao.strftime('%Y-%m-%d %H:%M')}",
-                           f"{len(categoria.lista_de_produtos):4d}")
-    console.print(tabela)
+def _adiciona_categoria_tabela(tabela: Table, item: int, categoria):
+    tabela.add_row(categoria.nome, f"{categoria.dta_cadastro.strftime('%Y-%m-%d')}",
+                   f"{categoria.dta_atualizacao.strftime('%Y-%m-%d %H:%M')}",
+                   f"{categoria.qtd_produtos:4d}")
+
+
+def lista_categorias(engine: Session, console: Console, tamanho_pagina: int = None):
+    paginacao.navega(engine, console, servico.pagina_categorias(engine.dialect), Categoria.nome, Categoria.id,
+                     lambda pagina: _tabela_categorias(f"Lista de categorias cadastradas (página {pagina})"),
+                     _adiciona_categoria_tabela, tamanho_pagina)
 
 
 def adiciona_categoria(engine: Session, console: Console):
     nome = Prompt.ask("Digite o nome da nova categoria")
-    with Session(engine) as sessao:
-        query = select(func.count()).where(func.lower(Categoria.nome).like(f"%{nome}%"))
-        count = sessao.execute(query).scalar()
-        if count > 0:
-            query = select(Categoria).where(func.lower(Categoria.nome).like(f"%{nome}%")).order_by(Categoria.nome)
-            categorias = sessao.scalars(query)
-            tabela = Table(title="Lista de categorias similares já cadastradas")
-            tabela.add_column("Nome", justify="left", no_wrap=True)
-            tabela.add_column("Cadastro", justify="left", no_wrap=True)
-            tabela.add_column("Atualizado", justify="left", no_wrap=True)
-            tabela.add_column("# produtos", justify="right", no_wrap=True)
-            for categoria in categorias.yield_per(100):
-                tabela.add_row(categoria.nome, f"{categoria.dta_cadastro.strftime('%Y-%m-%d')}",
-                               f"{categoria.dta_atualizacao.strftime('%Y-%m-%d %H:%M')}",
-                               f"{len(categoria.lista_de_produtos):4d}")
-            console.print(tabela)
+    with banco.nova_sessao(engine) as sessao:
+        count = servico.conta_categorias(sessao, nome)
+    if count > 0:
+        paginacao.navega(engine, console, servico.pagina_categorias(engine.dialect, nome), Categoria.nome, Categoria.id,
+                         lambda pagina: _tabela_categorias(f"Lista de categorias similares já cadastradas "
+                                                           f"(página {pagina})"),
+                         _adiciona_categoria_tabela)
 
     if Confirm.ask(f"Confirma o cadastramento da categoria '{nome}'"):
-        with Session(engine) as sessao:
-            cat = Categoria(nome=nome)
-            sessao.add(cat)
-            sessao.commit()
+        with banco.unidade_de_trabalho(engine) as sessao:
+            servico.adiciona_categoria(sessao, nome)
 
 
 def altera_categoria(engine: Session, console: Console):
@@ -59,72 +64,50 @@ def remove_categoria(engine: Session, console: Console):
     if cat_id is None:
         return
 
-    with Session(engine) as sessao:
-        try:
-            categoria = sessao.get_one(Categoria, cat_id)
-        except exc.NoResultFound:
-            print("Categoria inexistente")
-        else:
-            mensagem = f"Confirma a remoção da categoria {categoria.nome}"
-            if len(categoria.lista_de_produtos) > 0:
-                tabela = Table(title="Produtos que serão removidos junto com a categoria")
-                tabela.add_column("Nome", justify="left", no_wrap=True)
-                tabela.add_column("Preço", justify="right", no_wrap=True)
-                tabela.add_column("Estoque", justify="right", no_wrap=True)
-                tabela.add_column("Cadastro", justify="left", no_wrap=True)
-                tabela.add_column("Atualizado", justify="left", no_wrap=True)
-                for produto in categoria.lista_de_produtos:
-                    tabela.add_row(produto.nome, f"R$ {produto.preco:.2f}", f"{produto.estoque:4d}",
-                                   f"{produto.dta_cadastro.strftime('%Y-%m-%d')}",
-                                   f"{produto.dta_atualizacao.strftime('%Y-%m-%d %H:%M')}")
-                console.print(tabela)
-                mensagem = mensagem + f" e todos os {len(categoria.lista_de_produtos)} produtos relacionados?"
-            else:
-                mensagem = mensagem + "?"
-            if Confirm.ask(mensagem):
-                sessao.delete(categoria)
-                sessao.commit()
-                print("Feito!")
-            else:
-                print("Remoção interrompida")
+    # A confirmação é pedida sem transação aberta; só a remoção abre a unidade de trabalho
+    with banco.nova_sessao(engine) as sessao:
+        resumo = servico.resumo_remocao(sessao, cat_id, QTD_NOMES_REMOCAO)
+    if resumo is None:
+        print("Categoria inexistente")
+        return
+    acao = "o arquivamento" if servico.ARQUIVA_REMOVIDOS else "a remoção"
+    mensagem = f"Confirma {acao} da categoria {resumo['nome']}"
+    if resumo["produtos"] > 0:
+        tabela = Table(title="Produtos que serão removidos",
+                       caption=f"{resumo['produtos']} produtos, R$ {resumo['valor_estoque']:.2f} em estoque")
+        tabela.add_column("Nome", justify="left", no_wrap=True)
+        for nome in resumo["primeiros"]:
+            tabela.add_row(nome)
+        if resumo["produtos"] > len(resumo["primeiros"]):
+            tabela.add_row(f"... e mais {resumo['produtos'] - len(resumo['primeiros'])} produtos")
+        console.print(tabela)
+        mensagem = mensagem + f" e todos os {resumo['produtos']} produtos relacionados?"
+    else:
+        mensagem = mensagem + "?"
+    if not Confirm.ask(mensagem):
+        print("Remoção interrompida")
+        return
+    with banco.unidade_de_trabalho(engine) as sessao:
+        removida = servico.remove_categoria(sessao, cat_id)
+    print("Feito!" if removida else "Categoria inexistente")
 
 
 def seleciona_categoria_id(engine: Session, console: Console, titulo: str = "Selecione uma categorias",
-                           msg_cancelar: str = "Interromper a seleção", msg_prompt: str = "Selecione uma categoria"):
+                           msg_cancelar: str = "Interromper a seleção", msg_prompt: str = "Selecione uma categoria",
+                           tamanho_pagina: int = None):
 
     caption = []
     nomeparcial = Prompt.ask("Digite o nome parcial da categoria (enter para todas)", default="", show_default=True)
     if nomeparcial != "":
         caption.append(f"Apenas categorias contendo '{nomeparcial}'")
 
-    if len(caption) == 0:
-        tabela = Table(title=titulo)
-    else:
-        tabela = Table(title=titulo, caption=". ".join(caption))
-
-    tabela.add_column("Id", justify="right", no_wrap=True)
-    tabela.add_column("Nome", justify="left", no_wrap=True)
-    tabela.add_column("Cadastro", justify="left", no_wrap=True)
-    tabela.add_column("Atualizado", justify="left", no_wrap=True)
-    tabela.add_column("# produtos", justify="right", no_wrap=True)
+    def adiciona_linha(tabela: Table, item: int, categoria):
+        tabela.add_row(str(item), categoria.nome, f"{categoria.dta_cadastro.strftime('%Y-%m-%d')}",
+                       f"{categoria.dta_atualizacao.strftime('%Y-%m-%d %H:%M')}",
+                       f"{categoria.qtd_produtos:4d}")
 
-    item = 1
-    with Session(engine) as sessao:
-        id_uuid = dict()
-        categorias = sessao.scalars(select(Categoria).where(func.lower(Categoria.nome).like(f"%{nomeparcial}%")).order_by(Categoria.nome))
-        for categoria in categorias.yield_per(100):
-            id_uuid[str(item)] = categoria.id
-            tabela.add_row(str(item), categoria.nome, f"{categoria.dta_cadastro.strftime('%Y-%m-%d')}",
-                           f"{categoria.dta_atualizacao.strftime('%Y-%m-%d %H:%M')}",
-                           f"{len(categoria.lista_de_produtos):4d}")
-            item = item + 1
-    item = item - 1
-    tabela.add_row(str(0), msg_cancelar, "", "", "")
-    console.print(tabela)
-    escolha = IntPrompt.ask(msg_prompt, default=0, show_default=True)
-    if escolha > item:
-        console.print(f"[bold red]{escolha} não é uma opção válida")
-        return None
-    if escolha == 0:
-        return None
-    return id_uuid[str(escolha)]
+    pagina = servico.pagina_categorias(engine.dialect, nomeparcial)
+    return paginacao.navega(engine, console, pagina, Categoria.nome, Categoria.id,
+                            lambda pagina: _tabela_categorias(f"{titulo} (página {pagina})",
+                                                              ". ".join(caption) if caption else None, com_id=True),
+                            adiciona_linha, tamanho_pagina, msg_cancelar=msg_cancelar, msg_prompt=msg_prompt)
@@ -0,0 +1,75 @@
+from rich.console import Console
+from rich.prompt import Prompt, IntPrompt, Confirm
+from rich.table import Table
+from sqlalchemy.orm import Session
+
+import cache
+import diagnostico
+
+
+def resumo_acao(console: Console, medicao: diagnostico.Medicao):
+    console.print(f"[dim]{medicao.comandos} comandos SQL, {medicao.tempo_banco_ms:.1f} ms no banco, "
+                  f"{medicao.duracao_ms:.0f} ms no total")
+    for alerta in medicao.alertas:
+        console.print(f"[bold yellow]Possível N+1: o mesmo comando rodou {alerta['execucoes']} vezes nesta ação: "
+                      f"{alerta['sql'][:200]}")
+
+
+def _detalha(console: Console, medicao: diagnostico.Medicao):
+    tabela = Table(title=f"Comandos mais lentos de '{medicao.nome}'")
+    tabela.add_column("ms", justify="right", no_wrap=True)
+    tabela.add_column("SQL", justify="left")
+    tabela.add_column("Parâmetros", justify="left")
+    for comando in medicao.lentos:
+        tabela.add_row(f"{comando['duracao_ms']:.2f}", comando["sql"], str(comando["parametros"]))
+    console.print(tabela)
+
+    tabela = Table(title="Comandos mais frequentes")
+    tabela.add_column("Vezes", justify="right", no_wrap=True)
+    tabela.add_column("SQL", justify="left")
+    for texto, vezes in medicao.formas.most_common(5):
+        tabela.add_row(str(vezes), texto)
+    console.print(tabela)
+
+    if medicao.perfil:
+        console.print(medicao.perfil, markup=False, highlight=False)
+
+
+def mostra_diagnostico(engine: Session, console: Console):
+    medicoes = list(diagnostico.historico)
+    tabela = Table(title="Últimas ações medidas",
+                   caption=f"Alerta de N+1 acima de {diagnostico.config['limite_n_mais_1']} execuções")
+    tabela.add_column("Id", justify="right", no_wrap=True)
+    tabela.add_column("Ação", justify="left")
+    tabela.add_column("Início", justify="left", no_wrap=True)
+    tabela.add_column("Total (ms)", justify="right", no_wrap=True)
+    tabela.add_column("# SQL", justify="right", no_wrap=True)
+    tabela.add_column("Banco (ms)", justify="right", no_wrap=True)
+    tabela.add_column("Linhas", justify="right", no_wrap=True)
+    tabela.add_column("Identity map", justify="right", no_wrap=True)
+    tabela.add_column("N+1?", justify="center", no_wrap=True)
+    for item, medicao in enumerate(medicoes, start=1):
+        tabela.add_row(str(item), medicao.nome, medicao.inicio.strftime("%H:%M:%S"), f"{medicao.duracao_ms:.0f}",
+                       str(medicao.comandos), f"{medicao.tempo_banco_ms:.1f}", str(medicao.linhas_carregadas),
+                       str(medicao.objetos_identidade), "S" if medicao.alertas else "N")
+    console.print(tabela)
+
+    produtos, categorias = cache.produtos.estatisticas(), cache.categorias.estatisticas()
+    console.print(f"Cache: produtos {produtos['taxa_acerto']:.0%} de acerto ({produtos['entradas']} entradas), "
+                  f"categorias {categorias['taxa_acerto']:.0%} ({categorias['entradas']} entradas)")
+    console.print(f"Diagnóstico {'ligado' if diagnostico.config['ativo'] else 'desligado'}, "
+                  f"cProfile {'ligado' if diagnostico.config['perfil'] else 'desligado'}")
+
+    if medicoes:
+        item = IntPrompt.ask("Id da ação para ver os detalhes (0 para nenhuma)", default=0)
+        if 0 < item <= len(medicoes):
+            _detalha(console, medicoes[item - 1])
+        elif item != 0:
+            console.print(f"[bold red]{item} não é uma ação válida")
+        if Confirm.ask("Exportar as medições em JSON?", default=False):
+            arquivo = Prompt.ask("Nome do arquivo", default="diagnostico.json")
+            diagnostico.exporta(arquivo)
+            print(f"Medições gravadas em {arquivo}")
+    if Confirm.ask(f"{'Desligar' if diagnostico.config['perfil'] else 'Ligar'} o cProfile nas próximas ações?",
+                   default=False):
+        diagnostico.config["perfil"] = not diagnostico.config["perfil"]
@@ -0,0 +1,81 @@
+from rich.console import Console
+from rich.prompt import Confirm
+from rich.table import Table
+from sqlalchemy.orm import Session
+
+import banco
+import estoque
+import paginacao
+import resumo
+from models import Categoria
+
+
+def painel_estoque(engine: Session, console: Console, tamanho_pagina: int = None):
+    with banco.nova_sessao(engine) as sessao:
+        totais = resumo.totais_gerais(sessao)
+    caption = (f"Total: {totais.produtos_ativos} produtos ativos em {totais.categorias} categorias, "
+               f"{totais.unidades} unidades, R$ {resumo.valor(totais.valor_centavos):.2f} em estoque, "
+               f"{totais.sem_estoque} produtos sem estoque")
+
+    def cria_tabela(pagina: int):
+        tabela = Table(title=f"Estoque por categoria (página {pagina})", caption=caption)
+        tabela.add_column("Categoria", justify="left", no_wrap=True)
+        tabela.add_column("# ativos", justify="right", no_wrap=True)
+        tabela.add_column("Unidades", justify="right", no_wrap=True)
+        tabela.add_column("Valor", justify="right", no_wrap=True)
+        tabela.add_column("Sem estoque", justify="right", no_wrap=True)
+        return tabela
+
+    def adiciona_linha(tabela: Table, item: int, linha):
+        sem_estoque = f"{linha.sem_estoque:4d}"
+        if linha.sem_estoque > 0:
+            sem_estoque = f"[bold red]{sem_estoque}"
+        tabela.add_row(linha.nome, f"{linha.produtos_ativos:4d}", f"{linha.unidades:6d}",
+                       f"R$ {resumo.valor(linha.valor_centavos):.2f}", sem_estoque)
+
+    paginacao.navega(engine, console, resumo.pagina_painel(engine.dialect), Categoria.nome, Categoria.id,
+                     cria_tabela, adiciona_linha, tamanho_pagina)
+
+
+def verifica_resumo_estoque(engine: Session, console: Console):
+    if not resumo.suporta_triggers(engine.dialect):
+        print("Neste banco o resumo é calculado a cada consulta; não há o que verificar")
+        return
+    with banco.nova_sessao(engine) as sessao:
+        divergencias = resumo.verifica(sessao)
+    if not divergencias:
+        print("O resumo do estoque confere com os produtos")
+        return
+
+    tabela = Table(title="Categorias com o resumo divergente")
+    tabela.add_column("Categoria", justify="left", no_wrap=True)
+    tabela.add_column("Campo", justify="left", no_wrap=True)
+    tabela.add_column("Resumo", justify="right", no_wrap=True)
+    tabela.add_column("Recalculado", justify="right", no_wrap=True)
+    for _, nome, campos in divergencias:
+        for campo, (no_resumo, recalculado) in campos.items():
+            tabela.add_row(nome, campo, str(no_resumo), str(recalculado))
+    console.print(tabela)
+    if Confirm.ask("Recalcular o resumo a partir dos produtos?"):
+        with banco.unidade_de_trabalho(engine) as sessao:
+            resumo.recalcula(sessao)
+        print("Feito!")
+
+
+def audita_estoque(engine: Session, console: Console):
+    with banco.nova_sessao(engine) as sessao:
+        divergentes = estoque.audita_estoque(sessao)
+    if not divergentes:
+        print("O estoque de todos os produtos confere com as movimentações registradas")
+        return
+
+    tabela = Table(title="Produtos com o estoque divergente das movimentações",
+                   caption=f"{len(divergentes)} produtos divergentes")
+    tabela.add_column("Nome", justify="left", no_wrap=True)
+    tabela.add_column("Estoque", justify="right", no_wrap=True)
+    tabela.add_column("Movimentações", justify="right", no_wrap=True)
+    tabela.add_column("Diferença", justify="right", no_wrap=True)
+    for linha in divergentes:
+        tabela.add_row(linha.nome, f"{linha.estoque:6d}", f"{linha.estoque_movimentos:6d}",
+                       f"{linha.estoque - linha.estoque_movimentos:+6d}")
+    console.print(tabela)
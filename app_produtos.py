@@ -1,55 +1,64 @@
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 
 from rich.console import Console
+from rich.progress import Progress
 from rich.prompt import Prompt, IntPrompt, FloatPrompt, Confirm
 from rich.table import Table
-from sqlalchemy import select, func, exc, update
 from sqlalchemy.orm import Session
 
 import app_categorias
-from models import Produto, Categoria
-
-
-def lista_produtos(engine: Session, console: Console, msg_titulo: str = "Lista de produtos cadastrados"):
-    tabela = Table(title=msg_titulo, caption="(*) Produtos com estoque negativo")
-    tabela.add_column("Nome", justify="left")
-    tabela.add_column("Ativo?", justify="center")
-    tabela.add_column("Preço", justify="right")
-    tabela.add_column("Estoque", justify="right")
-    tabela.add_column("Cadastro", justify="left")
-    tabela.add_column("Atualizado", justify="left")
-    tabela.add_column("Categoria", justify="left")
-
-    with Session(engine) as sessao:
-        produtos = sessao.scalars(select(Produto).order_by(Produto.nome))
-        for produto in produtos.yield_per(100):
-            nome = produto.nome
-            if produto.estoque < 0:
-                nome = nome + " (*)"
-            tabela.add_row(nome, "S" if produto.ativo else "N", f"R$ {produto.preco:.2f}", f"{produto.estoque:4d}",
-                           f"{produto.dta_cadastro.strftime('%Y-%m-%d')}",
-                           f"{produto.dta_atualizacao.strftime('%Y-%m-%d %H:%M')}", f"{produto.categoria.nome}")
-    console.print(tabela)
-
+import banco
+import paginacao
+import repreco
+import servico
+from models import Produto
+
+
+def lista_produtos(engine: Session, console: Console, msg_titulo: str = "Lista de produtos cadastrados",
+                   tamanho_pagina: int = None):
+    def cria_tabela(pagina: int):
+        tabela = Table(title=f"{msg_titulo} (página {pagina})", caption="(*) Produtos com estoque negativo")
+        tabela.add_column("Nome", justify="left")
+        tabela.add_column("Ativo?", justify="center")
+        tabela.add_column("Preço", justify="right")
+        tabela.add_column("Estoque", justify="right")
+        tabela.add_column("Cadastro", justify="left")
+        tabela.add_column("Atualizado", justify="left")
+        tabela.add_column("Categoria", justify="left")
+        return tabela
+
+    def adiciona_linha(tabela: Table, item: int, produto):
+        nome = produto.nome
+        if produto.estoque < 0:
+            nome = nome + " (*)"
+        tabela.add_row(nome, "S" if produto.ativo else "N", f"R$ {produto.preco:.2f}", f"{produto.estoque:4d}",
+                       f"{produto.dta_cadastro.strftime('%Y-%m-%d')}",
+                       f"{produto.dta_atualizacao.strftime('%Y-%m-%d %H:%M')}", f"{produto.categoria}")
+
+    paginacao.navega(engine, console, servico.pagina_produtos(engine.dialect), Produto.nome, Produto.id, cria_tabela,
+                     adiciona_linha, tamanho_pagina)
+
+
+def lista_produtos_sem_estoque(engine: Session, console: Console, tamanho_pagina: int = None):
+    def cria_tabela(pagina: int):
+        tabela = Table(title=f"Lista de produtos ativos sem estoque (página {pagina})",
+                       caption="(*) Produtos com estoque negativo")
+        tabela.add_column("Nome", justify="left")
+        tabela.add_column("Preço", justify="right")
+        tabela.add_column("Cadastro", justify="right")
+        tabela.add_column("Atualizado", justify="right")
+        tabela.add_column("Categoria", justify="left")
+        return tabela
+
+    def adiciona_linha(tabela: Table, item: int, produto):
+        nome = produto.nome
+        if produto.estoque < 0:
+            nome = nome + " (*)"
+        tabela.add_row(nome, f"R$ {produto.preco:.2f}", f"{produto.dta_cadastro.strftime('%Y-%m-%d')}",
+                       f"{produto.dta_atualizacao.strftime('%Y-%m-%d %H:%M')}", f"{produto.categoria}")
 
-def lista_produtos_sem_estoque(engine: Session, console: Console):
-    tabela = Table(title="Lista de produtos ativos sem estoque", caption="(*) Produtos com estoque negativo")
-    tabela.add_column("Nome", justify="left")
-    tabela.add_column("Preço", justify="right")
-    tabela.add_column("Cadastro", justify="right")
-    tabela.add_column("Atualizado", justify="right")
-    tabela.add_column("Categoria", justify="left")
-
-    with Session(engine) as sessao:
-        produtos = sessao.scalars(
-            select(Produto).where(Produto.estoque <= 0).where(Produto.ativo).order_by(Produto.nome))
-        for produto in produtos.yield_per(100):
-            nome = produto.nome
-            if produto.estoque < 0:
-                nome = nome + " (*)"
-            tabela.add_row(nome, f"R$ {produto.preco:.2f}", f"{produto.dta_cadastro.strftime('%Y-%m-%d')}",
-                           f"{produto.dta_atualizacao.strftime('%Y-%m-%d %H:%M')}", f"{produto.categoria.nome}")
-    console.print(tabela)
+    pagina = servico.pagina_produtos(engine.dialect, sem_estoque=True)
+    paginacao.navega(engine, console, pagina, Produto.nome, Produto.id, cria_tabela, adiciona_linha, tamanho_pagina)
 
 
 def adiciona_produto(engine: Session, console: Console):
@@ -58,16 +67,12 @@ def adiciona_produto(engine: Session, console: Console):
                                                    msg_prompt="Em qual categoria o produto será adicionado?")
     if cat_id is None:
         return
-    produto = Produto()
-    produto.nome = Prompt.ask("Qual o nome do produto?")
-    produto.estoque = IntPrompt.ask("Qual o estoque inicial do produto?", default=0, show_default=True)
-    produto.preco = Decimal(FloatPrompt.ask("Qual o preço inicial do produto?", default=0.00, show_default=True))
-    if Confirm.ask(f"Confirma o cadastramento do produto '{produto.nome}'?"):
-        with Session(engine) as sessao:
-            categoria = sessao.get(Categoria, cat_id)
-            sessao.add(produto)
-            categoria.lista_de_produtos.append(produto)
-            sessao.commit()
+    nome = Prompt.ask("Qual o nome do produto?")
+    qtd_estoque = IntPrompt.ask("Qual o estoque inicial do produto?", default=0, show_default=True)
+    preco = Decimal(FloatPrompt.ask("Qual o preço inicial do produto?", default=0.00, show_default=True))
+    if Confirm.ask(f"Confirma o cadastramento do produto '{nome}'?"):
+        with banco.unidade_de_trabalho(engine) as sessao:
+            servico.adiciona_produto(sessao, cat_id, nome, preco, qtd_estoque)
 
 
 def altera_produto(engine: Session, console: Console):
@@ -79,90 +84,119 @@ def altera_produto(engine: Session, console: Console):
     pass
 
 
+def _le_produto(engine, id_produto):
+    # (ficha, saldo) do produto, ou (None, None) se ele não existe. A leitura é feita numa
+    # sessão curta: as perguntas ao usuário vêm depois, sem nenhuma transação aberta, e só a
+    # gravação abre uma unidade de trabalho (uma transação pendente travaria as vendas dos
+    # outros terminais enquanto o usuário responde).
+    with banco.nova_sessao(engine) as sessao:
+        produto = servico.obtem_produto(sessao, id_produto)
+        saldo = servico.obtem_saldo(sessao, id_produto)
+    if produto is None or saldo is None:
+        return None, None
+    return produto, saldo
+
+
 def remove_produto(engine: Session, console: Console):
     id_produto = selecionar_produto_id(engine, console, titulo="Escolha um produto para ser alterado",
                                        apenas_ativos=False)
+    if id_produto is None:
+        return
 
-    with Session(engine) as sessao:
-        sessao.expire_on_commit = False
-        try:
-            produto = sessao.get_one(Produto, id_produto)
-        except exc.NoResultFound:
-            print("Produto inexistente")
-        else:
-            if Confirm.ask(f"Confirma a remoção do produto {produto.nome}?"):
-                sessao.delete(produto)
-                sessao.commit()
-                print("Feito!")
-            else:
-                print("Remoção interrompida")
+    with banco.nova_sessao(engine) as sessao:
+        produto = servico.obtem_produto(sessao, id_produto)
+    if produto is None:
+        print("Produto inexistente")
+        return
+    if not Confirm.ask(f"Confirma a remoção do produto {produto.nome}?"):
+        print("Remoção interrompida")
+        return
+    with banco.unidade_de_trabalho(engine) as sessao:
+        removido = servico.remove_produto(sessao, id_produto)
+    print("Feito!" if removido else "Produto inexistente")
 
 
 def compra_produto(engine: Session, console: Console):
     id_produto = selecionar_produto_id(engine, console, titulo="Escolha um produto para comprar", apenas_ativos=True)
+    if id_produto is None:
+        return
 
-    with Session(engine) as sessao:
-        produto = sessao.get_one(Produto, id_produto)
-        nome = produto.nome
-        qtd_atual = produto.estoque
+    produto, saldo = _le_produto(engine, id_produto)
+    if produto is None:
+        print("Produto inexistente")
+        return
+    nome = produto.nome
 
-    adicionar = IntPrompt.ask(f"Adicionar quantas unidades às {qtd_atual} já existentes?")
+    adicionar = IntPrompt.ask(f"Adicionar quantas unidades às {saldo.estoque} já existentes?")
     if adicionar < 0:
         print("Compra cancelada")
         return
-    qtd_nova = qtd_atual + adicionar
-    with Session(engine) as sessao:
-        produto = sessao.get_one(Produto, id_produto)
-        produto.estoque = qtd_nova
-        sessao.commit()
-        print(f"{nome} agora com {qtd_nova} unidades")
+    with banco.unidade_de_trabalho(engine) as sessao:
+        qtd_nova = servico.compra(sessao, id_produto, adicionar)
+    if qtd_nova is None:
+        print("Produto inexistente")
+        return
+    print(f"{nome} agora com {qtd_nova} unidades")
 
 
 def vende_produto(engine: Session, console: Console):
     id_produto = selecionar_produto_id(engine, console, titulo="Escolha um produto para vender", apenas_ativos=True)
+    if id_produto is None:
+        return
 
-    with Session(engine) as sessao:
-        produto = sessao.get_one(Produto, id_produto)
-        nome = produto.nome
-        qtd_atual = produto.estoque
+    produto, saldo = _le_produto(engine, id_produto)
+    if produto is None:
+        print("Produto inexistente")
+        return
+    nome = produto.nome
+    qtd_atual = saldo.estoque
 
     reduzir = IntPrompt.ask(f"Vender quantas unidades das {qtd_atual} existentes?")
     if reduzir < 0:
         print("Venda interrompida")
         return
-    qtd_nova = qtd_atual - reduzir
-    if qtd_nova < 0 and not Confirm.ask(f"Produto ficará com estoque negativo de {qtd_nova * -1} unidades. Confirma?"):
+    qtd_prevista = qtd_atual - reduzir
+    if qtd_prevista < 0 and not Confirm.ask(f"Produto ficará com estoque negativo de {qtd_prevista * -1} "
+                                            f"unidades. Confirma?"):
         print("Venda interrompida")
         return
-    with Session(engine) as sessao:
-        produto = sessao.get_one(Produto, id_produto)
-        produto.estoque = qtd_nova
-        sessao.commit()
-        print(f"{nome} agora com {qtd_nova} unidades")
+    # A baixa é feita pelo banco sobre o estoque do momento da gravação, e não sobre o
+    # valor lido antes da pergunta, para não perder vendas feitas em outros terminais
+    with banco.unidade_de_trabalho(engine) as sessao:
+        qtd_nova = servico.vende(sessao, id_produto, reduzir)
+    if qtd_nova is None:
+        print("Produto inexistente")
+        return
+    print(f"{nome} agora com {qtd_nova} unidades")
 
 
 def mudar_estado_produto(engine: Session, console: Console):
     id_produto = selecionar_produto_id(engine, console, titulo="Escolha um produto para alterar", apenas_ativos=False)
+    if id_produto is None:
+        return
 
-    with Session(engine) as sessao:
-        produto = sessao.get_one(Produto, id_produto)
-        nome = produto.nome
-        ativo = produto.ativo
-
-    atual = "ativo" if ativo else "inativo"
-    novo = "inativo" if ativo else "ativo"
-
-    if Confirm.ask(f"Alterar o estado do produto '{nome}' de {atual} para {novo}?", default=False, show_default=True):
-        with Session(engine) as sessao:
-            produto = sessao.get_one(Produto, id_produto)
-            produto.ativo = not produto.ativo
-            sessao.commit()
-            print(f"O produto '{nome}' agora está {novo}")
+    with banco.nova_sessao(engine) as sessao:
+        produto = servico.obtem_produto(sessao, id_produto)
+    if produto is None:
+        print("Produto inexistente")
+        return
+    nome = produto.nome
+    atual = "ativo" if produto.ativo else "inativo"
+    novo = "inativo" if produto.ativo else "ativo"
+
+    if Confirm.ask(f"Alterar o estado do produto '{nome}' de {atual} para {novo}?", default=False,
+                   show_default=True):
+        with banco.unidade_de_trabalho(engine) as sessao:
+            ativo = servico.alterna_estado(sessao, id_produto)
+        if ativo is None:
+            print("Produto inexistente")
+            return
+        print(f"O produto '{nome}' agora está {'ativo' if ativo else 'inativo'}")
 
 
 def selecionar_produto_id(engine: Session, console: Console, titulo: str = "Selecione um produto",
                           msg_cancelar: str = "Interromper a seleção", msg_prompt: str = "Selecione um produto",
-                          apenas_ativos: bool = False):
+                          apenas_ativos: bool = False, tamanho_pagina: int = None):
     caption = []
     nomeparcial = Prompt.ask("Digite o nome parcial do produto (enter para todos)", default="", show_default=True)
     if nomeparcial != "":
@@ -170,85 +204,161 @@ def selecionar_produto_id(engine: Session, console: Console, titulo: str = "Sele
     if apenas_ativos:
         caption.append("Apenas produtos ativos")
 
-    if len(caption) == 0:
-        tabela = Table(title=titulo)
-    else:
-        tabela = Table(title=titulo, caption=". ".join(caption))
+    def cria_tabela(pagina: int):
+        if len(caption) == 0:
+            tabela = Table(title=f"{titulo} (página {pagina})")
+        else:
+            tabela = Table(title=f"{titulo} (página {pagina})", caption=". ".join(caption))
+
+        tabela.add_column("Id", justify="right")
+        tabela.add_column("Nome", justify="left")
+        if not apenas_ativos:
+            tabela.add_column("Ativo?", justify="center")
+        tabela.add_column("Preço", justify="right")
+        tabela.add_column("Estoque", justify="right")
+        tabela.add_column("Cadastro", justify="left")
+        tabela.add_column("Atualizado", justify="left")
+        tabela.add_column("Categoria", justify="left")
+        return tabela
+
+    def adiciona_linha(tabela: Table, item: int, produto):
+        nome = produto.nome
+        if produto.estoque < 0:
+            nome = nome + " (*)"
+        if not apenas_ativos:
+            tabela.add_row(str(item), nome, "S" if produto.ativo else "N", f"R$ {produto.preco:.2f}",
+                           f"{produto.estoque:4d}", f"{produto.dta_cadastro.strftime('%Y-%m-%d')}",
+                           f"{produto.dta_atualizacao.strftime('%Y-%m-%d %H:%M')}", f"{produto.categoria}")
+        else:
+            tabela.add_row(str(item), nome, f"R$ {produto.preco:.2f}", f"{produto.estoque:4d}",
+                           f"{produto.dta_cadastro.strftime('%Y-%m-%d')}",
+                           f"{produto.dta_atualizacao.strftime('%Y-%m-%d %H:%M')}", f"{produto.categoria}")
 
-    tabela.add_column("Id", justify="right")
-    tabela.add_column("Nome", justify="left")
-    if not apenas_ativos:
-        tabela.add_column("Ativo?", justify="center")
-    tabela.add_column("Preço", justify="right")
-    tabela.add_column("Estoque", justify="right")
-    tabela.add_column("Cadastro", justify="left")
-    tabela.add_column("Atualizado", justify="left")
-    tabela.add_column("Categoria", justify="left")
-
-    item = 1
-    with Session(engine) as sessao:
-        id_uuid = dict()
-        query = select(Produto).where(func.lower(Produto.nome).like(f"%{nomeparcial}%"))
-        if apenas_ativos:
-            query = query.where(Produto.ativo)
-        query = query.order_by(Produto.nome)
-        produtos = sessao.scalars(query)
-        for produto in produtos.yield_per(100):
-            id_uuid[str(item)] = produto.id
-            nome = produto.nome
-            if produto.estoque < 0:
-                nome = nome + " (*)"
-            if not apenas_ativos:
-                tabela.add_row(str(item), nome, "S" if produto.ativo else "N", f"R$ {produto.preco:.2f}",
-                               f"{produto.estoque:4d}", f"{produto.dta_cadastro.strftime('%Y-%m-%d')}",
-                               f"{produto.dta_atualizacao.strftime('%Y-%m-%d %H:%M')}", f"{produto.categoria.nome}")
-            else:
-                tabela.add_row(str(item), nome, f"R$ {produto.preco:.2f}", f"{produto.estoque:4d}",
-                               f"{produto.dta_cadastro.strftime('%Y-%m-%d')}",
-                               f"{produto.dta_atualizacao.strftime('%Y-%m-%d %H:%M')}", f"{produto.categoria.nome}")
-
-            item = item + 1
-    item = item - 1
-    tabela.add_row(str(0), msg_cancelar, "", "", "")
-    console.print(tabela)
-    escolha = IntPrompt.ask(msg_prompt, default=0, show_default=True)
-    if escolha > item:
-        console.print(f"[bold red]{escolha} não é uma opção válida")
-        return None
-    if escolha == 0:
-        return None
-    return id_uuid[str(escolha)]
+    pagina = servico.pagina_produtos(engine.dialect, nomeparcial, apenas_ativos=apenas_ativos)
+    return paginacao.navega(engine, console, pagina, Produto.nome, Produto.id, cria_tabela, adiciona_linha,
+                            tamanho_pagina, msg_cancelar=msg_cancelar, msg_prompt=msg_prompt)
 
 
 def alterar_preco_produto(engine: Session, console: Console):
     id_produto = selecionar_produto_id(engine, console, titulo="Escolha um produto para corrigir o preço",
                                        apenas_ativos=True)
+    if id_produto is None:
+        return
 
-    with Session(engine) as sessao:
-        produto = sessao.get_one(Produto, id_produto)
-        nome = produto.nome
-        preco = produto.preco
+    produto, saldo = _le_produto(engine, id_produto)
+    if produto is None:
+        print("Produto inexistente")
+        return
+    nome = produto.nome
 
-    novo_preco = Decimal(FloatPrompt.ask(f"Qual o novo preço de '{nome}'?", default=float(preco), show_default=True))
+    novo_preco = Decimal(FloatPrompt.ask(f"Qual o novo preço de '{nome}'?", default=float(saldo.preco),
+                                         show_default=True))
     if novo_preco <= 0:
         print("Preço não pode ser zero nem negativo")
         return
-    with Session(engine) as sessao:
-        produto = sessao.get_one(Produto, id_produto)
-        produto.preco = Decimal(novo_preco)
-        sessao.commit()
-        print(f"{nome} agora custa R$ {novo_preco:.2f}")
+    with banco.unidade_de_trabalho(engine) as sessao:
+        alterado = servico.altera_preco(sessao, id_produto, novo_preco)
+    if not alterado:
+        print("Produto inexistente")
+        return
+    print(f"{nome} agora custa R$ {servico.centavos(novo_preco):.2f}")
+
+
+def _seleciona_alvo_reajuste(engine: Session, console: Console):
+    # Devolve (descrição, argumentos de repreco.reajusta), ou None se a seleção foi interrompida
+    alvo = Prompt.ask("Reajustar [t]odos os produtos ativos, os de uma [c]ategoria, os que contêm um [n]ome "
+                      "ou [p]rodutos escolhidos?", choices=["t", "c", "n", "p"], default="t")
+    if alvo == "c":
+        id_categoria = app_categorias.seleciona_categoria_id(engine, console, titulo="Selecione a categoria",
+                                                             msg_cancelar="Interromper o reajuste",
+                                                             msg_prompt="Qual categoria será reajustada?")
+        if id_categoria is None:
+            return None
+        return "os produtos ativos da categoria escolhida", {"id_categoria": id_categoria}
+    if alvo == "n":
+        termo = Prompt.ask("Reajustar os produtos ativos contendo")
+        return f"os produtos ativos contendo '{termo}'", {"termo": termo}
+    if alvo == "p":
+        ids = []
+        while True:
+            id_produto = selecionar_produto_id(engine, console, titulo=f"Escolha o produto {len(ids) + 1}",
+                                               msg_cancelar="Terminar a escolha", apenas_ativos=True)
+            if id_produto is None:
+                break
+            ids.append(id_produto)
+        if not ids:
+            return None
+        return f"os {len(ids)} produtos escolhidos", {"ids": ids}
+    return "todos os produtos ativos", {}
 
 
 def alterar_preco_todos_produto(engine: Session, console: Console):
-    percentual = FloatPrompt.ask("Qual vai ser o percentual de reajuste (0.00 a 100.00%)?", default=0.00,
-                                 show_default=True)
+    try:
+        percentual = Decimal(Prompt.ask("Qual vai ser o percentual de reajuste (0.00 a 100.00%)?", default="0.00",
+                                        show_default=True).replace(",", "."))
+    except InvalidOperation:
+        print("Percentual inválido")
+        return
     if percentual < 0 or percentual > 100:
         print("Percentual inválido")
         return
 
-    taxa = Decimal(1.0 + percentual / 100.0)
-    with Session(engine) as sessao:
-        sessao.execute(update(Produto).values(preco=Produto.preco * taxa).where(Produto.ativo))
-        sessao.commit()
-        print(f"Precos corrigidos em {percentual:.2f}%!")
+    selecao = _seleciona_alvo_reajuste(engine, console)
+    if selecao is None:
+        return
+    descricao, alvo = selecao
+    total = repreco.conta_produtos(engine, repreco.filtro_produtos(engine.dialect, **alvo))
+    if total == 0 or not Confirm.ask(f"Reajustar em {percentual}% {descricao} ({total} produtos)?"):
+        print("Reajuste interrompido")
+        return
+
+    with Progress(console=console) as barra:
+        tarefa = barra.add_task("Reajustando os preços", total=total)
+        lote, alterados, ignorados = repreco.reajusta(engine, percentual,
+                                                      progresso=lambda feitos: barra.advance(tarefa, feitos), **alvo)
+    print(f"Preços corrigidos em {percentual}%: {alterados} produtos alterados (lote {lote})")
+    if ignorados:
+        print(f"{ignorados} produtos mudaram de preço durante o reajuste e foram mantidos")
+
+
+def desfaz_reajuste_precos(engine: Session, console: Console):
+    with banco.nova_sessao(engine) as sessao:
+        lotes = repreco.lista_lotes(sessao)
+    if not lotes:
+        print("Nenhum reajuste registrado")
+        return
+
+    tabela = Table(title="Últimos reajustes de preços")
+    tabela.add_column("Id", justify="right")
+    tabela.add_column("Data", justify="left")
+    tabela.add_column("Reajuste", justify="right")
+    tabela.add_column("# produtos", justify="right")
+    tabela.add_column("Situação", justify="left")
+    itens = {lote.lote: item for item, lote in enumerate(lotes, start=1)}
+    for item, lote in enumerate(lotes, start=1):
+        if lote.lote_desfeito is not None:
+            reajuste, situacao = "reversão", f"desfaz o {itens.get(lote.lote_desfeito, str(lote.lote_desfeito)[:8])}"
+        else:
+            reajuste, situacao = f"{lote.percentual:.2f}%", "desfeito" if lote.desfeitos else ""
+        tabela.add_row(str(item), f"{lote.dta_alteracao.strftime('%Y-%m-%d %H:%M')}", reajuste,
+                       f"{lote.produtos:4d}", situacao)
+    console.print(tabela)
+
+    item = IntPrompt.ask("Qual reajuste será desfeito? (0 para interromper)", default=0)
+    if item == 0:
+        return
+    if item < 0 or item > len(lotes):
+        console.print(f"[bold red]{item} não é um reajuste válido")
+        return
+    escolhido = lotes[item - 1]
+    if not Confirm.ask(f"Voltar os {escolhido.produtos} produtos do reajuste {escolhido.lote} ao preço anterior?"):
+        print("Reversão interrompida")
+        return
+
+    with Progress(console=console) as barra:
+        tarefa = barra.add_task("Desfazendo o reajuste", total=escolhido.produtos)
+        _, revertidos, ignorados = repreco.desfaz(engine, escolhido.lote,
+                                                  progresso=lambda feitos: barra.advance(tarefa, feitos))
+    print(f"{revertidos} produtos voltaram ao preço anterior")
+    if ignorados:
+        print(f"{ignorados} produtos tiveram o preço alterado depois do reajuste e foram mantidos")
@@ -0,0 +1,289 @@
+import configparser
+import os
+import uuid
+from contextlib import contextmanager
+
+from sqlalchemy import MetaData, String, create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+
+from busca import instala_busca
+from estoque import registra_saldos_iniciais
+from resumo import instala_resumo
+from models import Base, Categoria, Produto, UuidCompacto, VersaoDados
+
+# Configuração do banco de dados
+#
+# Os valores vêm, em ordem crescente de prioridade, dos padrões abaixo, da seção [banco] do
+# arquivo catalogo.ini (ou do arquivo indicado em CATALOGO_CONFIG) e das variáveis de ambiente
+# CATALOGO_<CHAVE>, por exemplo CATALOGO_URL ou CATALOGO_POOL_SIZE.
+
+ARQUIVO_CONFIG = "catalogo.ini"
+
+PADROES = {
+    "url": "sqlite+pysqlite:///test.sqlite3",
+    "echo": "false",
+    # SQLite
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": str(256 * 1024 * 1024),
+    "cache_size": str(-64 * 1024),
+    "busy_timeout": "5000",
+    # Demais bancos (PostgreSQL etc.)
+    "pool_size": "5",
+    "max_overflow": "10",
+    "pool_timeout": "30",
+    "pool_recycle": "1800",
+    # Cache de leitura (quantidade máxima de entradas; ver cache.py)
+    "cache_produtos": "10000",
+    "cache_categorias": "1000",
+    # Interface
+    "tamanho_pagina": "20",
+    # Remoções marcam as linhas como arquivadas (removido_em) em vez de apagá-las
+    "arquivar_removidos": "false",
+    # Diagnóstico das ações do menu (ver diagnostico.py)
+    "diagnostico": "true",
+    "limite_n_mais_1": "10",
+    "comandos_lentos": "5",
+    "perfil": "false",
+    # Réplicas de leitura (ver replicas.py): URLs de bancos de leitura separadas por vírgula, o
+    # arquivo da réplica local de um banco SQLite, a defasagem máxima aceita e o intervalo entre
+    # as cópias, em segundos
+    "leitores": "",
+    "replica": "",
+    "replica_defasagem": "5",
+    "replica_intervalo": "1",
+}
+
+
+def carrega_configuracao(arquivo: str = None) -> dict:
+    config = dict(PADROES)
+    arquivo = arquivo or os.environ.get("CATALOGO_CONFIG", ARQUIVO_CONFIG)
+    if os.path.exists(arquivo):
+        parser = configparser.ConfigParser()
+        parser.read(arquivo, encoding="utf-8")
+        if parser.has_section("banco"):
+            config.update(parser["banco"])
+    for chave in config:
+        valor = os.environ.get(f"CATALOGO_{chave.upper()}")
+        if valor is not None:
+            config[chave] = valor
+    return config
+
+
+def verdadeiro(valor: str) -> bool:
+    return str(valor).strip().lower() in ("1", "s", "sim", "true", "yes", "on")
+
+
+def pragmas_sqlite(config: dict):
+    # Devolve o tratador do evento "connect" que aplica os PRAGMAs em cada nova conexão SQLite
+    def configura(conexao_dbapi, registro_conexao):
+        cursor = conexao_dbapi.cursor()
+        cursor.execute(f"PRAGMA journal_mode={config['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous={config['synchronous']}")
+        cursor.execute(f"PRAGMA mmap_size={int(config['mmap_size'])}")
+        cursor.execute(f"PRAGMA cache_size={int(config['cache_size'])}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config['busy_timeout'])}")
+        # O SQLite só aplica as chaves estrangeiras (e o ON DELETE CASCADE) quando pedido
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+        # O pysqlite só abre a transação antes de INSERT/UPDATE/DELETE: um SAVEPOINT anterior
+        # abriria a transação e o seu RELEASE a confirmaria. Com o driver em autocommit, o BEGIN
+        # é enviado por inicia_transacao, como na receita da documentação do SQLAlchemy.
+        conexao_dbapi.isolation_level = None
+    return configura
+
+
+def inicia_transacao(conexao):
+    # Evento "begin" da engine SQLite; conexões em AUTOCOMMIT (para o VACUUM, por exemplo) ficam sem BEGIN
+    if conexao.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+        conexao.exec_driver_sql("BEGIN")
+
+
+def configura_sqlite(engine, config: dict):
+    # Os eventos de toda engine SQLite, síncrona ou não (de uma AsyncEngine, passe a sync_engine)
+    event.listen(engine, "connect", pragmas_sqlite(config))
+    event.listen(engine, "begin", inicia_transacao)
+
+
+def opcoes_pool(config: dict) -> dict:
+    return {"pool_size": int(config["pool_size"]), "max_overflow": int(config["max_overflow"]),
+            "pool_timeout": int(config["pool_timeout"]), "pool_recycle": int(config["pool_recycle"]),
+            "pool_pre_ping": True}
+
+
+def cria_engine(config: dict = None):
+    config = config or carrega_configuracao()
+    url = make_url(config["url"])
+    echo = verdadeiro(config["echo"])
+    if url.get_backend_name() == "sqlite":
+        engine = create_engine(url, echo=echo, connect_args={"timeout": int(config["busy_timeout"]) / 1000})
+        configura_sqlite(engine, config)
+    else:
+        engine = create_engine(url, echo=echo, **opcoes_pool(config))
+    return engine
+
+
+# Índices substituídos por versões parciais (ver models.py)
+INDICES_OBSOLETOS = ["ix_categorias_nome_id", "ix_produtos_nome_id"]
+
+
+def _adiciona_colunas(conexao, tabela):
+    # Colunas novas entram como anuláveis; os valores são preenchidos por quem precisa delas
+    existentes = {coluna["name"] for coluna in inspect(conexao).get_columns(tabela.name)}
+    for coluna in tabela.columns:
+        if coluna.name not in existentes:
+            tipo = coluna.type.compile(dialect=conexao.dialect)
+            conexao.execute(text(f"ALTER TABLE {tabela.name} ADD COLUMN {coluna.name} {tipo}"))
+
+
+def _chaves_desatualizadas(conexao, tabela) -> bool:
+    # Alguma chave estrangeira do banco sem o ON DELETE declarado no modelo?
+    no_banco = {tuple(chave["constrained_columns"]): (chave["options"].get("ondelete") or "").upper()
+                for chave in inspect(conexao).get_foreign_keys(tabela.name)}
+    return any(no_banco.get(tuple(chave.column_keys), "") != (chave.ondelete or "").upper()
+               for chave in tabela.foreign_key_constraints)
+
+
+def _uuids_em_texto(conexao, tabela) -> list:
+    # Colunas UuidCompacto ainda declaradas como texto (CHAR(32) das versões anteriores)
+    no_banco = {coluna["name"]: coluna["type"] for coluna in inspect(conexao).get_columns(tabela.name)}
+    return [coluna.name for coluna in tabela.columns
+            if isinstance(coluna.type, UuidCompacto) and isinstance(no_banco.get(coluna.name), String)]
+
+
+def _uuid_blob(valor):
+    # Função SQL usada na cópia: o texto hexadecimal do UUID vira os seus 16 bytes
+    if valor is None or isinstance(valor, bytes):
+        return valor
+    return uuid.UUID(valor).bytes
+
+
+def _recria_tabela_sqlite(conexao, tabela, conversoes: dict = None):
+    # O SQLite não altera restrições nem tipos de tabelas existentes: cria a tabela com a
+    # definição atual, copia as linhas (mantendo o rowid, usado pelo FTS5), apaga a antiga e
+    # renomeia. conversoes: coluna -> expressão SQL aplicada na cópia.
+    conversoes = conversoes or {}
+    metadados = MetaData()
+    for outra in Base.metadata.sorted_tables:
+        if outra is not tabela:
+            outra.to_metadata(metadados)
+    temporaria = tabela.to_metadata(metadados, name=f"{tabela.name}_nova")
+    conexao.execute(CreateTable(temporaria))
+    colunas = [coluna["name"] for coluna in inspect(conexao).get_columns(tabela.name)]
+    valores = ", ".join(conversoes.get(coluna, coluna) for coluna in colunas)
+    conexao.execute(text(f"INSERT INTO {temporaria.name} (rowid, {', '.join(colunas)}) SELECT rowid, {valores} "
+                         f"FROM {tabela.name}"))
+    conexao.execute(text(f"DROP TABLE {tabela.name}"))
+    conexao.execute(text(f"ALTER TABLE {temporaria.name} RENAME TO {tabela.name}"))
+
+
+def atualiza_colunas(engine):
+    # Leva bancos criados por versões anteriores às colunas atuais dos modelos; os índices
+    # que faltam são criados por instala_busca
+    with engine.begin() as conexao:
+        for tabela in Base.metadata.sorted_tables:
+            _adiciona_colunas(conexao, tabela)
+        for nome in INDICES_OBSOLETOS:
+            conexao.execute(text(f"DROP INDEX IF EXISTS {nome}"))
+
+
+def recria_tabelas_desatualizadas(engine) -> bool:
+    # No SQLite, recria as tabelas cujas chaves estrangeiras não têm o ON DELETE atual ou que
+    # ainda guardam UUIDs como texto, convertendo-os para BLOB na cópia. Todas as tabelas são
+    # recriadas na mesma transação, com a verificação das chaves desligada, para que chaves e
+    # referências mudem juntas. Devolve se alguma foi recriada.
+    if engine.dialect.name != "sqlite":
+        return False
+    recriadas = False
+    with engine.connect() as conexao:
+        # O PRAGMA foreign_keys não tem efeito dentro de uma transação: vai direto ao driver (pela
+        # conexão DBAPI, que também adapta o aiosqlite quando a engine é a de uma AsyncEngine)
+        conexao_dbapi = conexao.connection.dbapi_connection
+        conexao_dbapi.create_function("uuid_blob", 1, _uuid_blob, deterministic=True)
+        conexao_dbapi.cursor().execute("PRAGMA foreign_keys=OFF")
+        try:
+            with conexao.begin():
+                for tabela in Base.metadata.sorted_tables:
+                    em_texto = _uuids_em_texto(conexao, tabela)
+                    if em_texto or _chaves_desatualizadas(conexao, tabela):
+                        _recria_tabela_sqlite(conexao, tabela, {coluna: f"uuid_blob({coluna})" for coluna in em_texto})
+                        for indice in tabela.indexes:
+                            indice.create(conexao, checkfirst=True)
+                        recriadas = True
+        finally:
+            conexao_dbapi.cursor().execute("PRAGMA foreign_keys=ON")
+    return recriadas
+
+
+def arredonda_precos(sessao: Session) -> int:
+    # No SQLite, o DECIMAL é gravado como REAL: bancos antigos podem ter preços como
+    # 10.333000000000002, que o reajuste (repreco.py) nunca encontra ao comparar com o preço lido
+    # em centavos. Devolve quantos preços foram arredondados.
+    if sessao.get_bind().dialect.name != "sqlite":
+        return 0
+    return sessao.execute(text("UPDATE produtos SET preco = ROUND(preco, 2) "
+                               "WHERE preco <> ROUND(preco, 2)")).rowcount
+
+
+# Migrações de dados, que percorrem tabelas inteiras e por isso rodam uma vez só por banco,
+# na ordem da lista; a versão do banco (models.VersaoDados) é quantas já foram aplicadas.
+# Novas migrações entram sempre no fim.
+MIGRACOES_DADOS = [
+    arredonda_precos,
+    # Produtos gravados antes do livro de movimentações (ou por cargas que não o preenchiam)
+    registra_saldos_iniciais,
+]
+
+
+def migra_dados(engine) -> int:
+    # Aplica as migrações que faltam, na mesma transação que grava a nova versão; devolve quantas
+    with unidade_de_trabalho(engine) as sessao:
+        registro = sessao.get(VersaoDados, 1)
+        aplicadas = registro.versao if registro is not None else 0
+        for migracao in MIGRACOES_DADOS[aplicadas:]:
+            migracao(sessao)
+        if aplicadas < len(MIGRACOES_DADOS):
+            sessao.merge(VersaoDados(id=1, versao=len(MIGRACOES_DADOS)))
+    return len(MIGRACOES_DADOS) - aplicadas
+
+
+def prepara_banco(engine):
+    # Cria as tabelas que faltam e atualiza bancos antigos para o esquema e a busca por nome atuais
+    Base.metadata.create_all(engine)
+    atualiza_colunas(engine)
+    instala_busca(engine, Categoria, Produto)
+    if recria_tabelas_desatualizadas(engine):
+        # As tabelas recriadas perderam os triggers do FTS5; os do resumo voltam em instala_resumo
+        instala_busca(engine, Categoria, Produto)
+    instala_resumo(engine)
+    # Depois dos triggers do resumo, que acompanham os preços arredondados
+    migra_dados(engine)
+
+
+# Roteadores de leitura instalados, por engine de escrita (ver replicas.py)
+ROTEADORES = {}
+
+
+def engine_leitura(engine):
+    roteador = ROTEADORES.get(engine)
+    return engine if roteador is None else roteador.leitor()
+
+
+def nova_sessao(engine, escrita: bool = False) -> Session:
+    # Sessões só de leitura podem ir para uma réplica; quem grava pede escrita=True
+    return Session(engine if escrita else engine_leitura(engine))
+
+
+@contextmanager
+def unidade_de_trabalho(engine):
+    # Uma sessão e uma única transação para toda a ação: commit ao final, rollback em caso de erro.
+    # Leituras sem nenhuma escrita não chegam a abrir transação de escrita no SQLite.
+    with nova_sessao(engine, escrita=True) as sessao:
+        try:
+            yield sessao
+            sessao.commit()
+        except BaseException:
+            sessao.rollback()
+            raise
@@ -0,0 +1,99 @@
+# Custo de montar e compilar as consultas das listagens
+#
+# Para cada listagem, compara a consulta montada a cada chamada com a Pagina pronta de
+# consultas.py. Mede, em microssegundos:
+#     montagem    construir o select(...) da página e gerar a sua chave de cache
+#     compilação  gerar o SQL, mais a montagem na consulta montada (o compiled_cache da engine
+#                 evita esse custo depois da primeira execução de cada forma)
+#     execução    buscar uma página de um banco pequeno, do início ao fim
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.compilacao --repeticoes 2000
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import banco
+import consultas
+import resumo
+import servico
+from benchmarks import gera_dados
+from models import Categoria, Produto
+
+# (nome, monta a consulta, coluna de nome, coluna de id, a Pagina pronta, página seguinte?)
+LISTAGENS = [
+    ("produtos", lambda dialeto: servico.query_produtos(), Produto.nome, Produto.id,
+     lambda dialeto: servico.pagina_produtos(dialeto), False),
+    ("produtos (seguinte)", lambda dialeto: servico.query_produtos(), Produto.nome, Produto.id,
+     lambda dialeto: servico.pagina_produtos(dialeto), True),
+    ("sem estoque", lambda dialeto: servico.filtra_produtos(dialeto, sem_estoque=True), Produto.nome, Produto.id,
+     lambda dialeto: servico.pagina_produtos(dialeto, sem_estoque=True), False),
+    ("categorias", lambda dialeto: servico.query_categorias(), Categoria.nome, Categoria.id,
+     lambda dialeto: servico.pagina_categorias(dialeto), False),
+    ("painel do estoque", resumo.query_painel, Categoria.nome, Categoria.id, resumo.pagina_painel, False),
+]
+
+
+def mede(funcao, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1_000_000)
+    return statistics.median(tempos)
+
+
+def pagina_dinamica(query, coluna_nome, coluna_id, depois_de):
+    # A página montada do zero: a condição de início, a ordem e o limite a cada chamada
+    if depois_de is not None:
+        nome, id_ = depois_de
+        query = query.where((coluna_nome > nome) | ((coluna_nome == nome) & (coluna_id > id_)))
+    return query.order_by(coluna_nome, coluna_id).limit(consultas.TAMANHO_PAGINA + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Montagem e compilação das consultas: a cada chamada x prontas")
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    parser.add_argument("--produtos", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        config = banco.carrega_configuracao()
+        config["url"] = f"sqlite+pysqlite:///{os.path.join(diretorio, 'compilacao.sqlite3')}"
+        engine = banco.cria_engine(config)
+        banco.prepara_banco(engine)
+        gera_dados.popula(engine, 50, args.produtos)
+        dialeto = engine.dialect
+
+        print(f"{'Listagem':<22} {'':<8} {'montagem':>10} {'compilação':>11} {'execução':>10}")
+        with banco.nova_sessao(engine) as sessao:
+            for nome, monta, coluna_nome, coluna_id, pronta, seguinte in LISTAGENS:
+                depois_de = None
+                if seguinte:
+                    linhas, _ = pronta(dialeto).busca(sessao)
+                    depois_de = (linhas[-1].nome, linhas[-1].id)
+                pagina = pronta(dialeto)
+                comando_pronto = pagina.primeira if depois_de is None else pagina.seguintes
+
+                montagem = mede(lambda: pagina_dinamica(monta(dialeto), coluna_nome, coluna_id, depois_de)
+                                ._generate_cache_key(), args.repeticoes)
+                compilacao = mede(lambda: pagina_dinamica(monta(dialeto), coluna_nome, coluna_id, depois_de)
+                                  .compile(dialect=dialeto), max(10, args.repeticoes // 10))
+                execucao = mede(lambda: sessao.execute(pagina_dinamica(monta(dialeto), coluna_nome, coluna_id,
+                                                                       depois_de)).all(), args.repeticoes)
+                print(f"{nome:<22} {'montada':<8} {montagem:>10.1f} {compilacao:>11.1f} {execucao:>10.1f}")
+
+                montagem = mede(lambda: (pronta(dialeto), comando_pronto._generate_cache_key()), args.repeticoes)
+                compilacao = mede(lambda: comando_pronto.compile(dialect=dialeto), max(10, args.repeticoes // 10))
+                execucao = mede(lambda: pronta(dialeto).busca(sessao, depois_de),
+                                args.repeticoes)
+                print(f"{'':<22} {'pronta':<8} {montagem:>10.1f} {compilacao:>11.1f} {execucao:>10.1f}")
+        print("\nTempos em µs (mediana). A compilação só é paga numa falta no compiled_cache da engine, "
+              "nas duas formas.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Teste de carga das vendas concorrentes
+#
+# Várias threads vendem o mesmo produto ao mesmo tempo, cada uma com a sua sessão,
+# comparando a gravação antiga (lê o estoque, calcula em Python e grava o valor) com a
+# movimentação atômica de estoque.py. Ao final, mostra vendas/s e vendas perdidas.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.estoque_concorrente --threads 8 --vendas 200
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import estoque
+from models import Base, Categoria, Produto, MovimentoEstoque
+
+
+def venda_ler_e_gravar(engine, id_produto):
+    with Session(engine) as sessao:
+        qtd_atual = sessao.get_one(Produto, id_produto).estoque
+    with Session(engine) as sessao:
+        sessao.get_one(Produto, id_produto).estoque = qtd_atual - 1
+        sessao.commit()
+
+
+def venda_atomica(engine, id_produto):
+    with Session(engine) as sessao:
+        estoque.vende(sessao, id_produto, 1)
+        sessao.commit()
+
+
+def executa(nome: str, venda, threads: int, vendas: int, estoque_inicial: int):
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine = create_engine(f"sqlite+pysqlite:///{os.path.join(diretorio, 'estoque.sqlite3')}",
+                               connect_args={"timeout": 60})
+        Base.metadata.create_all(engine)
+        with Session(engine) as sessao:
+            categoria = Categoria(nome="Carga")
+            produto = Produto(nome="Produto disputado", preco=1, estoque=estoque_inicial)
+            categoria.lista_de_produtos.append(produto)
+            sessao.add(categoria)
+            sessao.commit()
+            id_produto = produto.id
+
+        barreira = threading.Barrier(threads)
+
+        def trabalho():
+            barreira.wait()
+            for _ in range(vendas):
+                venda(engine, id_produto)
+
+        inicio = time.perf_counter()
+        trabalhadores = [threading.Thread(target=trabalho) for _ in range(threads)]
+        for trabalhador in trabalhadores:
+            trabalhador.start()
+        for trabalhador in trabalhadores:
+            trabalhador.join()
+        duracao = time.perf_counter() - inicio
+
+        with Session(engine) as sessao:
+            final = sessao.get_one(Produto, id_produto).estoque
+            movimentos = len(sessao.scalars(select(MovimentoEstoque.id)).all())
+        engine.dispose()
+
+    total = threads * vendas
+    perdidas = (estoque_inicial - final) - total
+    print(f"{nome:>15}: {total} vendas em {duracao:.2f}s ({total / duracao:,.0f} vendas/s), "
+          f"estoque final {final}, vendas perdidas {abs(perdidas)}, movimentos registrados {movimentos}")
+    return abs(perdidas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vendas concorrentes do mesmo produto")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--vendas", type=int, default=200, help="vendas por thread")
+    args = parser.parse_args()
+
+    estoque_inicial = args.threads * args.vendas
+    executa("ler e gravar", venda_ler_e_gravar, args.threads, args.vendas, estoque_inicial)
+    perdidas = executa("atômica", venda_atomica, args.threads, args.vendas, estoque_inicial)
+    if perdidas:
+        raise SystemExit(f"A movimentação atômica perdeu {perdidas} vendas")
+
+
+if __name__ == "__main__":
+    main()
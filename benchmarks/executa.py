@@ -0,0 +1,243 @@
+# Testes de desempenho das operações do catálogo, sem interação com o usuário
+#
+# Para cada tamanho de catálogo, gera (ou reaproveita) um banco sintético com gera_dados.py,
+# executa cada operação de servico.py várias vezes e registra os percentis de latência, a
+# quantidade de comandos SQL por chamada e o pico de memória (tracemalloc, numa execução à
+# parte para não distorcer os tempos). O resultado vai para um JSON, que pode ser comparado
+# com o de outro commit.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.executa --tamanhos 10000 100000 1000000 --saida resultado.json
+#     python -m benchmarks.executa --tamanhos 10000 --saida novo.json --comparar resultado.json
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+
+import sqlalchemy
+from sqlalchemy import event, select, func
+
+import banco
+import cache
+import repreco
+import resumo
+import servico
+from benchmarks import gera_dados
+from models import Produto
+
+REPETICOES = 50
+
+
+class Contexto:
+    def __init__(self, engine, gerador: random.Random):
+        self.engine = engine
+        self.gerador = gerador
+        with banco.nova_sessao(engine) as sessao:
+            self.ids_produto = sessao.scalars(select(Produto.id).order_by(func.random()).limit(1000)).all()
+            # Categorias da menor para a maior; as remoções usam as do meio da lista
+            contagem = (select(Produto.categoria_id, func.count().label("qtd"))
+                        .group_by(Produto.categoria_id).order_by(func.count()).subquery())
+            ids = sessao.scalars(select(contagem.c.categoria_id)).all()
+            meio = len(ids) // 2
+            self.ids_categoria = ids[meio:] + ids[:meio]
+
+    def produto(self):
+        return self.gerador.choice(self.ids_produto)
+
+
+def _lista_produtos_completa(contexto: Contexto):
+    depois_de, tem_proxima = None, True
+    with banco.nova_sessao(contexto.engine) as sessao:
+        while tem_proxima:
+            linhas, tem_proxima = servico.lista_produtos(sessao, depois_de=depois_de, tamanho=1000)
+            if linhas:
+                depois_de = (linhas[-1].nome, linhas[-1].id)
+
+
+def _leitura(operacao):
+    def executa(contexto: Contexto):
+        with banco.nova_sessao(contexto.engine) as sessao:
+            operacao(sessao, contexto)
+    return executa
+
+
+def _escrita(operacao):
+    def executa(contexto: Contexto):
+        with banco.unidade_de_trabalho(contexto.engine) as sessao:
+            operacao(sessao, contexto)
+    return executa
+
+
+TERMOS_CURTOS = ["ca", "te", "ág", "mo", "pa"]
+TERMOS_TRECHO = ["azul", "miset", "acao", "premium", "açúcar"]
+TERMOS_PALAVRAS = ["caneta azul", "cafe organico", "monitor 4k", "toalha branco acme"]
+
+
+def _busca(termos):
+    def busca(sessao, contexto: Contexto):
+        servico.lista_produtos(sessao, contexto.gerador.choice(termos))
+    return busca
+
+
+def _painel_estoque(sessao, contexto: Contexto):
+    resumo.pagina_painel(contexto.engine.dialect).busca(sessao)
+
+
+def _remove_categoria(sessao, contexto: Contexto):
+    servico.remove_categoria(sessao, contexto.ids_categoria.pop())
+
+
+# (nome, função, máximo de repetições)
+OPERACOES = [
+    ("lista_produtos_pagina", _leitura(lambda sessao, ctx: servico.lista_produtos(sessao)), REPETICOES),
+    ("lista_produtos_completa", _lista_produtos_completa, 3),
+    ("lista_sem_estoque_pagina", _leitura(lambda sessao, ctx: servico.lista_produtos(sessao, sem_estoque=True)),
+     REPETICOES),
+    ("lista_categorias_pagina", _leitura(lambda sessao, ctx: servico.lista_categorias(sessao)), REPETICOES),
+    ("painel_estoque_pagina", _leitura(_painel_estoque), REPETICOES),
+    ("busca_curta", _leitura(_busca(TERMOS_CURTOS)), REPETICOES),
+    ("busca_trecho", _leitura(_busca(TERMOS_TRECHO)), REPETICOES),
+    ("busca_palavras", _leitura(_busca(TERMOS_PALAVRAS)), REPETICOES),
+    ("obtem_produto", _leitura(lambda sessao, ctx: servico.obtem_produto(sessao, ctx.produto())), REPETICOES),
+    ("vende", _escrita(lambda sessao, ctx: servico.vende(sessao, ctx.produto(), 1)), REPETICOES),
+    ("altera_preco", _escrita(lambda sessao, ctx: servico.altera_preco(sessao, ctx.produto(), Decimal("9.90"))),
+     REPETICOES),
+    ("reajusta_precos", lambda ctx: repreco.reajusta(ctx.engine, Decimal("1")), 3),
+    ("remove_categoria", _escrita(_remove_categoria), 3),
+]
+
+
+def percentil(valores, fracao: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(fracao * len(ordenados)) - 1)]
+
+
+def mede(contexto: Contexto, funcao, repeticoes: int) -> dict:
+    comandos = [0]
+
+    def conta(*args):
+        comandos[0] += 1
+
+    event.listen(contexto.engine, "before_cursor_execute", conta)
+    try:
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao(contexto)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        comandos_por_chamada = comandos[0] / repeticoes
+    finally:
+        event.remove(contexto.engine, "before_cursor_execute", conta)
+
+    tracemalloc.start()
+    try:
+        funcao(contexto)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"repeticoes": repeticoes, "media_ms": sum(tempos) / len(tempos), "p50_ms": percentil(tempos, 0.50),
+            "p90_ms": percentil(tempos, 0.90), "p99_ms": percentil(tempos, 0.99), "max_ms": max(tempos),
+            "comandos_sql": comandos_por_chamada, "pico_memoria_mb": pico / (1024 * 1024)}
+
+
+def banco_sintetico(diretorio: str, tamanho: int, semente: int) -> str:
+    # O catálogo gerado é guardado e copiado a cada execução, já que as operações o alteram
+    base = os.path.join(diretorio, f"catalogo_{tamanho}_{semente}.sqlite3")
+    if not os.path.exists(base):
+        print(f"Gerando catálogo com {tamanho:,} produtos em {base}")
+        engine = banco.cria_engine(_config(base))
+        banco.prepara_banco(engine)
+        gera_dados.popula(engine, max(10, tamanho // 500), tamanho, semente)
+        engine.dispose()
+    copia = os.path.join(diretorio, f"execucao_{tamanho}.sqlite3")
+    for sufixo in ("", "-wal", "-shm"):
+        if os.path.exists(copia + sufixo):
+            os.remove(copia + sufixo)
+    shutil.copyfile(base, copia)
+    return copia
+
+
+def _config(arquivo: str) -> dict:
+    config = banco.carrega_configuracao()
+    config["url"] = f"sqlite+pysqlite:///{arquivo}"
+    return config
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compara(atual: dict, anterior: dict):
+    print(f"\nComparação com {anterior.get('commit')} ({anterior.get('data')}); p50 atual / p50 anterior")
+    for tamanho, operacoes in atual["resultados"].items():
+        anteriores = anterior["resultados"].get(tamanho, {})
+        for nome, medida in operacoes.items():
+            if nome in anteriores and anteriores[nome]["p50_ms"] > 0:
+                razao = medida["p50_ms"] / anteriores[nome]["p50_ms"]
+                alerta = "  <-- mais lento" if razao > 1.2 else ""
+                print(f"{tamanho:>10} {nome:<26} {razao:6.2f}x{alerta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede as operações do catálogo em bancos sintéticos")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--diretorio", help="onde guardar os catálogos gerados (padrão: temporário)")
+    parser.add_argument("--operacoes", nargs="+", help="executa apenas estas operações")
+    parser.add_argument("--saida", default="resultado_desempenho.json")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    resultado = {"data": datetime.now().isoformat(timespec="seconds"), "commit": _commit_atual(),
+                 "python": platform.python_version(), "sqlalchemy": sqlalchemy.__version__,
+                 "sqlite": sqlite3.sqlite_version, "resultados": {}}
+    diretorio_temporario = None if args.diretorio else tempfile.TemporaryDirectory()
+    diretorio = args.diretorio or diretorio_temporario.name
+    os.makedirs(diretorio, exist_ok=True)
+    try:
+        for tamanho in args.tamanhos:
+            engine = banco.cria_engine(_config(banco_sintetico(diretorio, tamanho, args.semente)))
+            cache.limpa()
+            contexto = Contexto(engine, random.Random(args.semente))
+            medidas = {}
+            for nome, funcao, maximo in OPERACOES:
+                if args.operacoes and nome not in args.operacoes:
+                    continue
+                medidas[nome] = mede(contexto, funcao, min(maximo, args.repeticoes))
+                print(f"{tamanho:>10,} {nome:<26} p50 {medidas[nome]['p50_ms']:9.2f} ms  "
+                      f"p99 {medidas[nome]['p99_ms']:9.2f} ms  {medidas[nome]['comandos_sql']:5.1f} SQL  "
+                      f"{medidas[nome]['pico_memoria_mb']:7.2f} MB")
+            resultado["resultados"][str(tamanho)] = medidas
+            engine.dispose()
+    finally:
+        if diretorio_temporario is not None:
+            diretorio_temporario.cleanup()
+
+    with open(args.saida, "w", encoding="utf-8") as saida:
+        json.dump(resultado, saida, indent=2)
+    print(f"Resultados gravados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as entrada:
+            compara(resultado, json.load(entrada))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Escalabilidade da exportação em partes
+#
+# Gera (ou reaproveita, com --banco) um catálogo SQLite e exporta os produtos com
+# exportacao.exporta em 1, 2, 4, ... partes, em processos e em threads. Mostra o tempo de cada
+# exportação, o ganho sobre uma parte só e a eficiência (ganho / partes), e confere que todos
+# os arquivos são idênticos ao da exportação em uma parte. O ganho com processos fica limitado
+# pela quantidade de núcleos; com threads, pelo GIL, já que a formatação é feita em Python.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.exportacao_paralela --produtos 2000000
+#     python -m benchmarks.exportacao_paralela --banco carga.sqlite3 --partes 1 2 4 8
+
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import statistics
+import tempfile
+import time
+
+import banco
+import exportacao
+from benchmarks import gera_dados
+
+
+def resumo_arquivo(arquivo: str) -> str:
+    digest = hashlib.sha256()
+    with open(arquivo, "rb") as entrada:
+        for bloco in iter(lambda: entrada.read(1024 * 1024), b""):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+def mede(engine, arquivo: str, formato: str, partes: int, threads: bool, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            exportacao.exporta(engine, "produtos", arquivo, formato, partes, threads)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    nucleos = os.cpu_count() or 1
+    padrao = sorted({2 ** potencia for potencia in range(nucleos.bit_length())} | {nucleos})
+    parser = argparse.ArgumentParser(description="Exportação em partes: processos x threads")
+    parser.add_argument("--categorias", type=int, default=200)
+    parser.add_argument("--produtos", type=int, default=2000000)
+    parser.add_argument("--banco", help="arquivo SQLite já populado; por padrão, gera um temporário")
+    parser.add_argument("--partes", type=int, nargs="+", default=padrao)
+    parser.add_argument("--formato", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--repeticoes", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        arquivo_banco = args.banco or os.path.join(diretorio, "exportacao.sqlite3")
+        config = banco.carrega_configuracao()
+        config["url"] = f"sqlite+pysqlite:///{arquivo_banco}"
+        engine = banco.cria_engine(config)
+        if not args.banco:
+            print(f"Gerando catálogo com {args.produtos:,} produtos")
+            banco.prepara_banco(engine)
+            gera_dados.popula(engine, args.categorias, args.produtos)
+
+        saida = os.path.join(diretorio, f"produtos.{args.formato}")
+        base = mede(engine, saida, args.formato, 1, False, args.repeticoes)
+        referencia = resumo_arquivo(saida)
+        linhas = sum(1 for _ in open(saida, encoding="utf-8")) - (args.formato == "csv")
+
+        print(f"{linhas:,} produtos, {nucleos} núcleos; uma parte: {base:.2f}s ({linhas / base:,.0f} linhas/s)\n")
+        print(f"{'Partes':>6} {'modo':<10} {'tempo (s)':>10} {'linhas/s':>12} {'ganho':>7} {'eficiência':>11}")
+        for partes in args.partes:
+            for threads in (False, True):
+                if partes == 1 and threads:
+                    continue
+                duracao = mede(engine, saida, args.formato, partes, threads, args.repeticoes)
+                if resumo_arquivo(saida) != referencia:
+                    raise RuntimeError(f"a exportação em {partes} partes difere da exportação em uma parte")
+                modo = "—" if partes == 1 else "threads" if threads else "processos"
+                print(f"{partes:>6} {modo:<10} {duracao:>10.2f} {linhas / duracao:>12,.0f} "
+                      f"{base / duracao:>6.2f}x {base / duracao / partes:>10.0%}")
+        if max(args.partes) > nucleos:
+            print(f"\nCom mais partes que núcleos ({nucleos}), os processos dividem os mesmos núcleos.")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# Gerador de catálogos sintéticos para testes de desempenho
+#
+# Cria N categorias e M produtos direto nas tabelas de models.Base.metadata, em lotes. A
+# distribuição é assimétrica como num catálogo real: poucas categorias concentram a maior
+# parte dos produtos (Zipf), preços seguem uma log-normal, a maioria dos produtos tem estoque
+# e uma parte pequena está zerada, negativa ou inativa. Cada produto recebe a sua movimentação
+# inicial no livro de estoque, como no cadastro. A semente torna o resultado repetível.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.gera_dados --categorias 200 --produtos 1000000 --banco sqlite:///carga.sqlite3
+
+import argparse
+import random
+import time
+import uuid
+from decimal import Decimal
+from itertools import accumulate
+
+from sqlalchemy import insert
+
+import banco
+from busca import normaliza
+import estoque
+from models import Categoria, Produto, MovimentoEstoque
+
+TAMANHO_LOTE = 10000
+
+PRODUTOS = ["Caneta", "Lápis", "Caderno", "Borracha", "Régua", "Camiseta", "Calça", "Tênis", "Meia", "Boné",
+            "Café", "Açúcar", "Feijão", "Arroz", "Macarrão", "Sabão", "Detergente", "Esponja", "Água", "Suco",
+            "Televisão", "Monitor", "Teclado", "Mouse", "Cabo", "Panela", "Frigideira", "Copo", "Prato", "Toalha"]
+ATRIBUTOS = ["azul", "vermelho", "preto", "branco", "verde", "grande", "pequeno", "médio", "premium", "econômico",
+             "orgânico", "integral", "sem açúcar", "infantil", "profissional", "com 12", "kit", "refil", "4K", "USB"]
+MARCAS = ["Acme", "Brasilis", "Cação", "Dória", "Estrela", "Fênix", "Guará", "Horizonte", "Ipê", "Jatobá"]
+CATEGORIAS = ["Papelaria", "Vestuário", "Calçados", "Mercearia", "Limpeza", "Bebidas", "Eletrônicos",
+              "Informática", "Utilidades", "Cama, mesa e banho"]
+
+
+def nome_produto(gerador: random.Random) -> str:
+    return f"{gerador.choice(PRODUTOS)} {gerador.choice(ATRIBUTOS)} {gerador.choice(MARCAS)} {gerador.randint(1, 999)}"
+
+
+def popula(engine, categorias: int, produtos: int, semente: int = 42, assimetria: float = 1.1,
+           tamanho_lote: int = TAMANHO_LOTE, mostra_progresso: bool = False):
+    gerador = random.Random(semente)
+    ids_categoria = [uuid.UUID(int=gerador.getrandbits(128), version=4) for _ in range(categorias)]
+    with banco.unidade_de_trabalho(engine) as sessao:
+        linhas = []
+        for numero, id_categoria in enumerate(ids_categoria):
+            nome = f"{CATEGORIAS[numero % len(CATEGORIAS)]} {numero // len(CATEGORIAS) + 1}"
+            linhas.append({"id": id_categoria, "nome": nome, "nome_busca": normaliza(nome)})
+        sessao.execute(insert(Categoria), linhas)
+
+    # Peso da categoria de posição k proporcional a 1 / k^assimetria
+    pesos = list(accumulate(1 / (posicao ** assimetria) for posicao in range(1, categorias + 1)))
+    inicio = time.perf_counter()
+    gerados = 0
+    while gerados < produtos:
+        quantidade = min(tamanho_lote, produtos - gerados)
+        escolhidas = gerador.choices(ids_categoria, cum_weights=pesos, k=quantidade)
+        linhas, movimentos = [], []
+        for id_categoria in escolhidas:
+            nome = nome_produto(gerador)
+            sorteio = gerador.random()
+            if sorteio < 0.05:
+                qtd_estoque = 0
+            elif sorteio < 0.07:
+                qtd_estoque = -gerador.randint(1, 10)
+            else:
+                qtd_estoque = int(gerador.paretovariate(1.5) * 5)
+            id_produto = uuid.UUID(int=gerador.getrandbits(128), version=4)
+            linhas.append({"id": id_produto, "nome": nome, "nome_busca": normaliza(nome),
+                           "preco": Decimal(str(round(gerador.lognormvariate(3, 1), 2))),
+                           "estoque": qtd_estoque, "ativo": gerador.random() > 0.1, "categoria_id": id_categoria})
+            movimentos.append({"produto_id": id_produto, "tipo": estoque.INICIAL, "quantidade": qtd_estoque,
+                               "estoque_resultante": qtd_estoque})
+        with banco.unidade_de_trabalho(engine) as sessao:
+            sessao.execute(insert(Produto), linhas)
+            sessao.execute(insert(MovimentoEstoque), movimentos)
+        gerados += quantidade
+        if mostra_progresso:
+            duracao = time.perf_counter() - inicio
+            print(f"{gerados:>12,} produtos gerados ({gerados / duracao:,.0f} produtos/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um catálogo sintético")
+    parser.add_argument("--categorias", type=int, default=200)
+    parser.add_argument("--produtos", type=int, default=100000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--assimetria", type=float, default=1.1, help="expoente da distribuição Zipf")
+    parser.add_argument("--banco", help="URL do banco; por padrão, a da configuração (ver banco.py)")
+    args = parser.parse_args()
+
+    config = banco.carrega_configuracao()
+    if args.banco:
+        config["url"] = args.banco
+    engine = banco.cria_engine(config)
+    banco.prepara_banco(engine)
+    popula(engine, args.categorias, args.produtos, args.semente, args.assimetria, mostra_progresso=True)
+
+
+if __name__ == "__main__":
+    main()
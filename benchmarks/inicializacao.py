@@ -0,0 +1,82 @@
+# Tempo de inicialização do menu
+#
+# Mede, com python -X importtime em processos novos, o tempo de importação do main.py com as
+# ações do menu carregadas sob demanda (ver menu.carrega_acao) e com todos os módulos da
+# interface importados de antemão, como antes. Mostra a mediana de várias execuções, o tempo
+# total do processo e os módulos que deixam de ser carregados na inicialização.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.inicializacao --repeticoes 15
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+MODULOS_INTERFACE = ["app_produtos", "app_categorias", "app_estoque", "app_diagnostico"]
+
+CENARIOS = [
+    ("sob demanda", "import main"),
+    ("primeira ação", "import main, menu; menu.carrega_acao('app_produtos:lista_produtos')"),
+    ("tudo de antemão", f"import main, {', '.join(MODULOS_INTERFACE)}"),
+]
+
+
+def importtime(codigo: str):
+    # Devolve o tempo acumulado de cada módulo de primeiro nível e o próprio de cada módulo, em µs
+    saida = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], capture_output=True, text=True,
+                           check=True).stderr
+    acumulado, proprio = {}, {}
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        tempo_proprio, tempo_acumulado, nome = linha[len("import time:"):].split("|")
+        proprio[nome.strip()] = int(tempo_proprio)
+        if not nome[1:].startswith(" "):
+            acumulado[nome.strip()] = int(tempo_acumulado)
+    return acumulado, proprio
+
+
+def tempo_processo(codigo: str) -> float:
+    inicio = time.perf_counter()
+    subprocess.run([sys.executable, "-c", codigo], check=True)
+    return (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de importação do menu: carga sob demanda x antecipada")
+    parser.add_argument("--repeticoes", type=int, default=15)
+    parser.add_argument("--modulos", type=int, default=10, help="quantos módulos adiados mostrar")
+    args = parser.parse_args()
+
+    resultados = {}
+    proprios = {}
+    for nome, codigo in CENARIOS:
+        importacoes, processos = [], []
+        soma_proprio = defaultdict(list)
+        for _ in range(args.repeticoes):
+            acumulado, proprio = importtime(codigo)
+            importacoes.append(sum(acumulado.values()) / 1000)
+            processos.append(tempo_processo(codigo))
+            for modulo, tempo in proprio.items():
+                soma_proprio[modulo].append(tempo)
+        resultados[nome] = (statistics.median(importacoes), statistics.median(processos))
+        proprios[nome] = {modulo: statistics.median(tempos) for modulo, tempos in soma_proprio.items()}
+
+    print(f"{'Cenário':<18} {'importação (ms)':>16} {'processo (ms)':>14} {'módulos':>8}")
+    for nome, _ in CENARIOS:
+        importacao, processo = resultados[nome]
+        print(f"{nome:<18} {importacao:>16.1f} {processo:>14.1f} {len(proprios[nome]):>8}")
+
+    adiados = {modulo: tempo for modulo, tempo in proprios["tudo de antemão"].items()
+               if modulo not in proprios["sob demanda"]}
+    print(f"\n{len(adiados)} módulos não são mais importados na inicialização "
+          f"({sum(adiados.values()) / 1000:.1f} ms de tempo próprio); os mais pesados:")
+    for modulo, tempo in sorted(adiados.items(), key=lambda item: item[1], reverse=True)[:args.modulos]:
+        print(f"    {modulo:<40} {tempo / 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
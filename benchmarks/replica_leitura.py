@@ -0,0 +1,172 @@
+# Leituras e escritas concorrentes com e sem a réplica local
+#
+# Dois arquivos SQLite: o banco principal, com um catálogo sintético, e a réplica local de
+# replicas.py. Por --duracao segundos, threads de leitura abrem listagens, buscas e o painel
+# do estoque (banco.nova_sessao) enquanto threads de escrita vendem e compram produtos
+# (banco.unidade_de_trabalho). Cada escrita é seguida da leitura do mesmo produto na mesma
+# thread, que precisa ver o estoque gravado (leia o que escreveu). Roda com as leituras no
+# principal e na réplica, em cada journal_mode pedido, e mostra leituras e escritas por
+# segundo, as latências, os erros de banco travado e a fração das leituras feitas na réplica.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.replica_leitura --produtos 100000 --leitores 4 --escritores 2 --duracao 10
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+import banco
+import replicas
+import resumo
+import servico
+from benchmarks import gera_dados
+from benchmarks.executa import percentil
+from models import Produto
+
+TERMOS = ["caneta", "cafe azul", "monitor usb", "kit", "brasilis", "toalha"]
+
+
+class Resultado:
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.leituras, self.escritas = [], []
+        self.na_replica = 0
+        self.travados = 0
+        self.violacoes = 0
+
+    def registra(self, lista, duracao: float):
+        with self.trava:
+            lista.append(duracao)
+
+
+def leitura(engine, gerador: random.Random) -> bool:
+    # Devolve se a leitura foi feita numa réplica
+    with banco.nova_sessao(engine) as sessao:
+        sorteio = gerador.random()
+        if sorteio < 0.4:
+            servico.lista_produtos(sessao)
+        elif sorteio < 0.8:
+            servico.lista_produtos(sessao, gerador.choice(TERMOS))
+        else:
+            resumo.pagina_painel(engine.dialect).busca(sessao)
+        return sessao.get_bind() is not engine
+
+
+def escrita(engine, gerador: random.Random, ids: list) -> bool:
+    # Vende ou compra um produto e confere, numa sessão de leitura, se o estoque gravado é visto
+    id_produto = gerador.choice(ids)
+    with banco.unidade_de_trabalho(engine) as sessao:
+        if gerador.random() < 0.7:
+            gravado = servico.vende(sessao, id_produto, 1)
+        else:
+            gravado = servico.compra(sessao, id_produto, 1)
+    with banco.nova_sessao(engine) as sessao:
+        return sessao.scalar(select(Produto.estoque).where(Produto.id == id_produto)) == gravado
+
+
+def executa(config: dict, com_replica: bool, args, ids: list) -> dict:
+    engine = banco.cria_engine(config)
+    roteador = replicas.instala(engine, config) if com_replica else None
+    resultado = Resultado()
+    parar = threading.Event()
+
+    def leitor(semente: int):
+        gerador = random.Random(semente)
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            try:
+                na_replica = leitura(engine, gerador)
+            except OperationalError:
+                resultado.travados += 1
+                continue
+            resultado.registra(resultado.leituras, time.perf_counter() - inicio)
+            resultado.na_replica += na_replica
+
+    def escritor(semente: int):
+        gerador = random.Random(semente)
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            try:
+                confere = escrita(engine, gerador, ids)
+            except OperationalError:
+                resultado.travados += 1
+                continue
+            resultado.registra(resultado.escritas, time.perf_counter() - inicio)
+            resultado.violacoes += not confere
+
+    threads = ([threading.Thread(target=leitor, args=(numero,)) for numero in range(args.leitores)]
+               + [threading.Thread(target=escritor, args=(1000 + numero,)) for numero in range(args.escritores)])
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duracao)
+    parar.set()
+    for thread in threads:
+        thread.join()
+
+    copias = roteador.leitores[0].copias if roteador is not None else 0
+    if roteador is not None:
+        roteador.encerra()
+    engine.dispose()
+    return {"leituras": resultado.leituras, "escritas": resultado.escritas, "na_replica": resultado.na_replica,
+            "travados": resultado.travados, "violacoes": resultado.violacoes, "copias": copias}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leituras e escritas concorrentes: principal x réplica local")
+    parser.add_argument("--categorias", type=int, default=200)
+    parser.add_argument("--produtos", type=int, default=100000)
+    parser.add_argument("--leitores", type=int, default=4)
+    parser.add_argument("--escritores", type=int, default=2)
+    parser.add_argument("--duracao", type=float, default=10)
+    parser.add_argument("--journal", nargs="+", default=["WAL", "DELETE"], help="journal_mode do banco principal")
+    parser.add_argument("--defasagem", default="5")
+    parser.add_argument("--intervalo", default="1")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        gerado = os.path.join(diretorio, "gerado.sqlite3")
+        config = banco.carrega_configuracao()
+        config.update(url=f"sqlite+pysqlite:///{gerado}", replica_defasagem=args.defasagem,
+                      replica_intervalo=args.intervalo, leitores="")
+        print(f"Gerando catálogo com {args.produtos:,} produtos")
+        engine = banco.cria_engine(config)
+        banco.prepara_banco(engine)
+        gera_dados.popula(engine, args.categorias, args.produtos)
+        with banco.nova_sessao(engine) as sessao:
+            ids = sessao.scalars(select(Produto.id).where(Produto.ativo).limit(5000)).all()
+        engine.dispose()
+        with sqlite3.connect(gerado) as conexao:
+            conexao.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conexao.execute("PRAGMA journal_mode=DELETE")
+
+        print(f"{args.leitores} threads de leitura, {args.escritores} de escrita, {args.duracao:.0f}s por rodada\n")
+        print(f"{'journal':<8} {'leituras':<9} {'leit/s':>8} {'p50 ms':>7} {'p99 ms':>7} {'escr/s':>7} "
+              f"{'p99 ms':>7} {'travados':>9} {'réplica':>8} {'cópias':>7} {'violações':>10}")
+        for journal in args.journal:
+            for com_replica in (False, True):
+                rodada_dir = tempfile.mkdtemp(dir=diretorio)
+                arquivo = os.path.join(rodada_dir, "principal.sqlite3")
+                shutil.copyfile(gerado, arquivo)
+                rodada = dict(config, url=f"sqlite+pysqlite:///{arquivo}", journal_mode=journal,
+                              replica=os.path.join(rodada_dir, "replica.sqlite3") if com_replica else "")
+                medido = executa(rodada, com_replica, args, ids)
+
+                leituras, escritas = medido["leituras"], medido["escritas"]
+                fracao = medido["na_replica"] / len(leituras) if leituras else 0
+                print(f"{journal:<8} {'réplica' if com_replica else 'principal':<9} "
+                      f"{len(leituras) / args.duracao:>8,.0f} {percentil(leituras, 0.5) * 1000:>7.1f} "
+                      f"{percentil(leituras, 0.99) * 1000:>7.1f} {len(escritas) / args.duracao:>7,.0f} "
+                      f"{percentil(escritas, 0.99) * 1000 if escritas else 0:>7.1f} {medido['travados']:>9} "
+                      f"{fracao:>8.0%} {medido['copias']:>7} {medido['violacoes']:>10}")
+
+
+if __name__ == "__main__":
+    main()
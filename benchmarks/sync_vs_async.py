@@ -0,0 +1,109 @@
+# Comparação de requisições/s entre o acesso síncrono e o assíncrono
+#
+# A mesma carga mista (listagens, buscas, consultas, vendas, compras, reajustes e mudanças de
+# estado) é executada pelas operações de servico.py: no modo síncrono, por um pool de threads;
+# no modo assíncrono, por tarefas concorrentes de servico_async.py num único loop de eventos.
+#
+# Uso (a partir da raiz do projeto; requer aiosqlite):
+#     python -m benchmarks.sync_vs_async --produtos 20000 --requisicoes 4000 --concorrencia 16
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from sqlalchemy import select, func
+
+import banco
+import servico
+import servico_async
+from benchmarks import gera_dados
+from models import Produto
+
+TERMOS = ["", "caneta", "azul", "papel", "cx", "premium", "kit"]
+
+
+def gera_carga(requisicoes: int, ids_produto, gerador: random.Random):
+    carga = []
+    for _ in range(requisicoes):
+        sorteio = gerador.random()
+        id_produto = gerador.choice(ids_produto)
+        if sorteio < 0.45:
+            carga.append(("lista_produtos", (gerador.choice(TERMOS),)))
+        elif sorteio < 0.55:
+            carga.append(("lista_categorias", ("",)))
+        elif sorteio < 0.70:
+            carga.append(("obtem_produto", (id_produto,)))
+        elif sorteio < 0.82:
+            carga.append(("vende", (id_produto, gerador.randint(1, 3))))
+        elif sorteio < 0.92:
+            carga.append(("compra", (id_produto, gerador.randint(1, 10))))
+        elif sorteio < 0.97:
+            carga.append(("altera_preco", (id_produto, Decimal(gerador.randint(100, 10000)) / 100)))
+        else:
+            carga.append(("alterna_estado", (id_produto,)))
+    return carga
+
+
+def executa_sync(engine, carga, concorrencia: int) -> float:
+    def requisicao(operacao):
+        nome, args = operacao
+        with banco.unidade_de_trabalho(engine) as sessao:
+            getattr(servico, nome)(sessao, *args)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        list(executor.map(requisicao, carga))
+    return time.perf_counter() - inicio
+
+
+async def executa_async(engine, carga, concorrencia: int) -> float:
+    limite = asyncio.Semaphore(concorrencia)
+
+    async def requisicao(operacao):
+        nome, args = operacao
+        async with limite:
+            await getattr(servico_async, nome)(engine, *args)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(requisicao(operacao) for operacao in carga))
+    duracao = time.perf_counter() - inicio
+    await engine.dispose()
+    return duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Requisições/s: servico (threads) x servico_async (asyncio)")
+    parser.add_argument("--categorias", type=int, default=50)
+    parser.add_argument("--produtos", type=int, default=20000)
+    parser.add_argument("--requisicoes", type=int, default=4000)
+    parser.add_argument("--concorrencia", type=int, default=16)
+    args = parser.parse_args()
+
+    gerador = random.Random(42)
+    with tempfile.TemporaryDirectory() as diretorio:
+        config = banco.carrega_configuracao()
+        config["url"] = f"sqlite+pysqlite:///{os.path.join(diretorio, 'carga.sqlite3')}"
+        config["busy_timeout"] = "60000"
+        engine = banco.cria_engine(config)
+        banco.prepara_banco(engine)
+        gera_dados.popula(engine, args.categorias, args.produtos)
+        with banco.nova_sessao(engine) as sessao:
+            ids_produto = sessao.scalars(select(Produto.id).order_by(func.random()).limit(1000)).all()
+        carga = gera_carga(args.requisicoes, ids_produto, gerador)
+
+        duracao = executa_sync(engine, carga, args.concorrencia)
+        print(f"síncrono   ({args.concorrencia} threads): {len(carga) / duracao:8,.0f} requisições/s")
+        engine.dispose()
+
+        engine_async = servico_async.cria_engine_async(config)
+        duracao = asyncio.run(executa_async(engine_async, carga, args.concorrencia))
+        print(f"assíncrono ({args.concorrencia} tarefas): {len(carga) / duracao:8,.0f} requisições/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# Tamanho e velocidade dos UUIDs em texto x BLOB no SQLite
+#
+# Gera um catálogo sintético, recria-o no formato anterior (UUIDs como CHAR(32) com o
+# hexadecimal) e converte essa cópia com migra_uuid.py. Nos dois arquivos, compactados com
+# VACUUM, compara o tamanho total e o das tabelas e índices de produtos, e o tempo de buscas
+# por chave, buscas por chave estrangeira e junções. As consultas usam o sqlite3 diretamente,
+# para medir só o formato gravado, sem a conversão de tipos do SQLAlchemy.
+#
+# Uso (a partir da raiz do projeto):
+#     python -m benchmarks.uuid_compacto --produtos 100000
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from sqlalchemy import MetaData, Uuid, create_engine, select, func
+
+import banco
+import migra_uuid
+from benchmarks import gera_dados
+from benchmarks.executa import percentil
+from busca import instala_busca
+from models import Base, Categoria, Produto, UuidCompacto
+
+# (nome, comando, parâmetro: id de produto, id de categoria ou nenhum, repetições relativas)
+CONSULTAS = [
+    ("busca_por_id", "SELECT nome, preco, estoque FROM produtos WHERE id = ?", "produto", 1),
+    ("produtos_da_categoria", "SELECT count(*), sum(estoque) FROM produtos WHERE categoria_id = ?", "categoria", 1),
+    ("junta_um_produto", "SELECT p.nome, c.nome FROM produtos p JOIN categorias c ON c.id = p.categoria_id "
+                         "WHERE p.id = ?", "produto", 1),
+    ("junta_todos", "SELECT c.nome, count(*), sum(p.estoque) FROM produtos p JOIN categorias c "
+                    "ON c.id = p.categoria_id GROUP BY c.nome", None, 0.02),
+]
+
+
+def banco_em_texto(origem: str, destino: str):
+    # Copia o catálogo para o esquema anterior, com os UUIDs em texto, mantendo os rowids
+    metadados = MetaData()
+    colunas_uuid = {}
+    for tabela in Base.metadata.sorted_tables:
+        copia = tabela.to_metadata(metadados)
+        for coluna in copia.columns:
+            if isinstance(coluna.type, UuidCompacto):
+                coluna.type = Uuid(as_uuid=True)
+                colunas_uuid.setdefault(tabela.name, set()).add(coluna.name)
+    engine = create_engine(f"sqlite+pysqlite:///{destino}")
+    metadados.create_all(engine)
+    with engine.connect() as conexao:
+        conexao.exec_driver_sql(f"ATTACH DATABASE '{origem}' AS origem")
+        for tabela in metadados.sorted_tables:
+            colunas = [coluna.name for coluna in tabela.columns]
+            valores = [f"lower(hex({coluna}))" if coluna in colunas_uuid.get(tabela.name, ()) else coluna
+                       for coluna in colunas]
+            conexao.exec_driver_sql(f"INSERT INTO {tabela.name} (rowid, {', '.join(colunas)}) "
+                                    f"SELECT rowid, {', '.join(valores)} FROM origem.{tabela.name}")
+        conexao.commit()
+        conexao.exec_driver_sql("DETACH DATABASE origem")
+    instala_busca(engine, Categoria, Produto)
+    with engine.connect() as conexao:
+        conexao.exec_driver_sql("VACUUM")
+    engine.dispose()
+
+
+def tamanhos(arquivo: str) -> dict:
+    resultado = {"arquivo": os.path.getsize(arquivo)}
+    with sqlite3.connect(arquivo) as conexao:
+        try:
+            paginas = conexao.execute("SELECT name, sum(pgsize) FROM dbstat GROUP BY name").fetchall()
+        except sqlite3.OperationalError:
+            # SQLite compilado sem a tabela virtual dbstat
+            return resultado
+        indices = {nome for (nome,) in conexao.execute("SELECT name FROM sqlite_master "
+                                                       "WHERE type = 'index' AND tbl_name = 'produtos'")}
+    resultado["tabela produtos"] = sum(tamanho for nome, tamanho in paginas if nome == "produtos")
+    resultado["índices de produtos"] = sum(tamanho for nome, tamanho in paginas if nome in indices)
+    return resultado
+
+
+def mede(arquivo: str, converte, ids_produto, ids_categoria, repeticoes: int, gerador: random.Random) -> dict:
+    # converte: uuid.UUID -> valor gravado no arquivo (texto ou bytes)
+    resultado = {}
+    with sqlite3.connect(arquivo) as conexao:
+        for nome, comando, parametro, fator in CONSULTAS:
+            tempos = []
+            for _ in range(max(3, int(repeticoes * fator))):
+                if parametro == "produto":
+                    parametros = (converte(gerador.choice(ids_produto)),)
+                elif parametro == "categoria":
+                    parametros = (converte(gerador.choice(ids_categoria)),)
+                else:
+                    parametros = ()
+                inicio = time.perf_counter()
+                linhas = conexao.execute(comando, parametros).fetchall()
+                tempos.append((time.perf_counter() - inicio) * 1000)
+                if parametro == "produto" and not linhas:
+                    raise RuntimeError(f"{nome}: produto não encontrado em {arquivo}")
+            resultado[nome] = percentil(tempos, 0.50)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tamanho e velocidade dos UUIDs em texto x BLOB no SQLite")
+    parser.add_argument("--categorias", type=int, default=200)
+    parser.add_argument("--produtos", type=int, default=100000)
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    gerador = random.Random(args.semente)
+    with tempfile.TemporaryDirectory() as diretorio:
+        gerado = os.path.join(diretorio, "gerado.sqlite3")
+        texto = os.path.join(diretorio, "texto.sqlite3")
+        migrado = os.path.join(diretorio, "migrado.sqlite3")
+
+        print(f"Gerando catálogo com {args.produtos:,} produtos")
+        config = banco.carrega_configuracao()
+        config["url"] = f"sqlite+pysqlite:///{gerado}"
+        engine = banco.cria_engine(config)
+        banco.prepara_banco(engine)
+        gera_dados.popula(engine, args.categorias, args.produtos, args.semente)
+        with banco.nova_sessao(engine) as sessao:
+            ids_produto = sessao.scalars(select(Produto.id).order_by(func.random()).limit(5000)).all()
+            ids_categoria = sessao.scalars(select(Categoria.id)).all()
+        engine.dispose()
+
+        banco_em_texto(gerado, texto)
+        shutil.copyfile(texto, migrado)
+        config["url"] = f"sqlite+pysqlite:///{migrado}"
+        engine = banco.cria_engine(config)
+        inicio = time.perf_counter()
+        migra_uuid.migra(engine)
+        print(f"Migração de texto para BLOB: {time.perf_counter() - inicio:.2f} s")
+        engine.dispose()
+
+        antes, depois = tamanhos(texto), tamanhos(migrado)
+        print(f"\n{'Tamanho (KiB)':<26} {'texto':>10} {'BLOB':>10} {'razão':>7}")
+        for nome in antes:
+            print(f"{nome:<26} {antes[nome] / 1024:>10,.0f} {depois[nome] / 1024:>10,.0f} "
+                  f"{depois[nome] / antes[nome]:>6.2f}x")
+
+        tempos_texto = mede(texto, lambda valor: valor.hex, ids_produto, ids_categoria, args.repeticoes, gerador)
+        tempos_blob = mede(migrado, lambda valor: valor.bytes, ids_produto, ids_categoria, args.repeticoes, gerador)
+        print(f"\n{'Consulta (p50, ms)':<26} {'texto':>10} {'BLOB':>10} {'razão':>7}")
+        for nome in tempos_texto:
+            print(f"{nome:<26} {tempos_texto[nome]:>10.4f} {tempos_blob[nome]:>10.4f} "
+                  f"{tempos_blob[nome] / tempos_texto[nome]:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
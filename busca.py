@@ -0,0 +1,120 @@
+import unicodedata
+
+from sqlalchemy import (DDL, and_, event, inspect, literal_column, select, table, text, true, type_coerce,
+                        update)
+from sqlalchemy.types import NullType
+
+# Modulo de busca pelos nomes de produtos e categorias
+#
+# Cada tabela pesquisável tem uma coluna-sombra "nome_busca" com o nome normalizado
+# (sem acentos, minúsculo, espaços compactados) e indexada por B-tree. No SQLite, uma
+# tabela virtual FTS5 (tokenizador trigram) espelha essa coluna por meio de triggers,
+# permitindo buscas por trechos e por palavras sem varrer a tabela inteira.
+
+# Termos menores que um trigrama não podem ser pesquisados pelo FTS5 trigram
+TAMANHO_MINIMO_TRIGRAMA = 3
+
+
+def normaliza(texto):
+    if texto is None:
+        return None
+    sem_acentos = "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+    return " ".join(sem_acentos.casefold().split())
+
+
+def suporta_fts(dialeto) -> bool:
+    # O tokenizador trigram do FTS5 existe a partir do SQLite 3.34
+    return dialeto.name == "sqlite" and dialeto.dbapi.sqlite_version_info >= (3, 34, 0)
+
+
+def _ddl_fts(nome_tabela: str):
+    fts = f"{nome_tabela}_fts"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(nome_busca, content='{nome_tabela}', "
+        f"tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {nome_tabela} BEGIN "
+        f"INSERT INTO {fts}(rowid, nome_busca) VALUES (new.rowid, new.nome_busca); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {nome_tabela} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, nome_busca) VALUES ('delete', old.rowid, old.nome_busca); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF nome_busca ON {nome_tabela} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, nome_busca) VALUES ('delete', old.rowid, old.nome_busca); "
+        f"INSERT INTO {fts}(rowid, nome_busca) VALUES (new.rowid, new.nome_busca); END",
+    ]
+
+
+def _condicao_fts(ddl, alvo, bind, **kw) -> bool:
+    return suporta_fts(bind.dialect)
+
+
+def registra_fts(tabela):
+    # Cria a tabela FTS5 e os triggers de sincronização junto com a tabela principal
+    for comando in _ddl_fts(tabela.name):
+        event.listen(tabela, "after_create", DDL(comando).execute_if(callable_=_condicao_fts))
+    event.listen(tabela, "before_drop",
+                 DDL(f"DROP TABLE IF EXISTS {tabela.name}_fts").execute_if(callable_=_condicao_fts))
+
+
+def instala_busca(engine, *modelos):
+    # Prepara bancos criados antes da existência da busca: cria a coluna-sombra,
+    # preenche os valores que faltam e cria os índices. O FTS5 só é reconstruído se ele ou
+    # algum dos seus triggers faltava (banco antigo ou tabela recriada): com os triggers no
+    # lugar, ele já acompanha a tabela, e a reconstrução leva segundos em catálogos grandes.
+    with engine.begin() as conexao:
+        for modelo in modelos:
+            tabela = modelo.__table__
+            colunas = {coluna["name"] for coluna in inspect(conexao).get_columns(tabela.name)}
+            if "nome_busca" not in colunas:
+                conexao.execute(text(f"ALTER TABLE {tabela.name} ADD COLUMN nome_busca VARCHAR"))
+            # A chave é lida e comparada como o driver a devolve, sem a conversão do tipo da
+            # coluna: bancos antigos ainda guardam os UUIDs como texto (ver migra_uuid.py)
+            chave = type_coerce(tabela.c.id, NullType())
+            pendentes = conexao.execute(select(chave.label("id"), tabela.c.nome).where(tabela.c.nome_busca.is_(None)))
+            for pendente in pendentes.all():
+                conexao.execute(update(tabela).where(chave == pendente.id)
+                                .values(nome_busca=normaliza(pendente.nome)))
+            for indice in tabela.indexes:
+                indice.create(conexao, checkfirst=True)
+            if suporta_fts(conexao.dialect):
+                fts = f"{tabela.name}_fts"
+                existentes = set(conexao.scalars(text("SELECT name FROM sqlite_master WHERE name LIKE :prefixo"),
+                                                 {"prefixo": f"{fts}%"}))
+                if not {fts, f"{fts}_ai", f"{fts}_ad", f"{fts}_au"} <= existentes:
+                    for comando in _ddl_fts(tabela.name):
+                        conexao.execute(text(comando))
+                    conexao.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+def busca_por_nome(modelo, termo: str, dialeto):
+    # Devolve a condição de busca mais barata para o termo informado:
+    # - termo vazio: nenhuma restrição;
+    # - termo curto (menor que um trigrama): trecho na coluna-sombra, como nos demais termos
+    #   ("tv" encontra "Smart TV"); sem índice que ajude, a listagem percorre os nomes na ordem
+    #   do índice (nome, id) até completar a página;
+    # - demais termos no SQLite: cada palavra é procurada como trecho no FTS5, e palavras
+    #   curtas demais para o trigrama filtram apenas as linhas já encontradas;
+    # - outros bancos: trecho na coluna-sombra normalizada.
+    termo = normaliza(termo)
+    coluna = modelo.nome_busca
+    if not termo:
+        return true()
+
+    if len(termo) < TAMANHO_MINIMO_TRIGRAMA or not suporta_fts(dialeto):
+        return coluna.contains(termo, autoescape=True)
+
+    palavras = termo.split()
+    longas = [palavra for palavra in palavras if len(palavra) >= TAMANHO_MINIMO_TRIGRAMA]
+    curtas = [palavra for palavra in palavras if len(palavra) < TAMANHO_MINIMO_TRIGRAMA]
+    if not longas:
+        # Só palavras curtas, como "tv 4k": o nome inteiro ainda pode ser procurado como trecho
+        longas, curtas = [termo], []
+
+    nome_tabela = modelo.__table__.name
+    fts = f"{nome_tabela}_fts"
+    consulta = " ".join('"' + palavra.replace('"', '""') + '"' for palavra in longas)
+    encontrados = (select(literal_column("rowid"))
+                   .select_from(table(fts))
+                   .where(literal_column(fts).op("MATCH")(consulta)))
+    condicao = literal_column(f"{nome_tabela}.rowid").in_(encontrados)
+    for palavra in curtas:
+        condicao = and_(condicao, coluna.contains(palavra, autoescape=True))
+    return condicao
@@ -0,0 +1,176 @@
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+
+from models import Categoria, Produto
+
+# Cache de leitura (read-through) local ao processo, para categorias e fichas de produtos
+#
+# A ficha do produto (servico.obtem_produto) só traz campos que mudam pouco: nome, estado e
+# categoria. Preço e estoque, alterados a cada venda e por outros terminais, são sempre lidos
+# do banco (servico.obtem_saldo).
+# As entradas ficam em caches LRU de tamanho limitado. Toda escrita feita por uma Session
+# (pelo ORM ou por UPDATE/DELETE em massa) marca as chaves afetadas, que são descartadas no
+# after_commit; até lá, a própria sessão que escreveu não usa nem alimenta o cache.
+# Categorias mudam pouco: qualquer escrita numa categoria descarta as duas áreas inteiras,
+# já que o resumo do produto traz o nome da categoria e a remoção apaga os seus produtos.
+# Escritas feitas por outros processos não são vistas.
+
+TODOS = "*"
+
+
+class CacheLRU:
+    def __init__(self, tamanho_maximo: int):
+        self.tamanho_maximo = tamanho_maximo
+        self._entradas = OrderedDict()
+        self._trava = threading.Lock()
+        # Incrementada a cada invalidação: um valor lido do banco antes de uma invalidação
+        # concorrente não é guardado (ver guarda)
+        self.geracao = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+
+    def obtem(self, chave):
+        with self._trava:
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return True, self._entradas[chave]
+            self.falhas += 1
+            return False, None
+
+    def guarda(self, chave, valor, geracao: int):
+        with self._trava:
+            if geracao != self.geracao:
+                return
+            self._entradas[chave] = valor
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.tamanho_maximo:
+                self._entradas.popitem(last=False)
+                self.descartes += 1
+
+    def invalida(self, chave):
+        with self._trava:
+            self.geracao += 1
+            self._entradas.pop(chave, None)
+
+    def limpa(self):
+        with self._trava:
+            self.geracao += 1
+            self._entradas.clear()
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {"entradas": len(self._entradas), "tamanho_maximo": self.tamanho_maximo,
+                    "acertos": self.acertos, "falhas": self.falhas, "descartes": self.descartes,
+                    "taxa_acerto": self.acertos / consultas if consultas else 0.0}
+
+
+produtos = CacheLRU(10000)
+categorias = CacheLRU(1000)
+
+
+def configura(config: dict):
+    produtos.tamanho_maximo = int(config["cache_produtos"])
+    categorias.tamanho_maximo = int(config["cache_categorias"])
+
+
+def estatisticas() -> dict:
+    return {"produtos": produtos.estatisticas(), "categorias": categorias.estatisticas()}
+
+
+def limpa():
+    produtos.limpa()
+    categorias.limpa()
+
+
+def _pendentes(sessao: Session) -> dict:
+    return sessao.info.setdefault("cache_invalidar", {"produtos": set(), "categorias": set()})
+
+
+def _marca(sessao: Session, area: str, chave):
+    _pendentes(sessao)[area].add(chave)
+
+
+def invalida(sessao: Session, area: str, chave=TODOS):
+    # Para escritas que não passam pelo ORM (Connection.execute): descarta a chave, ou a área
+    # inteira, no commit da sessão
+    _marca(sessao, area, chave)
+
+
+def _pendente(sessao: Session, area: str, chave) -> bool:
+    pendentes = sessao.info.get("cache_invalidar")
+    return pendentes is not None and (TODOS in pendentes[area] or chave in pendentes[area])
+
+
+def _consulta(sessao: Session, area: str, lru: CacheLRU, chave, carrega):
+    if _pendente(sessao, area, chave):
+        return carrega()
+    geracao = lru.geracao
+    encontrado, valor = lru.obtem(chave)
+    if encontrado:
+        return valor
+    valor = carrega()
+    if valor is not None:
+        lru.guarda(chave, valor, geracao)
+    return valor
+
+
+def produto(sessao: Session, id_produto, carrega):
+    return _consulta(sessao, "produtos", produtos, id_produto, carrega)
+
+
+def categoria(sessao: Session, id_categoria, carrega):
+    return _consulta(sessao, "categorias", categorias, id_categoria, carrega)
+
+
+@event.listens_for(Session, "after_flush")
+def _apos_flush(sessao: Session, contexto):
+    # Objetos novos não precisam de tratamento: o cache não guarda consultas sem resultado
+    for objeto in list(sessao.dirty) + list(sessao.deleted):
+        if isinstance(objeto, Produto):
+            _marca(sessao, "produtos", objeto.id)
+        elif isinstance(objeto, Categoria):
+            _marca(sessao, "categorias", TODOS)
+            _marca(sessao, "produtos", TODOS)
+
+
+def _id_alvo(comando, tabela):
+    # Devolve o id quando o comando tem a forma "WHERE tabela.id = :valor"; senão, TODOS
+    condicao = comando.whereclause
+    if (isinstance(condicao, BinaryExpression) and condicao.operator is operators.eq
+            and getattr(condicao.left, "table", None) is tabela and condicao.left.key == "id"
+            and isinstance(condicao.right, BindParameter)):
+        return condicao.right.effective_value
+    return TODOS
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _apos_comando(estado):
+    if not (estado.is_update or estado.is_delete) or estado.bind_mapper is None:
+        return
+    classe = estado.bind_mapper.class_
+    if classe is Produto:
+        _marca(estado.session, "produtos", _id_alvo(estado.statement, Produto.__table__))
+    elif classe is Categoria:
+        _marca(estado.session, "categorias", TODOS)
+        _marca(estado.session, "produtos", TODOS)
+
+
+@event.listens_for(Session, "after_commit")
+def _apos_commit(sessao: Session):
+    pendentes = sessao.info.pop("cache_invalidar", None)
+    if pendentes is None:
+        return
+    for area, lru in (("produtos", produtos), ("categorias", categorias)):
+        if TODOS in pendentes[area]:
+            lru.limpa()
+        else:
+            for chave in pendentes[area]:
+                lru.invalida(chave)
@@ -0,0 +1,64 @@
+from sqlalchemy import and_, bindparam, or_
+from sqlalchemy.orm import Session
+
+# Consultas paginadas montadas uma vez
+#
+# Numa página de 20 linhas servida pelo índice (nome, id), montar o select(...), gerar a sua
+# chave de cache e procurá-la no compiled_cache da engine custa mais que a execução. Uma
+# Pagina guarda os dois comandos de uma consulta paginada por (nome, id), o da primeira página
+# e o das seguintes, com o início e o tamanho da página como parâmetros nomeados. O
+# SQLAlchemy memoriza a chave de cache de cada comando, e o SQL compilado fica no
+# compiled_cache, de modo que virar a página ou reabrir a listagem só troca os parâmetros.
+# As consultas sem termo de busca, que têm sempre a mesma forma, ficam guardadas por pronta();
+# as com termo, cujo SQL depende das palavras, valem para uma navegação.
+
+# Linhas por página quando quem busca não pede outro tamanho; ajustado pelo main.py a partir da
+# configuração (chave tamanho_pagina; ver banco.py) e lido a cada busca
+TAMANHO_PAGINA = 20
+
+
+class Pagina:
+    def __init__(self, query, coluna_nome, coluna_id):
+        self.query = query
+        self.coluna_nome = coluna_nome
+        self.coluna_id = coluna_id
+        self._primeira = self._seguintes = None
+
+    # Cada forma é montada no primeiro uso: uma busca com termo costuma ver só a primeira página
+    @property
+    def primeira(self):
+        if self._primeira is None:
+            self._primeira = (self.query.order_by(self.coluna_nome, self.coluna_id)
+                              .limit(bindparam("p_limite")))
+        return self._primeira
+
+    @property
+    def seguintes(self):
+        if self._seguintes is None:
+            nome, id_ = self.coluna_nome, self.coluna_id
+            self._seguintes = (self.query.where(or_(nome > bindparam("p_nome"),
+                                                    and_(nome == bindparam("p_nome"), id_ > bindparam("p_id"))))
+                               .order_by(nome, id_)
+                               .limit(bindparam("p_limite")))
+        return self._seguintes
+
+    def busca(self, sessao: Session, depois_de=None, tamanho: int = None):
+        # Devolve as linhas da página e se existe uma próxima (buscando uma linha a mais)
+        tamanho = tamanho or TAMANHO_PAGINA
+        if depois_de is None:
+            linhas = sessao.execute(self.primeira, {"p_limite": tamanho + 1}).all()
+        else:
+            nome, id_ = depois_de
+            linhas = sessao.execute(self.seguintes, {"p_nome": nome, "p_id": id_, "p_limite": tamanho + 1}).all()
+        return linhas[:tamanho], len(linhas) > tamanho
+
+
+_prontas = {}
+
+
+def pronta(chave, monta, coluna_nome, coluna_id) -> Pagina:
+    # A Pagina guardada com a chave; monta() devolve a consulta e só é chamada na primeira vez
+    pagina = _prontas.get(chave)
+    if pagina is None:
+        pagina = _prontas.setdefault(chave, Pagina(monta(), coluna_nome, coluna_id))
+    return pagina
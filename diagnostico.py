@@ -0,0 +1,188 @@
+import cProfile
+import io
+import json
+import pstats
+import re
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import banco
+
+# Instrumentação das ações do menu
+#
+# Enquanto uma ação é medida (ver mede), os eventos before/after_cursor_execute da engine
+# contam os comandos SQL e o tempo gasto no banco, guardando os mais lentos com os seus
+# parâmetros, e as linhas: as lidas dos SELECTs (e dos RETURNING), contadas no cursor à medida
+# que o resultado é percorrido, seja ele de entidades ou de tuplas (Row), e as alteradas pelos
+# INSERT/UPDATE/DELETE (rowcount). Os eventos do ORM contam os objetos que entraram no
+# identity map. Comandos com a mesma forma (o mesmo SQL, com as listas de parâmetros de IN
+# reduzidas a um só) executados mais de limite_n_mais_1 vezes na mesma ação geram um alerta
+# de possível N+1. Opcionalmente, a ação inteira roda sob o cProfile. As últimas medições
+# ficam em memória e podem ser exportadas em JSON.
+
+_medicao_atual = ContextVar("medicao_atual", default=None)
+
+HISTORICO = 50
+
+config = {"ativo": True, "limite_n_mais_1": 10, "comandos_lentos": 5, "perfil": False, "linhas_perfil": 20}
+historico = deque(maxlen=HISTORICO)
+
+_PARAMETROS = re.compile(r"\(\s*(\?|%\(\w+\)s|:\w+|%s)(\s*,\s*(\?|%\(\w+\)s|:\w+|%s))+\s*\)")
+_ESPACOS = re.compile(r"\s+")
+
+
+def forma(comando: str) -> str:
+    return _PARAMETROS.sub(r"(\1, ...)", _ESPACOS.sub(" ", comando).strip())
+
+
+def _resume_parametros(parametros, executemany: bool):
+    if executemany:
+        return {"linhas": len(parametros), "primeiras": [_resume_parametros(linha, False) for linha in parametros[:3]]}
+    if isinstance(parametros, dict):
+        return {chave: repr(valor)[:80] for chave, valor in parametros.items()}
+    return [repr(valor)[:80] for valor in parametros or ()]
+
+
+class Medicao:
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.inicio = datetime.now()
+        self.duracao_ms = 0.0
+        self.comandos = 0
+        self.tempo_banco_ms = 0.0
+        self.linhas_carregadas = 0
+        self.objetos_identidade = 0
+        self.formas = Counter()
+        self.lentos = []
+        self.alertas = []
+        self.perfil = None
+
+    def registra_comando(self, comando: str, parametros, executemany: bool, duracao_ms: float):
+        self.comandos += 1
+        self.tempo_banco_ms += duracao_ms
+        self.formas[forma(comando)] += 1
+        maximo = config["comandos_lentos"]
+        if len(self.lentos) < maximo or duracao_ms > self.lentos[-1]["duracao_ms"]:
+            self.lentos.append({"duracao_ms": duracao_ms, "sql": comando,
+                                "parametros": _resume_parametros(parametros, executemany)})
+            self.lentos.sort(key=lambda item: item["duracao_ms"], reverse=True)
+            del self.lentos[maximo:]
+
+    def encerra(self, duracao_ms: float):
+        self.duracao_ms = duracao_ms
+        limite = config["limite_n_mais_1"]
+        self.alertas = [{"execucoes": vezes, "sql": texto} for texto, vezes in self.formas.most_common()
+                        if vezes > limite]
+
+    def como_dict(self) -> dict:
+        return {"nome": self.nome, "inicio": self.inicio.isoformat(timespec="seconds"),
+                "duracao_ms": self.duracao_ms, "comandos": self.comandos, "tempo_banco_ms": self.tempo_banco_ms,
+                "linhas_carregadas": self.linhas_carregadas, "objetos_identidade": self.objetos_identidade,
+                "comandos_lentos": self.lentos, "possiveis_n_mais_1": self.alertas, "perfil": self.perfil}
+
+
+def configura(configuracao: dict):
+    config["ativo"] = banco.verdadeiro(configuracao["diagnostico"])
+    config["limite_n_mais_1"] = int(configuracao["limite_n_mais_1"])
+    config["comandos_lentos"] = int(configuracao["comandos_lentos"])
+    config["perfil"] = banco.verdadeiro(configuracao["perfil"])
+
+
+def instala(engine):
+    # Os eventos do ORM valem para todas as sessões; os da engine, apenas para a indicada
+    event.listen(engine, "before_cursor_execute", _antes_comando)
+    event.listen(engine, "after_cursor_execute", _apos_comando)
+
+
+def _antes_comando(conexao, cursor, comando, parametros, contexto, executemany):
+    if _medicao_atual.get() is not None:
+        conexao.info.setdefault("diagnostico_inicio", []).append(time.perf_counter())
+
+
+class _CursorContado:
+    # Repassa o cursor do driver, somando à medição as linhas buscadas pelo resultado
+    def __init__(self, cursor, medicao: Medicao):
+        self._cursor = cursor
+        self._medicao = medicao
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+    def __iter__(self):
+        for linha in self._cursor:
+            self._medicao.linhas_carregadas += 1
+            yield linha
+
+    def fetchone(self):
+        linha = self._cursor.fetchone()
+        if linha is not None:
+            self._medicao.linhas_carregadas += 1
+        return linha
+
+    def fetchmany(self, *args, **kwargs):
+        linhas = self._cursor.fetchmany(*args, **kwargs)
+        self._medicao.linhas_carregadas += len(linhas)
+        return linhas
+
+    def fetchall(self):
+        linhas = self._cursor.fetchall()
+        self._medicao.linhas_carregadas += len(linhas)
+        return linhas
+
+
+def _apos_comando(conexao, cursor, comando, parametros, contexto, executemany):
+    medicao = _medicao_atual.get()
+    inicios = conexao.info.get("diagnostico_inicio")
+    if medicao is None or not inicios:
+        return
+    duracao_ms = (time.perf_counter() - inicios.pop()) * 1000
+    medicao.registra_comando(comando, parametros, executemany, duracao_ms)
+    if cursor.description is None or executemany or contexto is None:
+        # Sem linhas a buscar (ou buscadas pelo próprio SQLAlchemy, em lotes de executemany)
+        medicao.linhas_carregadas += max(cursor.rowcount, 0)
+    else:
+        # O resultado é montado sobre contexto.cursor logo depois deste evento
+        contexto.cursor = _CursorContado(cursor, medicao)
+
+
+@event.listens_for(Session, "loaded_as_persistent")
+@event.listens_for(Session, "pending_to_persistent")
+def _no_identity_map(sessao, objeto):
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.objetos_identidade += 1
+
+
+@contextmanager
+def mede(nome: str):
+    if not config["ativo"]:
+        yield None
+        return
+    medicao = Medicao(nome)
+    token = _medicao_atual.set(medicao)
+    perfil = cProfile.Profile() if config["perfil"] else None
+    inicio = time.perf_counter()
+    try:
+        if perfil is not None:
+            perfil.enable()
+        yield medicao
+    finally:
+        if perfil is not None:
+            perfil.disable()
+            texto = io.StringIO()
+            pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(config["linhas_perfil"])
+            medicao.perfil = texto.getvalue()
+        _medicao_atual.reset(token)
+        medicao.encerra((time.perf_counter() - inicio) * 1000)
+        historico.append(medicao)
+
+
+def exporta(arquivo: str):
+    with open(arquivo, "w", encoding="utf-8") as saida:
+        json.dump([medicao.como_dict() for medicao in historico], saida, indent=2, ensure_ascii=False)
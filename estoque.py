@@ -0,0 +1,81 @@
+from sqlalchemy import select, func, update, insert, exists, literal, bindparam
+from sqlalchemy.orm import Session
+
+import cache
+from models import Produto, MovimentoEstoque
+
+# Movimentações de estoque
+#
+# O estoque nunca é lido, alterado em Python e gravado de volta: cada movimentação é um
+# único "UPDATE produtos SET estoque = estoque + :quantidade", que o banco aplica de forma
+# atômica mesmo com vários terminais vendendo o mesmo produto ao mesmo tempo. Na mesma
+# transação, a movimentação é registrada em movimentos_estoque.
+
+INICIAL = "I"
+COMPRA = "C"
+VENDA = "V"
+
+
+# Comandos montados uma vez e executados direto na conexão da sessão: cada venda não paga a
+# construção das expressões nem o caminho de UPDATE em massa do ORM
+_PRODUTOS = Produto.__table__
+_MOVIMENTA = (update(_PRODUTOS)
+              .where(_PRODUTOS.c.id == bindparam("p_id"), _PRODUTOS.c.removido_em.is_(None))
+              .values(estoque=func.coalesce(_PRODUTOS.c.estoque, 0) + bindparam("p_quantidade"))
+              .returning(_PRODUTOS.c.estoque))
+_REGISTRA = insert(MovimentoEstoque.__table__)
+
+
+def registra_movimento(sessao: Session, id_produto, quantidade: int, tipo: str, estoque_resultante: int):
+    sessao.connection().execute(_REGISTRA, {"produto_id": id_produto, "tipo": tipo, "quantidade": quantidade,
+                                            "estoque_resultante": estoque_resultante})
+
+
+def movimenta_estoque(sessao: Session, id_produto, quantidade: int, tipo: str):
+    # Devolve o estoque resultante, ou None se o produto não existe (ou está arquivado).
+    # A transação fica aberta; quem chama decide quando fazer o commit.
+    estoque_resultante = sessao.connection().execute(_MOVIMENTA, {"p_id": id_produto,
+                                                                  "p_quantidade": quantidade}).scalar_one_or_none()
+    if estoque_resultante is None:
+        return None
+    cache.invalida(sessao, "produtos", id_produto)
+    registra_movimento(sessao, id_produto, quantidade, tipo, estoque_resultante)
+    return estoque_resultante
+
+
+def compra(sessao: Session, id_produto, quantidade: int):
+    return movimenta_estoque(sessao, id_produto, quantidade, COMPRA)
+
+
+def vende(sessao: Session, id_produto, quantidade: int):
+    return movimenta_estoque(sessao, id_produto, -quantidade, VENDA)
+
+
+def reconstroi_estoque(sessao: Session, id_produto) -> int:
+    return sessao.execute(select(func.coalesce(func.sum(MovimentoEstoque.quantidade), 0))
+                          .where(MovimentoEstoque.produto_id == id_produto)).scalar_one()
+
+
+def registra_saldos_iniciais(sessao: Session) -> int:
+    # Para bancos anteriores ao livro de movimentações: registra o estoque atual como
+    # movimentação inicial dos produtos que ainda não têm nenhuma
+    sem_movimento = ~exists().where(MovimentoEstoque.produto_id == Produto.id)
+    atual = func.coalesce(Produto.estoque, 0)
+    resultado = sessao.execute(insert(MovimentoEstoque).from_select(
+        ["produto_id", "tipo", "quantidade", "estoque_resultante"],
+        select(Produto.id, literal(INICIAL), atual, atual).where(sem_movimento)))
+    return resultado.rowcount
+
+
+def audita_estoque(sessao: Session):
+    # Produtos cujo estoque difere da soma das movimentações registradas
+    soma = (select(MovimentoEstoque.produto_id, func.sum(MovimentoEstoque.quantidade).label("total"))
+            .group_by(MovimentoEstoque.produto_id)
+            .subquery())
+    total = func.coalesce(soma.c.total, 0)
+    atual = func.coalesce(Produto.estoque, 0)
+    query = (select(Produto.id, Produto.nome, atual.label("estoque"), total.label("estoque_movimentos"))
+             .outerjoin(soma, soma.c.produto_id == Produto.id)
+             .where(atual != total)
+             .order_by(Produto.nome, Produto.id))
+    return sessao.execute(query).all()
@@ -0,0 +1,256 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from sqlalchemy import and_, func, or_, select
+
+import banco
+from models import Categoria, Produto, visivel
+
+# Exportação em fluxo de produtos e categorias para CSV ou NDJSON
+#
+# As linhas são lidas do banco em blocos (stream_results + yield_per) e escritas no arquivo
+# à medida que chegam, sem montar o catálogo inteiro em memória. Cada bloco é formatado coluna
+# a coluna, com um conversor escolhido uma vez pelo tipo da coluna.
+#
+# Com --partes N, a exportação é dividida em N faixas contíguas de (nome, id), a ordem do
+# arquivo. Cada faixa é exportada por um processo com a sua própria engine para um arquivo
+# parcial, e os parciais são concatenados na ordem das faixas: o resultado é idêntico ao da
+# exportação em um processo só. Se não for possível criar processos, as faixas são exportadas
+# em threads, que dividem o tempo do banco mas não o da formatação.
+#
+# Cada faixa é lida na sua própria transação. Para que o arquivo seja uma fotografia de um
+# mesmo instante, um banco SQLite é antes copiado (pela API de backup, numa única transação de
+# leitura) para o diretório temporário, e as faixas são lidas da cópia. Nos demais bancos, as
+# faixas veem o banco em instantes diferentes: exporte em partes só com o banco sem escritas,
+# ou a partir de uma cópia (um backup restaurado, por exemplo).
+#
+# Uso:
+#     python exportacao.py produtos produtos.csv
+#     python exportacao.py produtos produtos.csv --partes 0
+#     python exportacao.py categorias categorias.ndjson --banco sqlite+pysqlite:///outro.sqlite3
+
+TAMANHO_BLOCO = 5000
+
+CAMPOS_PRODUTOS = ["id", "nome", "categoria", "preco", "estoque", "ativo", "dta_cadastro", "dta_atualizacao"]
+CAMPOS_CATEGORIAS = ["id", "nome", "dta_cadastro", "dta_atualizacao"]
+
+
+def query_produtos():
+    return (select(Produto.id, Produto.nome, Categoria.nome.label("categoria"), Produto.preco, Produto.estoque,
+                   Produto.ativo, Produto.dta_cadastro, Produto.dta_atualizacao)
+            .outerjoin(Categoria, Produto.categoria_id == Categoria.id)
+            .where(visivel(Produto))
+            .order_by(Produto.nome, Produto.id))
+
+
+def query_categorias():
+    return (select(Categoria.id, Categoria.nome, Categoria.dta_cadastro, Categoria.dta_atualizacao)
+            .where(visivel(Categoria))
+            .order_by(Categoria.nome, Categoria.id))
+
+
+# entidade: (consulta, campos, modelo com as colunas nome e id que definem a ordem)
+ENTIDADES = {
+    "produtos": (query_produtos, CAMPOS_PRODUTOS, Produto),
+    "categorias": (query_categorias, CAMPOS_CATEGORIAS, Categoria),
+}
+
+
+def conversores(query) -> list:
+    # Um conversor por coluna da consulta, ou None para os valores escritos como vêm
+    lista = []
+    for coluna in query.selected_columns:
+        try:
+            tipo = coluna.type.python_type
+        except NotImplementedError:
+            tipo = object
+        if tipo in (str, int, float, bool):
+            lista.append(None)
+        elif hasattr(tipo, "isoformat"):
+            lista.append(tipo.isoformat)
+        else:
+            lista.append(str)
+    return lista
+
+
+def formata_bloco(linhas, conversao: list):
+    # Converte o bloco coluna a coluna, sem testar o tipo de cada valor
+    colunas = list(zip(*linhas))
+    for indice, converte in enumerate(conversao):
+        if converte is not None:
+            colunas[indice] = [None if valor is None else converte(valor) for valor in colunas[indice]]
+    return zip(*colunas)
+
+
+def escreve(resultado, campos, conversao, saida, formato: str, cabecalho: bool = True) -> int:
+    total = 0
+    escritor = csv.writer(saida)
+    if formato == "csv" and cabecalho:
+        escritor.writerow(campos)
+    for bloco in resultado.partitions():
+        linhas = formata_bloco(bloco, conversao)
+        if formato == "csv":
+            escritor.writerows(linhas)
+        else:
+            saida.writelines(json.dumps(dict(zip(campos, linha)), ensure_ascii=False) + "\n" for linha in linhas)
+        total += len(bloco)
+    return total
+
+
+def faixa(query, modelo, inicio=None, fim=None):
+    # Linhas com (nome, id) em [inicio, fim); None deixa o lado aberto
+    if inicio is not None:
+        nome, id_ = inicio
+        query = query.where(or_(modelo.nome > nome, and_(modelo.nome == nome, modelo.id >= id_)))
+    if fim is not None:
+        nome, id_ = fim
+        query = query.where(or_(modelo.nome < nome, and_(modelo.nome == nome, modelo.id < id_)))
+    return query
+
+
+def limites(engine, entidade: str, partes: int) -> list:
+    # As chaves (nome, id) que dividem a entidade em partes de tamanhos parecidos. Cada busca
+    # parte do limite anterior, de modo que o índice (nome, id) é percorrido uma vez só.
+    _, _, modelo = ENTIDADES[entidade]
+    with engine.connect() as conexao:
+        total = conexao.scalar(select(func.count()).select_from(modelo).where(visivel(modelo)))
+        passo = -(-total // partes)
+        chaves, anterior = [], None
+        while len(chaves) < partes - 1 and passo:
+            query = faixa(select(modelo.nome, modelo.id).where(visivel(modelo)), modelo, anterior)
+            chave = conexao.execute(query.order_by(modelo.nome, modelo.id).offset(passo).limit(1)).first()
+            if chave is None:
+                break
+            anterior = tuple(chave)
+            chaves.append(anterior)
+    return chaves
+
+
+def exporta_faixa(config: dict, entidade: str, formato: str, arquivo: str, inicio=None, fim=None) -> int:
+    # Executada em cada processo ou thread: abre a sua própria engine e escreve um arquivo sem cabeçalho
+    monta, campos, modelo = ENTIDADES[entidade]
+    query = faixa(monta(), modelo, inicio, fim)
+    engine = banco.cria_engine(config)
+    try:
+        with engine.connect() as conexao, open(arquivo, "w", newline="", encoding="utf-8") as saida:
+            resultado = conexao.execution_options(stream_results=True, yield_per=TAMANHO_BLOCO).execute(query)
+            return escreve(resultado, campos, conversores(query), saida, formato, cabecalho=False)
+    finally:
+        engine.dispose()
+
+
+def _em_processos(tarefas, partes: int):
+    # None se não for possível criar os processos neste ambiente; erros das próprias faixas seguem adiante
+    try:
+        executor = ProcessPoolExecutor(partes)
+    except (OSError, NotImplementedError):
+        return None
+    with executor:
+        try:
+            futuros = [executor.submit(exporta_faixa, *tarefa) for tarefa in tarefas]
+        except OSError:
+            return None
+        try:
+            return [futuro.result() for futuro in futuros]
+        except BrokenProcessPool:
+            return None
+
+
+def copia_sqlite(origem: str, destino: str, espera: float):
+    # Cópia do banco num único instante, mesmo com escritas em andamento
+    conexao_origem, conexao_destino = sqlite3.connect(origem, timeout=espera), sqlite3.connect(destino)
+    try:
+        conexao_origem.backup(conexao_destino)
+    finally:
+        conexao_origem.close()
+        conexao_destino.close()
+
+
+def exporta_em_partes(engine, entidade: str, arquivo: str, formato: str, partes: int, threads: bool = False):
+    # Devolve (linhas exportadas, "processos" ou "threads")
+    _, campos, _ = ENTIDADES[entidade]
+    config = banco.carrega_configuracao()
+    config["url"] = engine.url.render_as_string(hide_password=False)
+    diretorio = os.path.dirname(os.path.abspath(arquivo))
+    with tempfile.TemporaryDirectory(dir=diretorio) as temporario:
+        origem = engine
+        if engine.url.get_backend_name() == "sqlite":
+            copia = os.path.join(temporario, "copia.sqlite3")
+            copia_sqlite(engine.url.database, copia, int(config["busy_timeout"]) / 1000)
+            config["url"] = f"sqlite+pysqlite:///{copia}"
+            origem = banco.cria_engine(config)
+        chaves = limites(origem, entidade, partes)
+        if origem is not engine:
+            origem.dispose()
+        faixas = list(zip([None] + chaves, chaves + [None]))
+        parciais = [os.path.join(temporario, f"parte{numero:04}") for numero in range(len(faixas))]
+        tarefas = [(config, entidade, formato, parcial, inicio, fim)
+                   for parcial, (inicio, fim) in zip(parciais, faixas)]
+        totais, modo = None, "processos"
+        if not threads:
+            totais = _em_processos(tarefas, len(tarefas))
+        if totais is None:
+            modo = "threads"
+            with ThreadPoolExecutor(len(tarefas)) as executor:
+                totais = list(executor.map(lambda tarefa: exporta_faixa(*tarefa), tarefas))
+
+        with open(arquivo, "w", newline="", encoding="utf-8") as saida:
+            if formato == "csv":
+                csv.writer(saida).writerow(campos)
+            for parcial in parciais:
+                with open(parcial, encoding="utf-8", newline="") as entrada:
+                    shutil.copyfileobj(entrada, saida, 1024 * 1024)
+    return sum(totais), modo
+
+
+def exporta(engine, entidade: str, arquivo: str, formato: str = None, partes: int = 1, threads: bool = False):
+    # Devolve a quantidade de linhas exportadas; partes=0 usa uma parte por núcleo
+    formato = formato or ("csv" if arquivo.lower().endswith(".csv") else "ndjson")
+    partes = partes or os.cpu_count() or 1
+    if engine.url.get_backend_name() == "sqlite" and engine.url.database in (None, "", ":memory:"):
+        partes = 1
+
+    inicio = time.perf_counter()
+    if partes > 1:
+        total, modo = exporta_em_partes(engine, entidade, arquivo, formato, partes, threads)
+        descricao = f" em {partes} partes ({modo})"
+    else:
+        monta, campos, _ = ENTIDADES[entidade]
+        query = monta()
+        with engine.connect() as conexao, open(arquivo, "w", newline="", encoding="utf-8") as saida:
+            resultado = conexao.execution_options(stream_results=True, yield_per=TAMANHO_BLOCO).execute(query)
+            total = escreve(resultado, campos, conversores(query), saida, formato)
+        descricao = ""
+    duracao = time.perf_counter() - inicio
+    print(f"{total:,} linhas de {entidade} exportadas{descricao} em {duracao:.2f}s "
+          f"({total / duracao if duracao else 0:,.0f} linhas/s)")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta produtos ou categorias para CSV ou NDJSON")
+    parser.add_argument("entidade", choices=["produtos", "categorias"])
+    parser.add_argument("arquivo")
+    parser.add_argument("--formato", choices=["csv", "ndjson"])
+    parser.add_argument("--banco", help="URL do banco; por padrão, a da configuração (ver banco.py)")
+    parser.add_argument("--partes", type=int, default=1,
+                        help="faixas exportadas em paralelo, cada uma num processo; 0 para uma por núcleo")
+    parser.add_argument("--threads", action="store_true", help="exporta as partes em threads, não em processos")
+    args = parser.parse_args()
+
+    config = banco.carrega_configuracao()
+    if args.banco:
+        config["url"] = args.banco
+    exporta(banco.cria_engine(config), args.entidade, args.arquivo, args.formato, args.partes, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import uuid
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+import banco
+import estoque
+import servico
+from busca import normaliza
+from models import Categoria, Produto, MovimentoEstoque, visivel
+
+# Importação em massa do catálogo a partir de CSV ou NDJSON
+#
+# Cada linha traz nome, categoria, preco, estoque e, opcionalmente, ativo. O arquivo é lido
+# em fluxo, em lotes: as categorias são resolvidas (ou criadas) por nome através de um cache
+# em memória e os produtos de cada lote são inseridos com um único executemany, seguido de um
+# commit. Linhas inválidas (JSON malformado, nome ou categoria ausentes, preço ou estoque que
+# não são números) são relatadas com o número da linha e ignoradas, sem interromper a carga.
+# O progresso fica num arquivo de checkpoint ao lado da origem, o que permite retomar a carga
+# após uma falha sem duplicar produtos.
+#
+# Uso:
+#     python importacao.py catalogo.csv --lote 5000
+#     python importacao.py catalogo.ndjson --banco sqlite+pysqlite:///outro.sqlite3 --retomar
+#     python importacao.py catalogo.csv --erros rejeitadas.ndjson
+
+TAMANHO_LOTE = 5000
+
+
+class RegistroInvalido(ValueError):
+    pass
+
+
+def le_registros(arquivo: str, formato: str = None):
+    # (número da linha, registro); linhas que não puderam ser lidas vêm com a exceção no lugar do registro
+    formato = formato or ("csv" if arquivo.lower().endswith(".csv") else "ndjson")
+    with open(arquivo, newline="", encoding="utf-8") as entrada:
+        if formato == "csv":
+            leitor = csv.DictReader(entrada)
+            for registro in leitor:
+                yield leitor.line_num, registro
+        else:
+            for numero, linha in enumerate(entrada, start=1):
+                if not linha.strip():
+                    continue
+                try:
+                    yield numero, json.loads(linha)
+                except json.JSONDecodeError as erro:
+                    yield numero, RegistroInvalido(f"JSON inválido: {erro}")
+
+
+def _ativo(valor) -> bool:
+    if valor is None or valor == "":
+        return True
+    if isinstance(valor, bool):
+        return valor
+    return str(valor).strip().lower() in ("1", "s", "sim", "t", "true", "y", "yes")
+
+
+def _texto(registro: dict, campo: str) -> str:
+    valor = registro.get(campo)
+    if valor is None or not str(valor).strip():
+        raise RegistroInvalido(f"o campo '{campo}' é obrigatório")
+    return " ".join(str(valor).split())
+
+
+def _numero(registro: dict, campo: str, converte):
+    # Campos numéricos ausentes valem zero
+    valor = registro.get(campo)
+    if valor is None or str(valor).strip() == "":
+        return converte("0")
+    try:
+        return converte(str(valor).strip())
+    except (ValueError, InvalidOperation):
+        raise RegistroInvalido(f"{campo} inválido: {valor!r}") from None
+
+
+def _preco(valor: str) -> Decimal:
+    preco = Decimal(valor)
+    if not preco.is_finite() or preco < 0:
+        raise ValueError(valor)
+    return servico.centavos(preco)
+
+
+def valida(registro) -> dict:
+    # Os campos do produto, sem id e categoria_id, mais o nome da categoria
+    if not isinstance(registro, dict):
+        raise RegistroInvalido("a linha não é um objeto JSON")
+    nome = _texto(registro, "nome")
+    return {"nome": nome, "nome_busca": normaliza(nome), "preco": _numero(registro, "preco", _preco),
+            "estoque": _numero(registro, "estoque", int), "ativo": _ativo(registro.get("ativo")),
+            "categoria": _texto(registro, "categoria")}
+
+
+class CacheCategorias:
+    # Nome normalizado -> id de todas as categorias não arquivadas; as que faltam são criadas em lote
+
+    def __init__(self, sessao: Session):
+        self.ids = {nome_busca: id_categoria for id_categoria, nome_busca
+                    in sessao.execute(select(Categoria.id, Categoria.nome_busca).where(visivel(Categoria)))}
+
+    def resolve(self, sessao: Session, nomes) -> dict:
+        novas = {}
+        for nome in nomes:
+            chave = normaliza(nome)
+            if chave not in self.ids and chave not in novas:
+                novas[chave] = {"id": uuid.uuid4(), "nome": " ".join(nome.split()), "nome_busca": chave}
+        if novas:
+            sessao.execute(insert(Categoria), list(novas.values()))
+            for chave, categoria in novas.items():
+                self.ids[chave] = categoria["id"]
+        return self.ids
+
+
+def _checkpoint(arquivo: str) -> str:
+    return arquivo + ".checkpoint"
+
+
+def _le_checkpoint(arquivo: str):
+    try:
+        with open(_checkpoint(arquivo), encoding="utf-8") as entrada:
+            return json.load(entrada)
+    except FileNotFoundError:
+        return None
+
+
+def _grava_checkpoint(arquivo: str, carga: uuid.UUID, linhas: int, verificar_ate: int):
+    # linhas: já gravadas; verificar_ate: até onde podem existir linhas gravadas depois do checkpoint
+    temporario = _checkpoint(arquivo) + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as saida:
+        json.dump({"carga": str(carga), "linhas": linhas, "verificar_ate": verificar_ate}, saida)
+    os.replace(temporario, _checkpoint(arquivo))
+
+
+def importa(engine, arquivo: str, formato: str = None, tamanho_lote: int = TAMANHO_LOTE, retomar: bool = False,
+            falha=None):
+    # Devolve a quantidade de produtos importados. falha(linha, registro, mensagem) é chamada a
+    # cada linha inválida; por padrão, a linha é relatada na saída de erros.
+    if falha is None:
+        def falha(linha, registro, mensagem):
+            print(f"linha {linha}: {mensagem}", file=sys.stderr)
+
+    checkpoint = _le_checkpoint(arquivo) if retomar else None
+    if checkpoint is None:
+        carga, ja_processadas, verificar_ate = uuid.uuid4(), 0, 0
+    else:
+        # Pode ter havido falha entre o commit de um lote e a gravação do checkpoint: até o fim
+        # daquele lote, do tamanho usado na carga interrompida, os registros podem já estar gravados
+        carga, ja_processadas = uuid.UUID(checkpoint["carga"]), checkpoint["linhas"]
+        verificar_ate = checkpoint["verificar_ate"]
+        print(f"Retomando a carga a partir da linha {ja_processadas + 1}")
+
+    registros = islice(le_registros(arquivo, formato), ja_processadas, None)
+    processadas, importados, rejeitados = ja_processadas, 0, 0
+    inicio = time.perf_counter()
+    with banco.nova_sessao(engine, escrita=True) as sessao:
+        categorias = CacheCategorias(sessao)
+        while True:
+            lote = list(islice(registros, tamanho_lote))
+            if not lote:
+                break
+            validos = []
+            for numero, (linha, registro) in enumerate(lote, start=processadas + 1):
+                try:
+                    if isinstance(registro, Exception):
+                        raise registro
+                    validos.append((numero, valida(registro)))
+                except RegistroInvalido as erro:
+                    rejeitados += 1
+                    falha(linha, registro, str(erro))
+            ids_categoria = categorias.resolve(sessao, {produto["categoria"] for _, produto in validos})
+
+            produtos, movimentos = [], []
+            for numero, produto in validos:
+                # O id depende só da carga e da posição do registro: ao retomar, registros já
+                # gravados são reconhecidos
+                id_produto = uuid.uuid5(carga, str(numero))
+                categoria = produto.pop("categoria")
+                produtos.append(dict(produto, id=id_produto, categoria_id=ids_categoria[normaliza(categoria)]))
+                movimentos.append({"produto_id": id_produto, "tipo": estoque.INICIAL, "quantidade": produto["estoque"],
+                                   "estoque_resultante": produto["estoque"]})
+
+            if processadas < verificar_ate:
+                existentes = set(sessao.scalars(select(Produto.id)
+                                                .where(Produto.id.in_([produto["id"] for produto in produtos]))))
+                produtos = [produto for produto in produtos if produto["id"] not in existentes]
+                movimentos = [movimento for movimento in movimentos if movimento["produto_id"] not in existentes]
+
+            if produtos:
+                sessao.execute(insert(Produto), produtos)
+                sessao.execute(insert(MovimentoEstoque), movimentos)
+            sessao.commit()
+
+            processadas += len(lote)
+            importados += len(produtos)
+            verificar_ate = max(verificar_ate, processadas + tamanho_lote)
+            _grava_checkpoint(arquivo, carga, processadas, verificar_ate)
+            duracao = time.perf_counter() - inicio
+            print(f"{processadas:>12,} linhas processadas ({importados / duracao:,.0f} produtos/s)")
+
+    if os.path.exists(_checkpoint(arquivo)):
+        os.remove(_checkpoint(arquivo))
+    duracao = time.perf_counter() - inicio
+    print(f"{importados:,} produtos importados e {rejeitados:,} linhas rejeitadas em {duracao:.2f}s "
+          f"({importados / duracao if duracao else 0:,.0f} produtos/s)")
+    return importados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa produtos em massa a partir de CSV ou NDJSON")
+    parser.add_argument("arquivo")
+    parser.add_argument("--formato", choices=["csv", "ndjson"])
+    parser.add_argument("--banco", help="URL do banco; por padrão, a da configuração (ver banco.py)")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE)
+    parser.add_argument("--retomar", action="store_true", help="continua uma carga interrompida")
+    parser.add_argument("--erros", help="grava as linhas rejeitadas neste arquivo NDJSON")
+    args = parser.parse_args()
+
+    config = banco.carrega_configuracao()
+    if args.banco:
+        config["url"] = args.banco
+    engine = banco.cria_engine(config)
+    banco.prepara_banco(engine)
+    erros = open(args.erros, "w", encoding="utf-8") if args.erros else None
+
+    def falha(linha, registro, mensagem):
+        print(f"linha {linha}: {mensagem}", file=sys.stderr)
+        if erros is not None:
+            original = registro if isinstance(registro, dict) else None
+            erros.write(json.dumps({"linha": linha, "erro": mensagem, "registro": original}, ensure_ascii=False,
+                                   default=str) + "\n")
+
+    try:
+        importa(engine, args.arquivo, args.formato, args.lote, args.retomar, falha)
+    finally:
+        if erros is not None:
+            erros.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import argparse
+import csv
+import json
+import sys
+import time
+import uuid
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from sqlalchemy import or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+import banco
+import cache
+import servico
+from busca import normaliza
+from models import Categoria, Produto, visivel
+from repreco import novo_preco
+
+# Modo de comandos em lote, sem o menu
+#
+# Lê um fluxo de comandos (NDJSON ou CSV, de um arquivo ou da entrada padrão), um por linha,
+# com o campo "acao" e os campos da ação:
+#     vende / compra   produto, quantidade
+#     preco            produto, preco (novo preço) ou percentual (reajuste)
+#     alterna          produto (ativa ou desativa)
+#     adiciona         nome, categoria, preco e, opcionalmente, estoque
+# Produtos e categorias são indicados pelo id ou pelo nome. Os comandos são agrupados em
+# transações de tamanho configurável; no início de cada uma, todos os produtos e categorias
+# citados são resolvidos por uma única consulta. Cada comando roda num savepoint: um comando
+# com erro é desfeito e relatado (na saída de erros e, opcionalmente, num arquivo NDJSON com
+# o comando original) sem interromper os demais.
+#
+# Uso:
+#     python lote.py vendas.ndjson --transacao 1000
+#     python lote.py - --formato csv --erros falhas.ndjson < vendas.csv
+
+TAMANHO_TRANSACAO = 1000
+
+# Nomes alternativos das ações, comuns em exportações de PDV
+SINONIMOS = {"sell": "vende", "venda": "vende", "buy": "compra", "reprice": "preco", "toggle": "alterna",
+             "add": "adiciona"}
+
+
+class ComandoInvalido(ValueError):
+    pass
+
+
+def le_comandos(entrada, formato: str = "ndjson"):
+    # (número da linha, comando); linhas que não puderam ser lidas vêm com a exceção no lugar do comando
+    if formato == "csv":
+        # A linha 1 é o cabeçalho
+        yield from enumerate(csv.DictReader(entrada), start=2)
+        return
+    for numero, linha in enumerate(entrada, start=1):
+        if not linha.strip():
+            continue
+        try:
+            yield numero, json.loads(linha)
+        except json.JSONDecodeError as erro:
+            yield numero, ComandoInvalido(f"JSON inválido: {erro}")
+
+
+def _campo(comando: dict, nome: str):
+    valor = comando.get(nome)
+    if valor is None or str(valor).strip() == "":
+        raise ComandoInvalido(f"o campo '{nome}' é obrigatório")
+    return valor
+
+
+def _inteiro(comando: dict, nome: str, minimo: int = None) -> int:
+    valor = _campo(comando, nome)
+    try:
+        inteiro = int(str(valor).strip())
+    except ValueError:
+        raise ComandoInvalido(f"{nome} inválido: {valor!r}") from None
+    if minimo is not None and inteiro < minimo:
+        raise ComandoInvalido(f"{nome} deve ser no mínimo {minimo}: {inteiro}")
+    return inteiro
+
+
+def _decimal(comando: dict, nome: str) -> Decimal:
+    valor = _campo(comando, nome)
+    try:
+        numero = Decimal(str(valor).strip().replace(",", "."))
+    except InvalidOperation:
+        raise ComandoInvalido(f"{nome} inválido: {valor!r}") from None
+    if not numero.is_finite():
+        raise ComandoInvalido(f"{nome} inválido: {valor!r}")
+    return numero
+
+
+def _chave(valor):
+    # Referência a um produto ou categoria: o UUID, se for um, ou o nome normalizado
+    try:
+        return uuid.UUID(str(valor).strip())
+    except ValueError:
+        return normaliza(str(valor))
+
+
+class Referencias:
+    # Produtos e categorias citados numa transação, resolvidos por uma consulta para cada tabela.
+    # Nomes repetidos em mais de um produto são ambíguos; para as categorias, vale a primeira
+    # em ordem de nome.
+
+    AMBIGUO = object()
+
+    def __init__(self, sessao: Session, comandos):
+        produtos = {_chave(comando["produto"]) for comando in comandos if comando.get("produto")}
+        categorias = {_chave(comando["categoria"]) for comando in comandos if comando.get("categoria")}
+        self.produtos = self._resolve(sessao, Produto, produtos)
+        self.categorias = self._resolve(sessao, Categoria, categorias, primeiro=True)
+
+    def _resolve(self, sessao: Session, modelo, chaves, primeiro: bool = False) -> dict:
+        if not chaves:
+            return {}
+        ids = [chave for chave in chaves if isinstance(chave, uuid.UUID)]
+        nomes = [chave for chave in chaves if isinstance(chave, str)]
+        query = (select(modelo.id, modelo.nome_busca)
+                 .where(visivel(modelo), or_(modelo.id.in_(ids), modelo.nome_busca.in_(nomes)))
+                 .order_by(modelo.nome, modelo.id))
+        resolvidos = {}
+        for id_item, nome_busca in sessao.execute(query):
+            resolvidos[id_item] = id_item
+            if nome_busca in chaves:
+                self._registra(resolvidos, nome_busca, id_item, primeiro)
+        return resolvidos
+
+    def _registra(self, resolvidos: dict, nome_busca: str, id_item, primeiro: bool = False):
+        if nome_busca not in resolvidos:
+            resolvidos[nome_busca] = id_item
+        elif not primeiro and resolvidos[nome_busca] != id_item:
+            resolvidos[nome_busca] = self.AMBIGUO
+
+    def _obtem(self, resolvidos: dict, comando: dict, campo: str, nao_encontrado: str):
+        valor = _campo(comando, campo)
+        id_item = resolvidos.get(_chave(valor))
+        if id_item is None:
+            raise ComandoInvalido(f"{nao_encontrado}: {valor!r}")
+        if id_item is self.AMBIGUO:
+            raise ComandoInvalido(f"há mais de um {campo} com o nome {valor!r}; use o id")
+        return id_item
+
+    def produto(self, comando: dict):
+        return self._obtem(self.produtos, comando, "produto", "produto não encontrado")
+
+    def categoria(self, comando: dict):
+        return self._obtem(self.categorias, comando, "categoria", "categoria não encontrada")
+
+    def novo_produto(self, nome: str, id_produto):
+        # Produtos criados na transação podem ser citados pelos comandos seguintes
+        self.produtos[id_produto] = id_produto
+        self._registra(self.produtos, normaliza(nome), id_produto)
+
+
+def _vende(sessao: Session, comando: dict, referencias: Referencias):
+    if servico.vende(sessao, referencias.produto(comando), _inteiro(comando, "quantidade", 1)) is None:
+        raise ComandoInvalido("produto não encontrado")
+
+
+def _compra(sessao: Session, comando: dict, referencias: Referencias):
+    if servico.compra(sessao, referencias.produto(comando), _inteiro(comando, "quantidade", 1)) is None:
+        raise ComandoInvalido("produto não encontrado")
+
+
+def _preco(sessao: Session, comando: dict, referencias: Referencias):
+    id_produto = referencias.produto(comando)
+    if comando.get("percentual") not in (None, ""):
+        atual = sessao.execute(select(Produto.preco).where(Produto.id == id_produto)).scalar_one()
+        if atual is None:
+            raise ComandoInvalido("o produto não tem preço para ser reajustado")
+        preco = novo_preco(atual, _decimal(comando, "percentual"))
+    else:
+        preco = _decimal(comando, "preco")
+    if preco < 0:
+        raise ComandoInvalido(f"o preço não pode ser negativo: {preco}")
+    if not servico.altera_preco(sessao, id_produto, preco):
+        raise ComandoInvalido("produto não encontrado")
+
+
+def _alterna(sessao: Session, comando: dict, referencias: Referencias):
+    if servico.alterna_estado(sessao, referencias.produto(comando)) is None:
+        raise ComandoInvalido("produto não encontrado")
+
+
+def _adiciona(sessao: Session, comando: dict, referencias: Referencias):
+    nome = " ".join(str(_campo(comando, "nome")).split())
+    preco = _decimal(comando, "preco")
+    if preco < 0:
+        raise ComandoInvalido(f"o preço não pode ser negativo: {preco}")
+    qtd_estoque = _inteiro(comando, "estoque") if comando.get("estoque") not in (None, "") else 0
+    id_produto = servico.adiciona_produto(sessao, referencias.categoria(comando), nome, preco, qtd_estoque)
+    if id_produto is None:
+        raise ComandoInvalido("categoria não encontrada")
+    referencias.novo_produto(nome, id_produto)
+
+
+ACOES = {"vende": _vende, "compra": _compra, "preco": _preco, "alterna": _alterna, "adiciona": _adiciona}
+
+
+def _acao(comando) -> str:
+    if not isinstance(comando, dict):
+        raise ComandoInvalido("o comando deve ser um objeto")
+    acao = str(_campo(comando, "acao")).strip().lower()
+    acao = SINONIMOS.get(acao, acao)
+    if acao not in ACOES:
+        raise ComandoInvalido(f"ação desconhecida: {acao!r}")
+    return acao
+
+
+def executa(engine, comandos, tamanho_transacao: int = TAMANHO_TRANSACAO, falha=None, progresso=None) -> dict:
+    # comandos: (número da linha, comando), como os de le_comandos. falha(numero, comando, mensagem)
+    # é chamada a cada comando com erro; progresso(resultado), a cada transação.
+    # Devolve os totais: processados, executados, falhas, por ação e a duração em segundos.
+    resultado = {"processados": 0, "executados": 0, "falhas": 0, "acoes": Counter(), "duracao": 0.0}
+    inicio = time.perf_counter()
+
+    def registra_falha(numero, comando, mensagem):
+        resultado["falhas"] += 1
+        if falha is not None:
+            falha(numero, comando, mensagem)
+
+    comandos = iter(comandos)
+    while True:
+        trecho = list(islice(comandos, tamanho_transacao))
+        if not trecho:
+            break
+        acoes = []
+        for numero, comando in trecho:
+            try:
+                if isinstance(comando, Exception):
+                    raise comando
+                acoes.append(_acao(comando))
+            except ComandoInvalido as erro:
+                acoes.append(erro)
+        with banco.unidade_de_trabalho(engine) as sessao:
+            referencias = Referencias(sessao, [comando for (_, comando), acao in zip(trecho, acoes)
+                                               if not isinstance(acao, Exception)])
+            for (numero, comando), acao in zip(trecho, acoes):
+                try:
+                    if isinstance(acao, Exception):
+                        raise acao
+                    with sessao.begin_nested():
+                        ACOES[acao](sessao, comando, referencias)
+                except (ComandoInvalido, SQLAlchemyError) as erro:
+                    registra_falha(numero, comando, str(erro).splitlines()[0])
+                else:
+                    resultado["executados"] += 1
+                    resultado["acoes"][acao] += 1
+        resultado["processados"] += len(trecho)
+        resultado["duracao"] = time.perf_counter() - inicio
+        if progresso is not None:
+            progresso(resultado)
+    resultado["duracao"] = time.perf_counter() - inicio
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa comandos em lote (NDJSON ou CSV), sem o menu")
+    parser.add_argument("arquivo", help="arquivo de comandos; '-' para a entrada padrão")
+    parser.add_argument("--formato", choices=["csv", "ndjson"])
+    parser.add_argument("--banco", help="URL do banco; por padrão, a da configuração (ver banco.py)")
+    parser.add_argument("--transacao", type=int, default=TAMANHO_TRANSACAO, help="comandos por transação")
+    parser.add_argument("--erros", help="grava os comandos com erro neste arquivo NDJSON")
+    args = parser.parse_args()
+
+    config = banco.carrega_configuracao()
+    if args.banco:
+        config["url"] = args.banco
+    cache.configura(config)
+    engine = banco.cria_engine(config)
+    banco.prepara_banco(engine)
+
+    formato = args.formato or ("csv" if args.arquivo.lower().endswith(".csv") else "ndjson")
+    entrada = sys.stdin if args.arquivo == "-" else open(args.arquivo, newline="", encoding="utf-8")
+    erros = open(args.erros, "w", encoding="utf-8") if args.erros else None
+
+    def falha(numero, comando, mensagem):
+        print(f"linha {numero}: {mensagem}", file=sys.stderr)
+        if erros is not None:
+            original = comando if isinstance(comando, dict) else None
+            erros.write(json.dumps({"linha": numero, "erro": mensagem, "comando": original}, ensure_ascii=False,
+                                   default=str) + "\n")
+
+    def progresso(resultado):
+        print(f"{resultado['processados']:>12,} comandos processados "
+              f"({resultado['processados'] / resultado['duracao']:,.0f} comandos/s)")
+
+    try:
+        resultado = executa(engine, le_comandos(entrada, formato), args.transacao, falha, progresso)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if erros is not None:
+            erros.close()
+    duracao = resultado["duracao"]
+    por_acao = ", ".join(f"{acao}: {quantidade:,}" for acao, quantidade in sorted(resultado["acoes"].items()))
+    print(f"{resultado['executados']:,} comandos executados e {resultado['falhas']:,} com erro em {duracao:.2f}s "
+          f"({resultado['processados'] / duracao if duracao else 0:,.0f} comandos/s)")
+    if por_acao:
+        print(f"Por ação: {por_acao}")
+    sys.exit(1 if resultado["falhas"] else 0)
+
+
+if __name__ == "__main__":
+    main()
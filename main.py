@@ -1,22 +1,42 @@
-from sqlalchemy import create_engine
-
-import app_categorias
-import app_produtos
+import banco
+import cache
+import consultas
+import diagnostico
+import replicas
+import servico
 from menu import menu
 
 if __name__ == "__main__":
-    engine = create_engine("sqlite+pysqlite:///test.sqlite3", echo=False)
+    config = banco.carrega_configuracao()
+    consultas.TAMANHO_PAGINA = int(config["tamanho_pagina"])
+    servico.ARQUIVA_REMOVIDOS = banco.verdadeiro(config["arquivar_removidos"])
+    cache.configura(config)
+    diagnostico.configura(config)
+    engine = banco.cria_engine(config)
+    banco.prepara_banco(engine)
+    diagnostico.instala(engine)
+    roteador = replicas.instala(engine, config)
+    if roteador is not None:
+        for engine_leitura in roteador.engines_leitura:
+            diagnostico.instala(engine_leitura)
 
-    opcoes = [{"texto": "Listar os produtos cadastrados", "acao": app_produtos.lista_produtos},
-              {"texto": "Listar os produtos sem estoque", "acao": app_produtos.lista_produtos_sem_estoque},
-              {"texto": "Listar as categorias cadastradas", "acao": app_categorias.lista_categorias},
-              {"texto": "Adiciona nova categoria", "acao": app_categorias.adiciona_categoria},
-              {"texto": "Adicionar novo produto", "acao": app_produtos.adiciona_produto},
-              {"texto": "Alterar um produto", "acao": app_produtos.altera_produto},
-              {"texto": "Vende um produto", "acao": app_produtos.vende_produto},
-              {"texto": "Compra um produto", "acao": app_produtos.compra_produto},
-              {"texto": "Alterar o preço de um produto", "acao": app_produtos.alterar_preco_produto},
-              {"texto": "Corrigir todos os preços por um percental", "acao": app_produtos.alterar_preco_todos_produto},
-              {"texto": "Alterar o estado de um produto", "acao": app_produtos.mudar_estado_produto},
-              {"texto": "Remover uma categoria e produtos relacionados", "acao": app_categorias.remove_categoria}, ]
+    opcoes = [{"texto": "Listar os produtos cadastrados", "acao": "app_produtos:lista_produtos"},
+              {"texto": "Listar os produtos sem estoque", "acao": "app_produtos:lista_produtos_sem_estoque"},
+              {"texto": "Listar as categorias cadastradas", "acao": "app_categorias:lista_categorias"},
+              {"texto": "Painel do estoque por categoria", "acao": "app_estoque:painel_estoque"},
+              {"texto": "Adiciona nova categoria", "acao": "app_categorias:adiciona_categoria"},
+              {"texto": "Adicionar novo produto", "acao": "app_produtos:adiciona_produto"},
+              {"texto": "Alterar um produto", "acao": "app_produtos:altera_produto"},
+              {"texto": "Vende um produto", "acao": "app_produtos:vende_produto"},
+              {"texto": "Compra um produto", "acao": "app_produtos:compra_produto"},
+              {"texto": "Alterar o preço de um produto", "acao": "app_produtos:alterar_preco_produto"},
+              {"texto": "Corrigir todos os preços por um percental",
+               "acao": "app_produtos:alterar_preco_todos_produto"},
+              {"texto": "Desfazer um reajuste de preços", "acao": "app_produtos:desfaz_reajuste_precos"},
+              {"texto": "Alterar o estado de um produto", "acao": "app_produtos:mudar_estado_produto"},
+              {"texto": "Remover uma categoria e produtos relacionados", "acao": "app_categorias:remove_categoria"},
+              {"texto": "Verificar o resumo do estoque", "acao": "app_estoque:verifica_resumo_estoque"},
+              {"texto": "Auditar o estoque pelas movimentações", "acao": "app_estoque:audita_estoque"},
+              {"texto": "Diagnóstico das últimas ações", "acao": "app_diagnostico:mostra_diagnostico",
+               "medir": False}, ]
     menu(opcoes, engine)
@@ -1,8 +1,19 @@
+import importlib
+
 from rich.console import Console
 from rich.prompt import IntPrompt
 
-import app_categorias  # type: ignore
-import app_produtos  # type: ignore
+import diagnostico
+
+
+def carrega_acao(referencia):
+    # As ações do menu são indicadas como "modulo:funcao" e o módulo só é importado quando a
+    # opção é escolhida pela primeira vez (os módulos da interface carregam o rich.table, o
+    # rich.progress etc.); funções já carregadas são aceitas como estão
+    if callable(referencia):
+        return referencia
+    nome_modulo, nome_funcao = referencia.split(":")
+    return getattr(importlib.import_module(nome_modulo), nome_funcao)
 
 
 def menu(opcoes, engine):
@@ -20,5 +31,13 @@ def menu(opcoes, engine):
             continue
         if escolha == 0:
             break
-        opcoes[escolha - 1]["acao"](engine, console)
+        opcao = opcoes[escolha - 1]
+        opcao["acao"] = carrega_acao(opcao["acao"])
+        if not opcao.get("medir", True):
+            opcao["acao"](engine, console)
+            continue
+        with diagnostico.mede(opcao["texto"]) as medicao:
+            opcao["acao"](engine, console)
+        if medicao is not None:
+            carrega_acao("app_diagnostico:resumo_acao")(console, medicao)
     return
@@ -0,0 +1,82 @@
+import argparse
+import os
+import sqlite3
+import time
+
+from sqlalchemy import inspect
+
+import banco
+from models import Base
+
+# Migração dos UUIDs de bancos SQLite antigos
+#
+# Até esta versão, as chaves (e as chaves estrangeiras, os lotes de reajuste etc.) eram
+# gravadas como texto hexadecimal de 32 caracteres; agora são BLOBs de 16 bytes (ver
+# models.UuidCompacto). A conversão em si é feita por banco.prepara_banco, que recria as
+# tabelas desatualizadas; este script faz antes uma cópia de segurança do arquivo e, depois,
+# confere as chaves estrangeiras, compacta o arquivo com VACUUM e mostra o ganho de espaço.
+#
+# Uso (a partir da raiz do projeto):
+#     python migra_uuid.py --banco sqlite:///test.sqlite3
+
+
+def tabelas_em_texto(engine) -> list:
+    with engine.connect() as conexao:
+        existentes = set(inspect(conexao).get_table_names())
+        return [tabela.name for tabela in Base.metadata.sorted_tables
+                if tabela.name in existentes and banco._uuids_em_texto(conexao, tabela)]
+
+
+def copia_seguranca(engine, destino: str):
+    # API de backup do SQLite: cópia consistente mesmo com o banco em WAL
+    with engine.connect() as conexao, sqlite3.connect(destino) as copia:
+        conexao.connection.driver_connection.backup(copia)
+
+
+def migra(engine, copia: str = None) -> dict:
+    # Devolve as tabelas convertidas e o tamanho do arquivo antes e depois, em bytes
+    arquivo = engine.url.database
+    tabelas = tabelas_em_texto(engine)
+    if not tabelas:
+        return {"tabelas": [], "antes": os.path.getsize(arquivo), "depois": os.path.getsize(arquivo)}
+    if copia:
+        copia_seguranca(engine, copia)
+    antes = os.path.getsize(arquivo)
+    banco.prepara_banco(engine)
+    # O VACUUM não roda dentro de uma transação
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexao:
+        problemas = conexao.exec_driver_sql("PRAGMA foreign_key_check").all()
+        if problemas:
+            raise RuntimeError(f"{len(problemas)} referências inválidas após a migração: {problemas[:5]}")
+        conexao.exec_driver_sql("VACUUM")
+        # Em WAL, as páginas compactadas só chegam ao arquivo principal no checkpoint
+        conexao.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    return {"tabelas": tabelas, "antes": antes, "depois": os.path.getsize(arquivo)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte os UUIDs de um banco SQLite antigo de texto para BLOB")
+    parser.add_argument("--banco", help="URL do banco; por padrão, a da configuração (ver banco.py)")
+    parser.add_argument("--sem-copia", action="store_true", help="não faz a cópia de segurança do arquivo")
+    args = parser.parse_args()
+
+    config = banco.carrega_configuracao()
+    if args.banco:
+        config["url"] = args.banco
+    engine = banco.cria_engine(config)
+    if engine.dialect.name != "sqlite":
+        print("Apenas bancos SQLite guardam UUIDs como texto; nada a fazer")
+        return
+    copia = None if args.sem_copia else f"{engine.url.database}.{time.strftime('%Y%m%d%H%M%S')}.bak"
+    resultado = migra(engine, copia)
+    if not resultado["tabelas"]:
+        print("O banco já guarda os UUIDs como BLOB; nada a fazer")
+        return
+    if copia:
+        print(f"Cópia de segurança em {copia}")
+    print(f"Tabelas convertidas: {', '.join(resultado['tabelas'])}")
+    print(f"Tamanho do arquivo: {resultado['antes'] / 1024:,.0f} KiB -> {resultado['depois'] / 1024:,.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,69 @@
 import uuid
 
-from sqlalchemy import Column, Integer, ForeignKey, String, Boolean, func, DateTime, DECIMAL, Uuid
-from sqlalchemy.orm import DeclarativeBase, relationship
+from sqlalchemy import Column, Integer, ForeignKey, String, Boolean, func, DateTime, DECIMAL, Uuid, Index, text
+from sqlalchemy.orm import DeclarativeBase, relationship, validates
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+from busca import normaliza, registra_fts
 
 
 # Modulo com as classes POPO do projeto
 # Plain Old Python Object
 
+class UuidCompacto(TypeDecorator):
+    # uuid.UUID no Python; no SQLite, gravado como BLOB de 16 bytes em vez do texto de 32
+    # caracteres do Uuid padrão (chaves, índices e junções com a metade do tamanho). Nos
+    # demais bancos, o tipo UUID nativo. Bancos antigos são convertidos por migra_uuid.py.
+    impl = Uuid
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(LargeBinary(16))
+        return dialect.type_descriptor(Uuid(as_uuid=True))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != "sqlite":
+            return value
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        return value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name != "sqlite":
+            return value
+        return uuid.UUID(bytes=value)
+
+
 class Base(DeclarativeBase):
     pass
 
 
 class Categoria(Base):
     __tablename__ = "categorias"
+    # Ordenação e paginação por chave (nome, id), apenas das categorias não arquivadas
+    __table_args__ = (Index("ix_categorias_visiveis_nome_id", "nome", "id",
+                            sqlite_where=text("removido_em IS NULL"), postgresql_where=text("removido_em IS NULL")),)
 
-    id = (Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4))
+    id = (Column(UuidCompacto(), primary_key=True, default=uuid.uuid4))
     nome = (Column(String, nullable=False))
+    nome_busca = (Column(String, nullable=False, index=True))
     dta_cadastro = (Column(DateTime, server_default=func.now(), nullable=False))
     dta_atualizacao = (Column(DateTime, onupdate=func.now(), default=func.now(), nullable=False))
+    # Preenchida quando a categoria é arquivada em vez de removida
+    removido_em = (Column(DateTime))
 
     # https://docs.sqlalchemy.org/en/20/orm/queryguide/relationships.html
-    lista_de_produtos = relationship("Produto", back_populates="categoria", lazy="selectin",
-                                     cascade="all, delete-orphan")
+    # Os produtos só são carregados quando alguém acessa a lista; contagens são feitas no banco.
+    # A remoção dos produtos junto com a categoria fica a cargo do banco (ON DELETE CASCADE):
+    # passive_deletes evita carregar e apagar os produtos um a um.
+    lista_de_produtos = relationship("Produto", back_populates="categoria", lazy="select",
+                                     cascade="all, delete-orphan", passive_deletes=True)
+
+    @validates("nome")
+    def _valida_nome(self, chave, nome):
+        self.nome_busca = normaliza(nome)
+        return nome
 
     def __repr__(self) -> str:
         return (f"Categoria(id={self.id!r}, "
@@ -30,19 +72,35 @@ class Categoria(Base):
 
 class Produto(Base):
     __tablename__ = "produtos"
+    # Ordenação e paginação por chave (nome, id), apenas dos produtos não arquivados
+    # O segundo índice contém só os produtos sem estoque, já na ordem da listagem deles; a
+    # consulta precisa repetir a condição literalmente (ver servico.filtra_produtos)
+    __table_args__ = (Index("ix_produtos_visiveis_nome_id", "nome", "id",
+                            sqlite_where=text("removido_em IS NULL"), postgresql_where=text("removido_em IS NULL")),
+                      Index("ix_produtos_sem_estoque", "ativo", "nome", "id",
+                            sqlite_where=text("removido_em IS NULL AND estoque <= 0"),
+                            postgresql_where=text("removido_em IS NULL AND estoque <= 0")))
 
-    id = (Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4))
+    id = (Column(UuidCompacto(), primary_key=True, default=uuid.uuid4))
     nome = Column(String, nullable=False)
+    nome_busca = Column(String, nullable=False, index=True)
     preco = Column(DECIMAL(10, 2), default=0.00)
     estoque = Column(Integer, default=0)
     ativo = Column(Boolean, default=True)
     dta_cadastro = Column(DateTime, server_default=func.now())
     dta_atualizacao = Column(DateTime, onupdate=func.now(), default=func.now(), nullable=False)
-    categoria_id = Column(Uuid(as_uuid=True), ForeignKey("categorias.id"))
+    categoria_id = Column(UuidCompacto(), ForeignKey("categorias.id", ondelete="CASCADE"), index=True)
+    # Preenchida quando o produto é arquivado em vez de removido
+    removido_em = Column(DateTime)
 
     # https://docs.sqlalchemy.org/en/20/orm/queryguide/relationships.html
     categoria = relationship("Categoria", back_populates="lista_de_produtos")
 
+    @validates("nome")
+    def _valida_nome(self, chave, nome):
+        self.nome_busca = normaliza(nome)
+        return nome
+
     def __repr__(self) -> str:
         return (f"Produto(id={self.id!r}, "
                 f"Nome={self.nome!r}, "
@@ -50,3 +108,90 @@ class Produto(Base):
                 f"Ativo={self.ativo}, "
                 f"Estoque={self.estoque}, "
                 f"Categoria={self.categoria_id})")
+
+
+class MovimentoEstoque(Base):
+    # Livro de movimentações: apenas inserções, uma linha por alteração de estoque.
+    # A soma das quantidades de um produto reconstrói o seu estoque atual.
+    __tablename__ = "movimentos_estoque"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    produto_id = Column(UuidCompacto(), ForeignKey("produtos.id", ondelete="CASCADE"), nullable=False,
+                        index=True)
+    tipo = Column(String(1), nullable=False)
+    quantidade = Column(Integer, nullable=False)
+    estoque_resultante = Column(Integer, nullable=False)
+    dta_movimento = Column(DateTime, server_default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return (f"MovimentoEstoque(id={self.id!r}, "
+                f"Produto={self.produto_id}, "
+                f"Tipo={self.tipo}, "
+                f"Quantidade={self.quantidade}, "
+                f"Estoque={self.estoque_resultante})")
+
+
+class HistoricoPreco(Base):
+    # Uma linha por alteração de preço feita por um reajuste (ver repreco.py). As linhas de um
+    # mesmo reajuste compartilham o lote, que permite auditá-lo e desfazê-lo.
+    __tablename__ = "historico_precos"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    lote = Column(UuidCompacto(), nullable=False, index=True)
+    produto_id = Column(UuidCompacto(), ForeignKey("produtos.id", ondelete="CASCADE"), nullable=False,
+                        index=True)
+    preco_anterior = Column(DECIMAL(10, 2), nullable=False)
+    preco_novo = Column(DECIMAL(10, 2), nullable=False)
+    # Percentual aplicado, ou nulo quando a linha desfaz o lote indicado em lote_desfeito
+    percentual = Column(DECIMAL(10, 4))
+    lote_desfeito = Column(UuidCompacto(), index=True)
+    dta_alteracao = Column(DateTime, server_default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return (f"HistoricoPreco(id={self.id!r}, "
+                f"Lote={self.lote}, "
+                f"Produto={self.produto_id}, "
+                f"De=R$ {self.preco_anterior:.2f}, "
+                f"Para=R$ {self.preco_novo:.2f})")
+
+
+class ResumoEstoque(Base):
+    # Totais de estoque dos produtos ativos de cada categoria, mantidos pelo banco a cada
+    # alteração de produto (ver resumo.py). O valor fica em centavos, para que as somas e
+    # subtrações incrementais sejam exatas.
+    __tablename__ = "resumo_estoque"
+
+    categoria_id = Column(UuidCompacto(), ForeignKey("categorias.id", ondelete="CASCADE"), primary_key=True)
+    produtos_ativos = Column(Integer, nullable=False, default=0)
+    unidades = Column(Integer, nullable=False, default=0)
+    valor_centavos = Column(Integer, nullable=False, default=0)
+    sem_estoque = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return (f"ResumoEstoque(Categoria={self.categoria_id}, "
+                f"Ativos={self.produtos_ativos}, "
+                f"Unidades={self.unidades}, "
+                f"Valor=R$ {self.valor_centavos / 100:.2f}, "
+                f"SemEstoque={self.sem_estoque})")
+
+
+class VersaoDados(Base):
+    # Uma linha só, com quantas migrações de dados (ver banco.MIGRACOES_DADOS) o banco já recebeu
+    __tablename__ = "versao_dados"
+
+    id = Column(Integer, primary_key=True)
+    versao = Column(Integer, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"VersaoDados(Versao={self.versao})"
+
+
+def visivel(modelo):
+    # Condição das linhas não arquivadas; as listagens e consultas usam sempre esta mesma
+    # forma, que é a condição dos índices parciais acima
+    return modelo.removido_em.is_(None)
+
+
+# Tabelas FTS5 (SQLite) para as buscas por nome; ver busca.py
+registra_fts(Categoria.__table__)
+registra_fts(Produto.__table__)
@@ -0,0 +1,62 @@
+from rich.console import Console
+from rich.prompt import Prompt
+
+import banco
+from consultas import Pagina
+
+# Paginação por chave (keyset) sobre (nome, id): cada página é buscada a partir da última
+# linha da página anterior, usando o índice (nome, id), sem OFFSET e sem manter as linhas
+# já exibidas em memória.
+
+
+def navega(engine, console: Console, query, coluna_nome, coluna_id, cria_tabela, adiciona_linha,
+           tamanho_pagina: int = None, msg_cancelar: str = None, msg_prompt: str = None):
+    # Exibe a consulta página a página, permitindo avançar e voltar.
+    # cria_tabela(numero_pagina) devolve uma Table vazia e adiciona_linha(tabela, item, linha) a preenche.
+    # Com msg_prompt, funciona como seletor: devolve o id da linha escolhida (ou None).
+    # query pode ser uma consulta ou uma Pagina já montada (ver consultas.py).
+    pagina = query if isinstance(query, Pagina) else Pagina(query, coluna_nome, coluna_id)
+    inicios = [None]
+    while True:
+        with banco.nova_sessao(engine) as sessao:
+            linhas, tem_proxima = pagina.busca(sessao, inicios[-1], tamanho_pagina)
+
+        tabela = cria_tabela(len(inicios))
+        for item, linha in enumerate(linhas, start=1):
+            adiciona_linha(tabela, item, linha)
+        if msg_prompt is not None:
+            tabela.add_row(str(0), msg_cancelar)
+        console.print(tabela)
+
+        tem_anterior = len(inicios) > 1
+        navegacao = []
+        if tem_proxima:
+            navegacao.append("p: próxima página")
+        if tem_anterior:
+            navegacao.append("a: página anterior")
+
+        if msg_prompt is None:
+            if len(navegacao) == 0:
+                return None
+            resposta = Prompt.ask(f"{', '.join(navegacao)} (enter para sair)", default="", show_default=False)
+        else:
+            if len(navegacao) > 0:
+                msg_prompt_pagina = f"{msg_prompt} ({', '.join(navegacao)})"
+            else:
+                msg_prompt_pagina = msg_prompt
+            resposta = Prompt.ask(msg_prompt_pagina, default="0", show_default=True)
+
+        resposta = resposta.strip().lower()
+        if resposta == "p" and tem_proxima:
+            inicios.append((linhas[-1].nome, linhas[-1].id))
+        elif resposta == "a" and tem_anterior:
+            inicios.pop()
+        elif msg_prompt is None:
+            return None
+        elif not resposta.isdigit() or int(resposta) > len(linhas):
+            console.print(f"[bold red]{resposta} não é uma opção válida")
+            return None
+        elif int(resposta) == 0:
+            return None
+        else:
+            return linhas[int(resposta) - 1].id
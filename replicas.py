@@ -0,0 +1,218 @@
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+import banco
+
+# Roteamento de leituras para réplicas
+#
+# Um Roteador reúne a engine de escrita (o banco principal) e as engines de leitura. As
+# sessões abertas por banco.nova_sessao sem escrita=True (listagens, buscas, relatórios) vão
+# para uma réplica em condições de atender; as de banco.unidade_de_trabalho, para o principal.
+#
+# A réplica local é uma cópia de um banco SQLite, atualizada pela API de backup do SQLite a
+# cada replica_intervalo segundos, e só quando o principal mudou (PRAGMA data_version). As
+# cópias se alternam entre dois arquivos (<replica>-a e <replica>-b): a nova é gravada no que
+# não está em uso e só então passa a receber as sessões, de modo que quem lê nunca espera pela
+# cópia. Bancos com réplicas próprias (um PostgreSQL com streaming, por exemplo) entram em
+# leitores, com as URLs.
+#
+# Uma réplica só atende se a sua defasagem não passar de replica_defasagem segundos e se já
+# tiver as escritas confirmadas na mesma thread (ou contexto) que lê: quem escreveu lê o que
+# escreveu. Depois de uma escrita, as leituras dessa thread vão para o principal até a próxima
+# cópia da réplica local; nos leitores externos, cuja defasagem não se conhece, até passar o
+# tempo de replica_defasagem. O menu roda numa thread só; com várias threads, a escrita de
+# uma não tira as outras da réplica. Uma escrita é registrada quando a conexão que a
+# confirmou volta ao pool.
+
+
+# Comandos que não gravam nada (o BEGIN vem de banco.inicia_transacao)
+_SEM_ESCRITA = ("BEGIN", "SELECT", "PRAGMA", "EXPLAIN", "SAVEPOINT", "RELEASE")
+
+
+def _escreve(comando: str) -> bool:
+    return comando.split(None, 1)[0].upper() not in _SEM_ESCRITA
+
+
+def _somente_leitura(conexao_dbapi, registro_conexao):
+    # Numa réplica, uma escrita por engano falha em vez de se perder na próxima cópia
+    cursor = conexao_dbapi.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+class Leitor:
+    # Engine de leitura de uma réplica mantida pelo próprio banco
+    def __init__(self, engine):
+        self.engine = engine
+        self.engines = [engine]
+
+    def disponivel(self, roteador):
+        _, escrita_em = roteador.ultima_escrita()
+        if time.monotonic() - escrita_em < roteador.defasagem:
+            return None
+        return self.engine
+
+    def encerra(self):
+        self.engine.dispose()
+
+
+class ReplicaLocal:
+    # Cópia do banco SQLite principal, atualizada pela API de backup em dois arquivos alternados
+    def __init__(self, roteador, arquivo: str, config: dict, intervalo: float):
+        self.roteador = roteador
+        self.intervalo = intervalo
+        self.copiada_em = None
+        self.escritas = -1
+        self.copias = 0
+        self.erro = None
+        self._versao = None
+        self._atual = None
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+        espera = int(config["busy_timeout"]) / 1000
+        self._origem = sqlite3.connect(roteador.escritor.url.database, timeout=espera, check_same_thread=False)
+        base, extensao = os.path.splitext(arquivo)
+        self.arquivos = [f"{base}-a{extensao}", f"{base}-b{extensao}"]
+        self._destinos = [sqlite3.connect(nome, timeout=espera, check_same_thread=False) for nome in self.arquivos]
+        self.engines = []
+        for nome in self.arquivos:
+            engine = banco.cria_engine(dict(config, url=f"sqlite+pysqlite:///{nome}", journal_mode="DELETE"))
+            event.listen(engine, "connect", _somente_leitura)
+            self.engines.append(engine)
+
+    def atualiza(self):
+        # Copia o principal para o arquivo que não está em uso, se o principal mudou desde a
+        # última cópia, e passa a ler dele. As escritas registradas antes deste ponto entram na cópia.
+        with self._trava:
+            escritas, inicio = self.roteador.escritas, time.monotonic()
+            versao = self._origem.execute("PRAGMA data_version").fetchone()[0]
+            if versao != self._versao or self._atual is None:
+                destino = 1 if self._atual == 0 else 0
+                self._origem.backup(self._destinos[destino])
+                # A cópia herda o modo WAL do principal; em DELETE, a réplica é um arquivo só
+                self._destinos[destino].execute("PRAGMA journal_mode=DELETE")
+                self._versao, self._atual = versao, destino
+                self.copias += 1
+            self.escritas, self.copiada_em = escritas, inicio
+
+    def disponivel(self, roteador):
+        escrita, _ = roteador.ultima_escrita()
+        if self.copiada_em is None or self.escritas < escrita:
+            return None
+        if time.monotonic() - self.copiada_em > roteador.defasagem:
+            return None
+        return self.engines[self._atual]
+
+    def inicia(self):
+        self.atualiza()
+        self._thread = threading.Thread(target=self._laco, name="replica-local", daemon=True)
+        self._thread.start()
+
+    def _laco(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.atualiza()
+                self.erro = None
+            except sqlite3.Error as erro:
+                # O principal (ou uma leitura longa no arquivo de destino) ocupado além do
+                # busy_timeout: as leituras continuam na cópia anterior, enquanto a defasagem permitir
+                self.erro = erro
+
+    def encerra(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        for engine in self.engines:
+            engine.dispose()
+        for conexao in [self._origem] + self._destinos:
+            conexao.close()
+
+
+class Roteador:
+    def __init__(self, escritor, defasagem: float):
+        self.escritor = escritor
+        self.defasagem = defasagem
+        self.leitores = []
+        self.escritas = 0
+        # (número, instante) da última escrita registrada na thread ou contexto atual
+        self._escrita = ContextVar(f"replicas_escrita_{id(self)}", default=(0, float("-inf")))
+        self._ciclo = None
+        self._trava = threading.Lock()
+        event.listen(escritor, "after_cursor_execute", self._comando)
+        event.listen(escritor, "commit", self._confirma)
+        event.listen(escritor, "rollback", self._descarta)
+        event.listen(escritor, "checkin", self._devolvida)
+
+    def adiciona(self, leitor):
+        self.leitores.append(leitor)
+        self._ciclo = itertools.cycle(self.leitores)
+
+    @property
+    def engines_leitura(self) -> list:
+        return [engine for leitor in self.leitores for engine in leitor.engines]
+
+    def ultima_escrita(self):
+        return self._escrita.get()
+
+    def leitor(self):
+        # A próxima réplica em condições de atender, em rodízio; o principal se nenhuma estiver
+        for _ in range(len(self.leitores)):
+            engine = next(self._ciclo).disponivel(self)
+            if engine is not None:
+                return engine
+        return self.escritor
+
+    def _comando(self, conexao, cursor, comando, parametros, contexto, executemany):
+        if _escreve(comando):
+            conexao.info["replicas_escreveu"] = True
+
+    def _confirma(self, conexao):
+        if conexao.info.pop("replicas_escreveu", False):
+            conexao.info["replicas_confirmou"] = True
+
+    def _descarta(self, conexao):
+        conexao.info.pop("replicas_escreveu", None)
+
+    def _devolvida(self, conexao_dbapi, registro_conexao):
+        # O commit já terminou: uma cópia iniciada depois daqui inclui a escrita. A conexão
+        # volta ao pool na thread que a usou, a mesma que vai ler em seguida.
+        if registro_conexao.info.pop("replicas_confirmou", False):
+            with self._trava:
+                self.escritas += 1
+                numero = self.escritas
+            self._escrita.set((numero, time.monotonic()))
+
+    def encerra(self):
+        banco.ROTEADORES.pop(self.escritor, None)
+        event.remove(self.escritor, "after_cursor_execute", self._comando)
+        event.remove(self.escritor, "commit", self._confirma)
+        event.remove(self.escritor, "rollback", self._descarta)
+        event.remove(self.escritor, "checkin", self._devolvida)
+        for leitor in self.leitores:
+            leitor.encerra()
+
+
+def instala(engine, config: dict):
+    # Cria o roteador da configuração (leitores, replica) e o liga à engine; None se não houver réplicas
+    urls = [url.strip() for url in config["leitores"].split(",") if url.strip()]
+    if not urls and not config["replica"]:
+        return None
+    roteador = Roteador(engine, float(config["replica_defasagem"]))
+    for url in urls:
+        roteador.adiciona(Leitor(banco.cria_engine(dict(config, url=url))))
+    if config["replica"]:
+        if engine.url.get_backend_name() != "sqlite":
+            raise ValueError("a réplica local só copia bancos SQLite; para os demais, use leitores")
+        replica = ReplicaLocal(roteador, config["replica"], config, float(config["replica_intervalo"]))
+        replica.inicia()
+        roteador.adiciona(replica)
+    banco.ROTEADORES[engine] = roteador
+    return roteador
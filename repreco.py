@@ -0,0 +1,141 @@
+import uuid
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import select, func, update, insert, bindparam
+from sqlalchemy.orm import Session, aliased
+
+import banco
+import cache
+from busca import busca_por_nome
+from models import Produto, HistoricoPreco, visivel
+
+# Reajuste de preços em massa
+#
+# Em vez de um único UPDATE sobre a tabela inteira, que segura a trava de escrita durante
+# toda a regravação e bloqueia as vendas, os produtos são percorridos em trechos ordenados
+# por id (paginação por chave), com um commit por trecho. O novo preço é calculado em
+# Python com Decimal e arredondamento explícito para centavos. Cada trecho é gravado por um
+# UPDATE em executemany que só altera o produto se o preço ainda é o lido (alterações
+# concorrentes são mantidas e contadas como ignoradas); para cada produto alterado, uma linha
+# em historico_precos é gravada na mesma transação. Todas as linhas de um reajuste
+# compartilham o mesmo lote, que pode ser desfeito por desfaz.
+
+TAMANHO_TRECHO = 500
+CENTAVOS = Decimal("0.01")
+
+
+def novo_preco(preco: Decimal, percentual: Decimal, arredondamento: str = ROUND_HALF_UP) -> Decimal:
+    return (preco * (1 + percentual / 100)).quantize(CENTAVOS, rounding=arredondamento)
+
+
+def filtro_produtos(dialeto, id_categoria=None, termo: str = "", ids=None, apenas_ativos: bool = True):
+    filtro = busca_por_nome(Produto, termo, dialeto) & visivel(Produto)
+    if id_categoria is not None:
+        filtro = filtro & (Produto.categoria_id == id_categoria)
+    if ids is not None:
+        filtro = filtro & Produto.id.in_(list(ids))
+    if apenas_ativos:
+        filtro = filtro & Produto.ativo
+    return filtro
+
+
+# Um único comando, compilado uma vez e executado em executemany para cada trecho
+_ATUALIZA_PRECO = (update(Produto.__table__)
+                   .where(Produto.__table__.c.id == bindparam("p_id"),
+                          Produto.__table__.c.preco == bindparam("p_anterior"))
+                   .values(preco=bindparam("p_novo")))
+
+
+def _grava_trecho(sessao: Session, lote, precos: dict, percentual=None, lote_desfeito=None) -> int:
+    # precos: id -> (preço anterior, preço novo). Devolve quantos produtos foram alterados.
+    parametros = [{"p_id": id_produto, "p_anterior": anterior, "p_novo": novo}
+                  for id_produto, (anterior, novo) in precos.items()]
+    alterados = list(precos)
+    if sessao.connection().execute(_ATUALIZA_PRECO, parametros).rowcount < len(parametros):
+        # Algum preço mudou desde a leitura: só os produtos com o preço novo entram no histórico
+        alterados = [id_produto for id_produto, preco in
+                     sessao.execute(select(Produto.id, Produto.preco).where(Produto.id.in_(alterados)))
+                     if preco == precos[id_produto][1]]
+    cache.invalida(sessao, "produtos")
+    if alterados:
+        sessao.execute(insert(HistoricoPreco),
+                       [{"lote": lote, "produto_id": id_produto, "preco_anterior": precos[id_produto][0],
+                         "preco_novo": precos[id_produto][1], "percentual": percentual,
+                         "lote_desfeito": lote_desfeito} for id_produto in alterados])
+    return len(alterados)
+
+
+def conta_produtos(engine, filtro) -> int:
+    with banco.nova_sessao(engine) as sessao:
+        return sessao.execute(select(func.count()).select_from(Produto).where(filtro)).scalar_one()
+
+
+def reajusta(engine, percentual: Decimal, id_categoria=None, termo: str = "", ids=None, apenas_ativos: bool = True,
+             tamanho_trecho: int = TAMANHO_TRECHO, arredondamento: str = ROUND_HALF_UP, progresso=None):
+    # Devolve (lote, alterados, ignorados). progresso(processados), se informado, é chamado a cada trecho.
+    percentual = Decimal(percentual)
+    filtro = filtro_produtos(engine.dialect, id_categoria, termo, ids, apenas_ativos)
+    lote = uuid.uuid4()
+    alterados = ignorados = 0
+    ultimo_id = None
+    while True:
+        with banco.unidade_de_trabalho(engine) as sessao:
+            query = select(Produto.id, Produto.preco).where(filtro, Produto.preco.is_not(None))
+            if ultimo_id is not None:
+                query = query.where(Produto.id > ultimo_id)
+            linhas = sessao.execute(query.order_by(Produto.id).limit(tamanho_trecho)).all()
+            if not linhas:
+                break
+            ultimo_id = linhas[-1].id
+            precos = {linha.id: (linha.preco, novo_preco(linha.preco, percentual, arredondamento))
+                      for linha in linhas}
+            # Produtos cujo preço não muda com o arredondamento não geram alteração nem histórico
+            precos = {id_produto: valores for id_produto, valores in precos.items() if valores[0] != valores[1]}
+            feitos = _grava_trecho(sessao, lote, precos, percentual) if precos else 0
+        alterados += feitos
+        ignorados += len(precos) - feitos
+        if progresso is not None:
+            progresso(len(linhas))
+    return lote, alterados, ignorados
+
+
+def lista_lotes(sessao: Session, quantidade: int = 20):
+    # Os reajustes mais recentes, com quantos produtos alteraram e quantos já foram desfeitos
+    reversao = aliased(HistoricoPreco)
+    desfeitos = (select(func.count()).select_from(reversao)
+                 .where(reversao.lote_desfeito == HistoricoPreco.lote)
+                 .correlate(HistoricoPreco)
+                 .scalar_subquery())
+    return sessao.execute(select(HistoricoPreco.lote, HistoricoPreco.percentual, HistoricoPreco.lote_desfeito,
+                                 func.min(HistoricoPreco.dta_alteracao).label("dta_alteracao"),
+                                 func.count().label("produtos"), desfeitos.label("desfeitos"))
+                          .group_by(HistoricoPreco.lote, HistoricoPreco.percentual, HistoricoPreco.lote_desfeito)
+                          .order_by(func.max(HistoricoPreco.id).desc())
+                          .limit(quantidade)).all()
+
+
+def desfaz(engine, lote, tamanho_trecho: int = TAMANHO_TRECHO, progresso=None):
+    # Volta ao preço anterior os produtos alterados pelo lote que ainda estão com o preço que
+    # o lote gravou; os alterados depois disso são mantidos e contados como ignorados.
+    # Devolve (lote da reversão, revertidos, ignorados).
+    reversao = uuid.uuid4()
+    revertidos = ignorados = 0
+    ultimo_id = None
+    while True:
+        with banco.unidade_de_trabalho(engine) as sessao:
+            query = (select(HistoricoPreco.id, HistoricoPreco.produto_id, HistoricoPreco.preco_anterior,
+                            HistoricoPreco.preco_novo)
+                     .where(HistoricoPreco.lote == lote))
+            if ultimo_id is not None:
+                query = query.where(HistoricoPreco.id > ultimo_id)
+            linhas = sessao.execute(query.order_by(HistoricoPreco.id).limit(tamanho_trecho)).all()
+            if not linhas:
+                break
+            ultimo_id = linhas[-1].id
+            precos = {linha.produto_id: (linha.preco_novo, linha.preco_anterior) for linha in linhas}
+            feitos = _grava_trecho(sessao, reversao, precos, lote_desfeito=lote)
+        revertidos += feitos
+        ignorados += len(precos) - feitos
+        if progresso is not None:
+            progresso(len(linhas))
+    return reversao, revertidos, ignorados
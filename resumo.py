@@ -0,0 +1,161 @@
+from decimal import Decimal
+
+from sqlalchemy import Integer, and_, case, cast, func, select, text
+from sqlalchemy.orm import Session
+
+import consultas
+from models import Categoria, Produto, ResumoEstoque, visivel
+
+# Resumo do estoque por categoria
+#
+# Para cada categoria, resumo_estoque guarda a quantidade de produtos ativos, o total de
+# unidades, o valor do estoque (preço x estoque, em centavos) e quantos produtos ativos
+# estão sem estoque. No SQLite, triggers em produtos atualizam o resumo a cada inserção,
+# remoção e alteração de preço, estoque, estado, categoria ou arquivamento: a contribuição
+# antiga do produto é subtraída e a nova é somada. Assim o painel lê uma linha por categoria
+# em vez de percorrer os produtos. Nos demais bancos o resumo é calculado na hora a partir
+# dos produtos. verifica compara o resumo com um recálculo completo e recalcula o refaz.
+
+NOME_TRIGGER = "resumo_estoque"
+
+
+def suporta_triggers(dialeto) -> bool:
+    return dialeto.name == "sqlite"
+
+
+# As mesmas regras em SQL (triggers) e em expressões do SQLAlchemy (recálculo)
+def _sql_conta(linha: str) -> str:
+    return f"{linha}.ativo AND {linha}.removido_em IS NULL AND {linha}.categoria_id IS NOT NULL"
+
+
+def _sql_unidades(linha: str) -> str:
+    return f"COALESCE({linha}.estoque, 0)"
+
+
+def _sql_valor(linha: str) -> str:
+    return f"CAST(ROUND(COALESCE({linha}.preco, 0) * 100) AS INTEGER) * {_sql_unidades(linha)}"
+
+
+def _sql_sem_estoque(linha: str) -> str:
+    return f"COALESCE({linha}.estoque <= 0, 0)"
+
+
+_CONTA = and_(Produto.ativo == True, visivel(Produto), Produto.categoria_id.is_not(None))  # noqa: E712
+_UNIDADES = func.coalesce(Produto.estoque, 0)
+_VALOR = cast(func.round(func.coalesce(Produto.preco, 0) * 100), Integer) * _UNIDADES
+_SEM_ESTOQUE = case((Produto.estoque <= 0, 1), else_=0)
+
+
+def _soma(linha: str) -> str:
+    return (f"INSERT INTO resumo_estoque (categoria_id, produtos_ativos, unidades, valor_centavos, sem_estoque) "
+            f"SELECT {linha}.categoria_id, 1, {_sql_unidades(linha)}, {_sql_valor(linha)}, "
+            f"{_sql_sem_estoque(linha)} WHERE {_sql_conta(linha)} "
+            f"ON CONFLICT (categoria_id) DO UPDATE SET produtos_ativos = produtos_ativos + 1, "
+            f"unidades = unidades + excluded.unidades, valor_centavos = valor_centavos + excluded.valor_centavos, "
+            f"sem_estoque = sem_estoque + excluded.sem_estoque;")
+
+
+def _subtrai(linha: str) -> str:
+    return (f"UPDATE resumo_estoque SET produtos_ativos = produtos_ativos - 1, "
+            f"unidades = unidades - {_sql_unidades(linha)}, valor_centavos = valor_centavos - {_sql_valor(linha)}, "
+            f"sem_estoque = sem_estoque - {_sql_sem_estoque(linha)} "
+            f"WHERE categoria_id = {linha}.categoria_id AND {_sql_conta(linha)};")
+
+
+def _ddl_triggers():
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {NOME_TRIGGER}_ai AFTER INSERT ON produtos BEGIN {_soma('new')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {NOME_TRIGGER}_ad AFTER DELETE ON produtos BEGIN {_subtrai('old')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {NOME_TRIGGER}_au AFTER UPDATE OF preco, estoque, ativo, categoria_id, "
+        f"removido_em ON produtos BEGIN {_subtrai('old')} {_soma('new')} END",
+    ]
+
+
+def recalculo():
+    # Os totais calculados a partir dos produtos, com as mesmas colunas de resumo_estoque
+    return (select(Produto.categoria_id.label("categoria_id"), func.count().label("produtos_ativos"),
+                   func.sum(_UNIDADES).label("unidades"), func.sum(_VALOR).label("valor_centavos"),
+                   func.sum(_SEM_ESTOQUE).label("sem_estoque"))
+            .where(_CONTA)
+            .group_by(Produto.categoria_id)
+            .subquery("recalculo"))
+
+
+def recalcula(sessao: Session):
+    # Refaz o resumo inteiro a partir dos produtos
+    sessao.execute(ResumoEstoque.__table__.delete())
+    totais = recalculo()
+    sessao.execute(ResumoEstoque.__table__.insert().from_select(
+        ["categoria_id", "produtos_ativos", "unidades", "valor_centavos", "sem_estoque"],
+        select(totais).where(totais.c.categoria_id.in_(select(Categoria.id)))))
+
+
+def instala_resumo(engine):
+    # Cria os triggers que faltam; se algum faltava (banco novo ou antigo, ou produtos
+    # recriada), o resumo é recalculado
+    if not suporta_triggers(engine.dialect):
+        return
+    with engine.begin() as conexao:
+        existentes = set(conexao.scalars(text("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                                              "AND tbl_name = 'produtos'")))
+        nomes = {f"{NOME_TRIGGER}_{sufixo}" for sufixo in ("ai", "ad", "au")}
+        if nomes <= existentes:
+            return
+        for comando in _ddl_triggers():
+            conexao.execute(text(comando))
+        recalcula(conexao)
+
+
+def fonte(dialeto):
+    # De onde o painel lê os totais: a tabela mantida pelos triggers ou o recálculo
+    if suporta_triggers(dialeto):
+        return ResumoEstoque.__table__
+    return recalculo()
+
+
+def query_painel(dialeto):
+    totais = fonte(dialeto)
+    return (select(Categoria.id, Categoria.nome,
+                   func.coalesce(totais.c.produtos_ativos, 0).label("produtos_ativos"),
+                   func.coalesce(totais.c.unidades, 0).label("unidades"),
+                   func.coalesce(totais.c.valor_centavos, 0).label("valor_centavos"),
+                   func.coalesce(totais.c.sem_estoque, 0).label("sem_estoque"))
+            .outerjoin(totais, totais.c.categoria_id == Categoria.id)
+            .where(visivel(Categoria)))
+
+
+def pagina_painel(dialeto) -> consultas.Pagina:
+    return consultas.pronta(("painel", dialeto.name), lambda: query_painel(dialeto), Categoria.nome, Categoria.id)
+
+
+def totais_gerais(sessao: Session):
+    painel = query_painel(sessao.get_bind().dialect).subquery()
+    return sessao.execute(select(func.count().label("categorias"),
+                                 func.coalesce(func.sum(painel.c.produtos_ativos), 0).label("produtos_ativos"),
+                                 func.coalesce(func.sum(painel.c.unidades), 0).label("unidades"),
+                                 func.coalesce(func.sum(painel.c.valor_centavos), 0).label("valor_centavos"),
+                                 func.coalesce(func.sum(painel.c.sem_estoque), 0).label("sem_estoque"))).one()
+
+
+def valor(centavos) -> Decimal:
+    return Decimal(int(centavos)) / 100
+
+
+def verifica(sessao: Session):
+    # Categorias cujo resumo difere do recálculo completo: (id, nome, campos divergentes)
+    totais = recalculo()
+    resumo = ResumoEstoque.__table__
+    campos = ["produtos_ativos", "unidades", "valor_centavos", "sem_estoque"]
+    query = (select(Categoria.id, Categoria.nome,
+                    *[func.coalesce(resumo.c[campo], 0).label(f"{campo}_resumo") for campo in campos],
+                    *[func.coalesce(totais.c[campo], 0).label(f"{campo}_recalculo") for campo in campos])
+             .outerjoin(resumo, resumo.c.categoria_id == Categoria.id)
+             .outerjoin(totais, totais.c.categoria_id == Categoria.id))
+    divergencias = []
+    for linha in sessao.execute(query):
+        diferentes = {campo: (getattr(linha, f"{campo}_resumo"), getattr(linha, f"{campo}_recalculo"))
+                      for campo in campos
+                      if getattr(linha, f"{campo}_resumo") != getattr(linha, f"{campo}_recalculo")}
+        if diferentes:
+            divergencias.append((linha.id, linha.nome, diferentes))
+    return divergencias
@@ -0,0 +1,200 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import select, func, update, delete, case, literal_column, and_, not_
+from sqlalchemy.orm import Session
+
+import cache
+import consultas
+import estoque
+import repreco
+from busca import busca_por_nome, normaliza
+from models import Categoria, Produto, visivel
+
+# Operações do catálogo, sem nenhuma interação com o usuário
+#
+# Cada função recebe uma Session já aberta e não faz commit: quem chama (as ações do menu,
+# o modo assíncrono em servico_async.py, scripts) decide o tamanho da transação. As consultas
+# devolvem linhas (Row) e não entidades, para poderem ser usadas depois de a sessão fechar.
+# Linhas arquivadas (removido_em preenchido) não aparecem em nenhuma consulta.
+
+# Se verdadeiro, as remoções arquivam as linhas em vez de apagá-las (ver banco.PADROES)
+ARQUIVA_REMOVIDOS = False
+
+
+def query_produtos():
+    # Uma única consulta, com o nome da categoria resolvido pelo JOIN, devolvendo
+    # tuplas leves em vez de entidades (evita um SELECT extra por categoria)
+    return (select(Produto.id, Produto.nome, Produto.ativo, Produto.preco, Produto.estoque, Produto.dta_cadastro,
+                   Produto.dta_atualizacao, Categoria.nome.label("categoria"))
+            .outerjoin(Categoria, Produto.categoria_id == Categoria.id)
+            .where(visivel(Produto)))
+
+
+def query_categorias():
+    # A quantidade de produtos é calculada pelo banco (usando o índice de categoria_id),
+    # sem carregar os produtos de cada categoria para a memória
+    qtd_produtos = (select(func.count(Produto.id))
+                    .where(Produto.categoria_id == Categoria.id, visivel(Produto))
+                    .correlate(Categoria)
+                    .scalar_subquery())
+    return (select(Categoria.id, Categoria.nome, Categoria.dta_cadastro, Categoria.dta_atualizacao,
+                   qtd_produtos.label("qtd_produtos"))
+            .where(visivel(Categoria)))
+
+
+def filtra_produtos(dialeto, termo: str = "", apenas_ativos: bool = False, sem_estoque: bool = False):
+    query = query_produtos().where(busca_por_nome(Produto, termo, dialeto))
+    if apenas_ativos or sem_estoque:
+        query = query.where(Produto.ativo)
+    if sem_estoque:
+        # Literal, e não parâmetro, para que o banco use o índice parcial ix_produtos_sem_estoque
+        query = query.where(Produto.estoque <= literal_column("0"))
+    return query
+
+
+def filtra_categorias(dialeto, termo: str = ""):
+    return query_categorias().where(busca_por_nome(Categoria, termo, dialeto))
+
+
+def pagina_produtos(dialeto, termo: str = "", apenas_ativos: bool = False,
+                    sem_estoque: bool = False) -> consultas.Pagina:
+    # Sem termo de busca, os comandos prontos (ver consultas.py)
+    if normaliza(termo):
+        return consultas.Pagina(filtra_produtos(dialeto, termo, apenas_ativos, sem_estoque), Produto.nome, Produto.id)
+    return consultas.pronta(("produtos", apenas_ativos, sem_estoque),
+                            lambda: filtra_produtos(dialeto, "", apenas_ativos, sem_estoque), Produto.nome, Produto.id)
+
+
+def pagina_categorias(dialeto, termo: str = "") -> consultas.Pagina:
+    if normaliza(termo):
+        return consultas.Pagina(filtra_categorias(dialeto, termo), Categoria.nome, Categoria.id)
+    return consultas.pronta(("categorias",), query_categorias, Categoria.nome, Categoria.id)
+
+
+def lista_produtos(sessao: Session, termo: str = "", apenas_ativos: bool = False, sem_estoque: bool = False,
+                   depois_de=None, tamanho: int = None):
+    pagina = pagina_produtos(sessao.get_bind().dialect, termo, apenas_ativos, sem_estoque)
+    return pagina.busca(sessao, depois_de, tamanho)
+
+
+def lista_categorias(sessao: Session, termo: str = "", depois_de=None, tamanho: int = None):
+    return pagina_categorias(sessao.get_bind().dialect, termo).busca(sessao, depois_de, tamanho)
+
+
+def conta_categorias(sessao: Session, termo: str = "") -> int:
+    filtro = busca_por_nome(Categoria, termo, sessao.get_bind().dialect)
+    return sessao.execute(select(func.count()).select_from(Categoria).where(filtro, visivel(Categoria))).scalar_one()
+
+
+def query_ficha_produto():
+    # Só os campos que mudam pouco; preço e estoque mudam a cada venda e ficam fora do cache
+    return (select(Produto.id, Produto.nome, Produto.ativo, Produto.dta_cadastro, Categoria.nome.label("categoria"))
+            .outerjoin(Categoria, Produto.categoria_id == Categoria.id)
+            .where(visivel(Produto)))
+
+
+def obtem_produto(sessao: Session, id_produto):
+    # Ficha do produto (id, nome, ativo, dta_cadastro, categoria), do cache
+    return cache.produto(sessao, id_produto,
+                         lambda: sessao.execute(query_ficha_produto().where(Produto.id == id_produto)).one_or_none())
+
+
+def obtem_saldo(sessao: Session, id_produto):
+    # Preço e estoque lidos do banco na transação de quem chama, sem passar pelo cache
+    return sessao.execute(select(Produto.preco, Produto.estoque)
+                          .where(Produto.id == id_produto, visivel(Produto))).one_or_none()
+
+
+def obtem_categoria(sessao: Session, id_categoria):
+    query = (select(Categoria.id, Categoria.nome, Categoria.nome_busca)
+             .where(Categoria.id == id_categoria, visivel(Categoria)))
+    return cache.categoria(sessao, id_categoria, lambda: sessao.execute(query).one_or_none())
+
+
+def adiciona_categoria(sessao: Session, nome: str):
+    categoria = Categoria(nome=nome)
+    sessao.add(categoria)
+    sessao.flush()
+    return categoria.id
+
+
+def centavos(preco) -> Decimal:
+    # Preços são gravados em centavos; aceita também int e float
+    return Decimal(str(preco)).quantize(repreco.CENTAVOS, ROUND_HALF_UP)
+
+
+def adiciona_produto(sessao: Session, id_categoria, nome: str, preco: Decimal, qtd_estoque: int = 0):
+    # Devolve o id do novo produto, ou None se a categoria não existe
+    categoria = obtem_categoria(sessao, id_categoria)
+    if categoria is None:
+        return None
+    produto = Produto(nome=nome, preco=centavos(preco), estoque=qtd_estoque, categoria_id=categoria.id)
+    sessao.add(produto)
+    sessao.flush()
+    estoque.registra_movimento(sessao, produto.id, qtd_estoque, estoque.INICIAL, qtd_estoque)
+    return produto.id
+
+
+def vende(sessao: Session, id_produto, quantidade: int):
+    return estoque.vende(sessao, id_produto, quantidade)
+
+
+def compra(sessao: Session, id_produto, quantidade: int):
+    return estoque.compra(sessao, id_produto, quantidade)
+
+
+def altera_preco(sessao: Session, id_produto, preco: Decimal) -> bool:
+    resultado = sessao.execute(update(Produto).where(Produto.id == id_produto, visivel(Produto))
+                               .values(preco=centavos(preco))
+                               .execution_options(synchronize_session="fetch"))
+    return resultado.rowcount > 0
+
+
+def alterna_estado(sessao: Session, id_produto):
+    # Devolve o novo estado do produto, ou None se ele não existe
+    return sessao.execute(update(Produto).where(Produto.id == id_produto, visivel(Produto))
+                          .values(ativo=not_(Produto.ativo))
+                          .returning(Produto.ativo)
+                          .execution_options(synchronize_session="fetch")).scalar_one_or_none()
+
+
+def resumo_remocao(sessao: Session, id_categoria, quantidade_nomes: int = 10):
+    # O que será removido junto com a categoria, calculado pelo banco: quantidade de produtos,
+    # valor do estoque positivo e os primeiros nomes. Devolve None se a categoria não existe.
+    categoria = obtem_categoria(sessao, id_categoria)
+    if categoria is None:
+        return None
+    dos_produtos = and_(Produto.categoria_id == id_categoria, visivel(Produto))
+    valor = func.sum(case((Produto.estoque > 0, Produto.preco * Produto.estoque), else_=0))
+    quantidade, valor_estoque = sessao.execute(select(func.count(), func.coalesce(valor, 0))
+                                               .where(dos_produtos)).one()
+    nomes = sessao.scalars(select(Produto.nome).where(dos_produtos)
+                           .order_by(Produto.nome, Produto.id).limit(quantidade_nomes)).all()
+    return {"nome": categoria.nome, "produtos": quantidade,
+            "valor_estoque": Decimal(str(valor_estoque)).quantize(Decimal("0.01")), "primeiros": nomes}
+
+
+def remove_categoria(sessao: Session, id_categoria, arquivar: bool = None) -> bool:
+    # Remove a categoria e os seus produtos. A remoção física é um único DELETE: os produtos,
+    # as movimentações e o histórico de preços são apagados pelo banco (ON DELETE CASCADE).
+    # Arquivando, categoria e produtos são apenas marcados com removido_em.
+    if ARQUIVA_REMOVIDOS if arquivar is None else arquivar:
+        alteradas = sessao.execute(update(Categoria).where(Categoria.id == id_categoria, visivel(Categoria))
+                                   .values(removido_em=func.now())
+                                   .execution_options(synchronize_session=False)).rowcount
+        if alteradas == 0:
+            return False
+        sessao.execute(update(Produto).where(Produto.categoria_id == id_categoria, visivel(Produto))
+                       .values(removido_em=func.now())
+                       .execution_options(synchronize_session=False))
+        return True
+    return sessao.execute(delete(Categoria).where(Categoria.id == id_categoria)
+                          .execution_options(synchronize_session=False)).rowcount > 0
+
+
+def remove_produto(sessao: Session, id_produto, arquivar: bool = None) -> bool:
+    if ARQUIVA_REMOVIDOS if arquivar is None else arquivar:
+        comando = update(Produto).where(Produto.id == id_produto, visivel(Produto)).values(removido_em=func.now())
+    else:
+        comando = delete(Produto).where(Produto.id == id_produto)
+    return sessao.execute(comando.execution_options(synchronize_session=False)).rowcount > 0
@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+import banco
+import servico
+
+# Versão assíncrona das operações do catálogo, sobre AsyncEngine/AsyncSession
+#
+# As operações são as mesmas de servico.py, executadas com AsyncSession.run_sync: cada
+# chamada abre a sua sessão, executa a operação e faz o commit, de modo que várias chamadas
+# podem rodar ao mesmo tempo no mesmo loop de eventos. Localmente usa o driver aiosqlite
+# (pip install aiosqlite); no PostgreSQL, asyncpg.
+
+DRIVERS_ASYNC = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def cria_engine_async(config: dict = None) -> AsyncEngine:
+    config = config or banco.carrega_configuracao()
+    url = make_url(config["url"])
+    backend = url.get_backend_name()
+    if url.get_driver_name() not in ("aiosqlite", "asyncpg") and backend in DRIVERS_ASYNC:
+        url = url.set(drivername=DRIVERS_ASYNC[backend])
+    echo = banco.verdadeiro(config["echo"])
+    if backend == "sqlite":
+        engine = create_async_engine(url, echo=echo, connect_args={"timeout": int(config["busy_timeout"]) / 1000})
+        banco.configura_sqlite(engine.sync_engine, config)
+    else:
+        engine = create_async_engine(url, echo=echo, **banco.opcoes_pool(config))
+    return engine
+
+
+async def prepara_banco(engine: AsyncEngine):
+    # O mesmo banco.prepara_banco do modo síncrono, sobre a sync_engine: dentro de run_sync, as
+    # conexões que ele abre usam o driver assíncrono
+    async with engine.connect() as conexao:
+        await conexao.run_sync(lambda _: banco.prepara_banco(engine.sync_engine))
+
+
+async def _executa(engine: AsyncEngine, operacao, *args, **kwargs):
+    async with AsyncSession(engine, expire_on_commit=False) as sessao:
+        resultado = await sessao.run_sync(operacao, *args, **kwargs)
+        await sessao.commit()
+    return resultado
+
+
+async def lista_produtos(engine: AsyncEngine, termo: str = "", apenas_ativos: bool = False,
+                         sem_estoque: bool = False, depois_de=None, tamanho: int = None):
+    return await _executa(engine, servico.lista_produtos, termo, apenas_ativos, sem_estoque, depois_de, tamanho)
+
+
+async def lista_categorias(engine: AsyncEngine, termo: str = "", depois_de=None, tamanho: int = None):
+    return await _executa(engine, servico.lista_categorias, termo, depois_de, tamanho)
+
+
+async def obtem_produto(engine: AsyncEngine, id_produto):
+    return await _executa(engine, servico.obtem_produto, id_produto)
+
+
+async def obtem_saldo(engine: AsyncEngine, id_produto):
+    return await _executa(engine, servico.obtem_saldo, id_produto)
+
+
+async def adiciona_categoria(engine: AsyncEngine, nome: str):
+    return await _executa(engine, servico.adiciona_categoria, nome)
+
+
+async def adiciona_produto(engine: AsyncEngine, id_categoria, nome: str, preco: Decimal, qtd_estoque: int = 0):
+    return await _executa(engine, servico.adiciona_produto, id_categoria, nome, preco, qtd_estoque)
+
+
+async def vende(engine: AsyncEngine, id_produto, quantidade: int):
+    return await _executa(engine, servico.vende, id_produto, quantidade)
+
+
+async def compra(engine: AsyncEngine, id_produto, quantidade: int):
+    return await _executa(engine, servico.compra, id_produto, quantidade)
+
+
+async def altera_preco(engine: AsyncEngine, id_produto, preco: Decimal) -> bool:
+    return await _executa(engine, servico.altera_preco, id_produto, preco)
+
+
+async def alterna_estado(engine: AsyncEngine, id_produto):
+    return await _executa(engine, servico.alterna_estado, id_produto)
@@ -0,0 +1,31 @@
+from decimal import Decimal
+
+import pytest
+
+import banco
+import cache
+import servico
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # Um banco SQLite novo por teste, com o esquema, a busca e o resumo instalados
+    config = banco.carrega_configuracao()
+    config["url"] = f"sqlite+pysqlite:///{tmp_path / 'teste.sqlite3'}"
+    engine = banco.cria_engine(config)
+    banco.prepara_banco(engine)
+    cache.limpa()
+    yield engine
+    cache.limpa()
+    engine.dispose()
+
+
+@pytest.fixture
+def cria_produtos(engine):
+    # cria_produtos(quantidade) cadastra os produtos numa categoria nova e devolve os ids
+    def cria(quantidade: int, estoque: int = 10, categoria: str = "Papelaria") -> list:
+        with banco.unidade_de_trabalho(engine) as sessao:
+            id_categoria = servico.adiciona_categoria(sessao, categoria)
+            return [servico.adiciona_produto(sessao, id_categoria, f"Produto {numero:04}", Decimal("9.90"), estoque)
+                    for numero in range(quantidade)]
+    return cria
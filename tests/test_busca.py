@@ -0,0 +1,21 @@
+from decimal import Decimal
+
+import pytest
+
+import banco
+import servico
+
+
+@pytest.mark.parametrize("termo, esperados", [("tv", ["Smart TV 50", "TV Box"]),
+                                              ("4k", ["Monitor 4K"]),
+                                              ("smart", ["Smart TV 50"]),
+                                              ("tv 50", ["Smart TV 50"])])
+def test_busca_encontra_trechos_do_nome(engine, termo, esperados):
+    with banco.unidade_de_trabalho(engine) as sessao:
+        id_categoria = servico.adiciona_categoria(sessao, "Eletrônicos")
+        for nome in ["Smart TV 50", "TV Box", "Monitor 4K", "Cabo HDMI"]:
+            servico.adiciona_produto(sessao, id_categoria, nome, Decimal("100"))
+
+    with banco.nova_sessao(engine) as sessao:
+        linhas, _ = servico.lista_produtos(sessao, termo)
+    assert [linha.nome for linha in linhas] == esperados
@@ -0,0 +1,50 @@
+import io
+
+from rich.console import Console
+from rich.prompt import IntPrompt
+from sqlalchemy import text
+
+import app_produtos
+import banco
+import servico
+
+
+def test_venda_mostra_o_estoque_atual(engine, cria_produtos, monkeypatch):
+    [id_produto] = cria_produtos(1, estoque=10)
+    with banco.nova_sessao(engine) as sessao:
+        servico.obtem_produto(sessao, id_produto)
+    # Outro terminal (ou processo) vende sem passar pelo cache deste
+    with engine.begin() as conexao:
+        conexao.execute(text("UPDATE produtos SET estoque = 4"))
+
+    perguntas = []
+    monkeypatch.setattr(app_produtos, "selecionar_produto_id", lambda *args, **kwargs: id_produto)
+    monkeypatch.setattr(IntPrompt, "ask", lambda pergunta, *args, **kwargs: perguntas.append(pergunta) or 1)
+    app_produtos.vende_produto(engine, Console(file=io.StringIO()))
+
+    assert perguntas == ["Vender quantas unidades das 4 existentes?"]
+    with banco.nova_sessao(engine) as sessao:
+        assert servico.obtem_saldo(sessao, id_produto).estoque == 3
+
+
+def test_venda_durante_a_pergunta_nao_trava(engine, cria_produtos, monkeypatch):
+    # Outro terminal vende o mesmo produto enquanto este espera a resposta do usuário
+    [id_produto] = cria_produtos(1, estoque=10)
+    config = banco.carrega_configuracao()
+    config["url"] = engine.url.render_as_string(hide_password=False)
+    outro_terminal = banco.cria_engine(config)
+
+    def responde(pergunta, *args, **kwargs):
+        with banco.unidade_de_trabalho(outro_terminal) as sessao:
+            servico.vende(sessao, id_produto, 2)
+        return 1
+
+    monkeypatch.setattr(app_produtos, "selecionar_produto_id", lambda *args, **kwargs: id_produto)
+    monkeypatch.setattr(IntPrompt, "ask", responde)
+    try:
+        app_produtos.vende_produto(engine, Console(file=io.StringIO()))
+    finally:
+        outro_terminal.dispose()
+
+    with banco.nova_sessao(engine) as sessao:
+        assert servico.obtem_saldo(sessao, id_produto).estoque == 7
@@ -0,0 +1,65 @@
+import io
+
+import pytest
+from rich.console import Console
+from rich.prompt import Prompt
+from sqlalchemy import event
+
+import app_produtos
+import banco
+import consultas
+import servico
+
+
+def conta_comandos(engine, acao) -> int:
+    comandos = []
+
+    def registra(conexao, cursor, comando, parametros, contexto, executemany):
+        comandos.append(comando)
+
+    event.listen(engine, "before_cursor_execute", registra)
+    try:
+        acao()
+    finally:
+        event.remove(engine, "before_cursor_execute", registra)
+    return len(comandos)
+
+
+def listagem(engine, termo: str = ""):
+    with banco.nova_sessao(engine) as sessao:
+        linhas, _ = servico.lista_produtos(sessao, termo)
+        # Os campos exibidos pela listagem, inclusive a categoria, já vêm na mesma linha
+        return [(linha.nome, linha.preco, linha.estoque, linha.categoria) for linha in linhas]
+
+
+def seletor(engine, monkeypatch):
+    # Digita enter no nome parcial e cancela a seleção na primeira página
+    respostas = iter(["", "0"])
+    monkeypatch.setattr(Prompt, "ask", lambda *args, **kwargs: next(respostas))
+    return app_produtos.selecionar_produto_id(engine, Console(file=io.StringIO()), apenas_ativos=True)
+
+
+@pytest.mark.parametrize("termo", ["", "produto"])
+def test_listagem_nao_depende_da_quantidade_de_produtos(engine, cria_produtos, termo):
+    cria_produtos(10)
+    poucos = conta_comandos(engine, lambda: listagem(engine, termo))
+    cria_produtos(290, categoria="Mercearia")
+    muitos = conta_comandos(engine, lambda: listagem(engine, termo))
+    assert muitos == poucos
+
+
+def test_seletor_nao_depende_da_quantidade_de_produtos(engine, cria_produtos, monkeypatch):
+    cria_produtos(10)
+    poucos = conta_comandos(engine, lambda: seletor(engine, monkeypatch))
+    cria_produtos(290, categoria="Mercearia")
+    muitos = conta_comandos(engine, lambda: seletor(engine, monkeypatch))
+    assert muitos == poucos
+
+
+def test_tamanho_da_pagina_vem_da_configuracao(engine, cria_produtos, monkeypatch):
+    cria_produtos(10)
+    # O main.py ajusta o tamanho depois de importar tudo; as listagens já montadas o seguem
+    monkeypatch.setattr(consultas, "TAMANHO_PAGINA", 3)
+    with banco.nova_sessao(engine) as sessao:
+        linhas, tem_proxima = servico.lista_produtos(sessao)
+    assert len(linhas) == 3 and tem_proxima
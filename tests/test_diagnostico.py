@@ -0,0 +1,23 @@
+from sqlalchemy import select, update
+
+import banco
+import diagnostico
+import servico
+from models import Produto
+
+
+def test_conta_linhas_de_tuplas_entidades_e_escritas(engine, cria_produtos):
+    ids = cria_produtos(5)
+    diagnostico.instala(engine)
+
+    with diagnostico.mede("listagem") as listagem, banco.nova_sessao(engine) as sessao:
+        servico.lista_produtos(sessao)
+    with diagnostico.mede("entidades") as entidades, banco.nova_sessao(engine) as sessao:
+        sessao.scalars(select(Produto).where(Produto.id.in_(ids[:2]))).all()
+    with diagnostico.mede("escrita") as escrita, banco.unidade_de_trabalho(engine) as sessao:
+        sessao.execute(update(Produto).where(Produto.id.in_(ids[:3])).values(ativo=False)
+                       .execution_options(synchronize_session=False))
+
+    assert (listagem.linhas_carregadas, listagem.objetos_identidade) == (5, 0)
+    assert (entidades.linhas_carregadas, entidades.objetos_identidade) == (2, 2)
+    assert escrita.linhas_carregadas == 3
@@ -0,0 +1,54 @@
+import uuid
+from decimal import Decimal
+
+from sqlalchemy import insert, select, text
+
+import banco
+import estoque
+import servico
+from models import MovimentoEstoque, Produto
+
+
+def test_prepara_banco_registra_saldos_iniciais(engine, cria_produtos):
+    # Um produto gravado sem movimentação, como nos bancos anteriores ao livro de estoque
+    cria_produtos(2)
+    with banco.unidade_de_trabalho(engine) as sessao:
+        id_categoria = sessao.scalar(select(Produto.categoria_id))
+        id_produto = uuid.uuid4()
+        sessao.execute(insert(Produto), [{"id": id_produto, "nome": "Antigo", "nome_busca": "antigo",
+                                          "preco": Decimal("1.00"), "estoque": 7, "categoria_id": id_categoria}])
+        sessao.execute(text("DELETE FROM versao_dados"))
+    with banco.nova_sessao(engine) as sessao:
+        assert [linha.nome for linha in estoque.audita_estoque(sessao)] == ["Antigo"]
+
+    banco.prepara_banco(engine)
+
+    with banco.nova_sessao(engine) as sessao:
+        assert estoque.audita_estoque(sessao) == []
+        tipos = sessao.scalars(select(MovimentoEstoque.tipo).where(MovimentoEstoque.produto_id == id_produto)).all()
+    assert tipos == [estoque.INICIAL]
+
+
+def test_migracoes_de_dados_rodam_uma_vez(engine, cria_produtos):
+    cria_produtos(1)
+    with engine.begin() as conexao:
+        conexao.execute(text("DELETE FROM movimentos_estoque"))
+
+    banco.prepara_banco(engine)
+
+    # O banco já estava na versão atual: o produto continua sem movimentação
+    assert banco.migra_dados(engine) == 0
+    with banco.nova_sessao(engine) as sessao:
+        assert len(estoque.audita_estoque(sessao)) == 1
+
+
+def test_auditoria_mostra_estoque_alterado_fora_do_livro(engine, cria_produtos):
+    id_produto, _ = cria_produtos(2)
+    with banco.unidade_de_trabalho(engine) as sessao:
+        servico.vende(sessao, id_produto, 3)
+    with engine.begin() as conexao:
+        conexao.execute(text("UPDATE produtos SET estoque = 100 WHERE nome = 'Produto 0000'"))
+
+    with banco.nova_sessao(engine) as sessao:
+        divergentes = estoque.audita_estoque(sessao)
+    assert [(linha.estoque, linha.estoque_movimentos) for linha in divergentes] == [(100, 7)]
@@ -0,0 +1,35 @@
+from decimal import Decimal
+
+from sqlalchemy import select
+
+import banco
+import exportacao
+import servico
+from models import Produto
+
+
+def test_exportacao_em_partes_igual_a_uma_parte(engine, cria_produtos, tmp_path):
+    cria_produtos(50)
+    inteiro, em_partes = tmp_path / "inteiro.csv", tmp_path / "partes.csv"
+    assert exportacao.exporta(engine, "produtos", str(inteiro)) == 50
+    assert exportacao.exporta(engine, "produtos", str(em_partes), partes=4, threads=True) == 50
+    assert em_partes.read_bytes() == inteiro.read_bytes()
+
+
+def test_exportacao_em_partes_e_uma_fotografia(engine, cria_produtos, tmp_path, monkeypatch):
+    [id_produto, *_] = cria_produtos(50)
+    limites = exportacao.limites
+
+    def limites_com_escrita(*args):
+        # Uma venda e um cadastro gravados enquanto as faixas são exportadas
+        chaves = limites(*args)
+        with banco.unidade_de_trabalho(engine) as sessao:
+            servico.vende(sessao, id_produto, 4)
+            servico.adiciona_produto(sessao, sessao.scalar(select(Produto.categoria_id)), "Produto 0000 novo",
+                                     Decimal("1"))
+        return chaves
+
+    monkeypatch.setattr(exportacao, "limites", limites_com_escrita)
+    arquivo = tmp_path / "produtos.ndjson"
+    assert exportacao.exporta(engine, "produtos", str(arquivo), partes=4, threads=True) == 50
+    assert '"estoque": 10' in arquivo.read_text(encoding="utf-8").splitlines()[0]
@@ -0,0 +1,63 @@
+import json
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+import banco
+import importacao
+from models import Categoria, Produto
+
+
+def test_linhas_invalidas_sao_relatadas_e_ignoradas(engine, tmp_path):
+    arquivo = tmp_path / "catalogo.ndjson"
+    linhas = [json.dumps({"nome": "Caneta", "categoria": "Papelaria", "preco": "2.50", "estoque": 10}),
+              json.dumps({"categoria": "Papelaria", "preco": "1.00"}),
+              json.dumps({"nome": "Lápis", "categoria": None, "preco": "1.00"}),
+              "",
+              json.dumps({"nome": "Borracha", "categoria": "  ", "preco": "1.00"}),
+              "{não é json",
+              json.dumps({"nome": "Régua", "categoria": "Papelaria", "preco": "um real"}),
+              json.dumps({"nome": "Caderno", "categoria": "Papelaria", "estoque": "muitos"}),
+              json.dumps(["Cola", "Papelaria"]),
+              json.dumps({"nome": "Café", "categoria": "Mercearia", "preco": 10.333})]
+    arquivo.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+    falhas = []
+
+    importados = importacao.importa(engine, str(arquivo), tamanho_lote=4,
+                                    falha=lambda linha, registro, mensagem: falhas.append((linha, mensagem)))
+
+    assert importados == 2
+    assert [linha for linha, _ in falhas] == [2, 3, 5, 6, 7, 8, 9]
+    assert falhas[0][1] == "o campo 'nome' é obrigatório"
+    with banco.nova_sessao(engine) as sessao:
+        assert sorted(sessao.scalars(select(Categoria.nome))) == ["Mercearia", "Papelaria"]
+        precos = sorted(sessao.execute(select(Produto.nome, Produto.preco)))
+    assert precos == [("Café", Decimal("10.33")), ("Caneta", Decimal("2.50"))]
+
+
+def test_retomada_com_outro_tamanho_de_lote(engine, tmp_path, monkeypatch):
+    arquivo = tmp_path / "catalogo.ndjson"
+    linhas = [json.dumps({"nome": f"Produto {numero}", "categoria": "Papelaria", "preco": "1.00"})
+              for numero in range(1, 11)]
+    arquivo.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+
+    # A carga cai depois do commit do segundo lote e antes do seu checkpoint
+    grava_checkpoint = importacao._grava_checkpoint
+    gravacoes = []
+
+    def falha_no_segundo(*args):
+        gravacoes.append(args)
+        if len(gravacoes) == 2:
+            raise OSError("disco cheio")
+        grava_checkpoint(*args)
+
+    monkeypatch.setattr(importacao, "_grava_checkpoint", falha_no_segundo)
+    with pytest.raises(OSError):
+        importacao.importa(engine, str(arquivo), tamanho_lote=4)
+    monkeypatch.setattr(importacao, "_grava_checkpoint", grava_checkpoint)
+
+    # Linhas 5 a 8 já gravadas, mas o checkpoint diz 4; os lotes menores não as duplicam
+    assert importacao.importa(engine, str(arquivo), tamanho_lote=2, retomar=True) == 2
+    with banco.nova_sessao(engine) as sessao:
+        assert len(sessao.scalars(select(Produto.id)).all()) == 10
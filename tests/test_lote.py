@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import event, func, select
+
+import banco
+import estoque
+import lote
+from models import MovimentoEstoque, Produto
+
+
+def estoque_atual(engine, id_produto) -> int:
+    with banco.nova_sessao(engine) as sessao:
+        return sessao.scalar(select(Produto.estoque).where(Produto.id == id_produto))
+
+
+def test_lote_interrompido_nao_confirma_nenhum_comando(engine, cria_produtos):
+    [id_produto] = cria_produtos(1, estoque=10)
+    comandos = [(1, {"acao": "vende", "produto": str(id_produto), "quantidade": 3}),
+                (2, {"acao": "vende", "produto": "inexistente", "quantidade": 1})]
+
+    def falha(numero, comando, mensagem):
+        raise RuntimeError(f"interrompido na linha {numero}")
+
+    with pytest.raises(RuntimeError):
+        lote.executa(engine, comandos, tamanho_transacao=10, falha=falha)
+
+    assert estoque_atual(engine, id_produto) == 10
+    with banco.nova_sessao(engine) as sessao:
+        assert sessao.scalar(select(func.count()).select_from(MovimentoEstoque)
+                             .where(MovimentoEstoque.tipo != estoque.INICIAL)) == 0
+
+
+def test_comando_com_erro_desfaz_so_o_seu_savepoint(engine, cria_produtos):
+    [id_produto] = cria_produtos(1, estoque=10)
+    comandos = [(1, {"acao": "vende", "produto": str(id_produto), "quantidade": 3}),
+                (2, {"acao": "vende", "produto": "inexistente", "quantidade": 1}),
+                (3, {"acao": "compra", "produto": str(id_produto), "quantidade": 5})]
+    falhas = []
+
+    resultado = lote.executa(engine, comandos, tamanho_transacao=10, falha=lambda *args: falhas.append(args[0]))
+
+    assert (resultado["executados"], resultado["falhas"], falhas) == (2, 1, [2])
+    assert estoque_atual(engine, id_produto) == 12
+
+
+def test_um_commit_por_transacao(engine, cria_produtos):
+    [id_produto] = cria_produtos(1, estoque=100)
+    comandos = [(numero, {"acao": "vende", "produto": str(id_produto), "quantidade": 1}) for numero in range(1, 11)]
+    commits = []
+    event.listen(engine, "commit", lambda conexao: commits.append(1))
+
+    lote.executa(engine, comandos, tamanho_transacao=5)
+
+    assert len(commits) == 2
+    assert estoque_atual(engine, id_produto) == 90
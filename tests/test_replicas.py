@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+import banco
+import replicas
+import servico
+from models import Produto
+
+
+@pytest.fixture
+def roteador(engine, tmp_path):
+    # Réplica local num segundo arquivo; a cópia só acontece quando o teste chama atualiza()
+    config = banco.carrega_configuracao()
+    config.update(replica=str(tmp_path / "replica.sqlite3"), replica_defasagem="60", replica_intervalo="3600")
+    roteador = replicas.instala(engine, config)
+    yield roteador
+    roteador.encerra()
+
+
+def test_leitura_sem_escrita_vai_para_a_replica(engine, cria_produtos, roteador):
+    cria_produtos(2)
+    [replica] = roteador.leitores
+    replica.atualiza()
+
+    with banco.nova_sessao(engine) as sessao:
+        assert sessao.get_bind() in replica.engines
+        assert len(sessao.scalars(select(Produto.id)).all()) == 2
+
+
+def test_quem_escreveu_le_o_que_escreveu(engine, cria_produtos, roteador):
+    [id_produto] = cria_produtos(1)
+    [replica] = roteador.leitores
+    replica.atualiza()
+
+    with banco.unidade_de_trabalho(engine) as sessao:
+        servico.altera_preco(sessao, id_produto, Decimal("7.50"))
+
+    # A réplica ainda não tem a escrita: a leitura vai para o principal
+    with banco.nova_sessao(engine) as sessao:
+        assert sessao.get_bind() is engine
+        assert sessao.get(Produto, id_produto).preco == Decimal("7.50")
+
+    # Depois da cópia, a réplica volta a atender, já com a escrita
+    replica.atualiza()
+    with banco.nova_sessao(engine) as sessao:
+        assert sessao.get_bind() in replica.engines
+        assert sessao.get(Produto, id_produto).preco == Decimal("7.50")
@@ -0,0 +1,35 @@
+from decimal import Decimal
+
+from sqlalchemy import select, text
+
+import banco
+import repreco
+import servico
+from models import Produto
+
+
+def test_precos_sem_arredondar_sao_reajustados(engine, cria_produtos):
+    # Um banco antigo com um preço gravado como 10.333000000000002 (REAL no SQLite)
+    ids = cria_produtos(3)
+    with engine.begin() as conexao:
+        conexao.execute(text("UPDATE produtos SET preco = 10.333000000000002"))
+        conexao.execute(text("DELETE FROM versao_dados"))
+    banco.prepara_banco(engine)
+
+    _, alterados, ignorados = repreco.reajusta(engine, Decimal("10"))
+
+    assert (alterados, ignorados) == (3, 0)
+    with banco.nova_sessao(engine) as sessao:
+        assert set(sessao.scalars(select(Produto.preco).where(Produto.id.in_(ids)))) == {Decimal("11.36")}
+
+
+def test_precos_informados_sao_gravados_em_centavos(engine, cria_produtos):
+    [id_produto] = cria_produtos(1)
+    with banco.unidade_de_trabalho(engine) as sessao:
+        id_categoria = sessao.scalar(select(Produto.categoria_id))
+        outros = [servico.adiciona_produto(sessao, id_categoria, "Inteiro", 5),
+                  servico.adiciona_produto(sessao, id_categoria, "Real", 2.675)]
+        servico.altera_preco(sessao, id_produto, Decimal("10.335"))
+    with banco.nova_sessao(engine) as sessao:
+        precos = [servico.obtem_saldo(sessao, id_item).preco for id_item in [id_produto] + outros]
+    assert precos == [Decimal("10.34"), Decimal("5.00"), Decimal("2.68")]
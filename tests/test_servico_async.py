@@ -0,0 +1,55 @@
+import asyncio
+from decimal import Decimal
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import banco
+import estoque
+import servico
+import servico_async
+from models import Categoria, VersaoDados
+
+
+def test_rollback_assincrono_descarta_a_escrita(engine):
+    config = banco.carrega_configuracao()
+    config["url"] = engine.url.render_as_string(hide_password=False)
+
+    async def cria_e_desfaz():
+        engine_async = servico_async.cria_engine_async(config)
+        try:
+            async with AsyncSession(engine_async) as sessao:
+                await sessao.run_sync(servico.adiciona_categoria, "Desfeita")
+                await sessao.rollback()
+        finally:
+            await engine_async.dispose()
+
+    asyncio.run(cria_e_desfaz())
+    with banco.nova_sessao(engine) as sessao:
+        assert sessao.scalars(select(Categoria.nome)).all() == []
+
+
+def test_prepara_banco_assincrono_instala_busca_e_migracoes(tmp_path):
+    config = banco.carrega_configuracao()
+    config["url"] = f"sqlite+pysqlite:///{tmp_path / 'assincrono.sqlite3'}"
+
+    async def prepara():
+        engine_async = servico_async.cria_engine_async(config)
+        try:
+            await servico_async.prepara_banco(engine_async)
+            id_categoria = await servico_async.adiciona_categoria(engine_async, "Eletrônicos")
+            await servico_async.adiciona_produto(engine_async, id_categoria, "Smart TV", Decimal("100"), 3)
+        finally:
+            await engine_async.dispose()
+
+    asyncio.run(prepara())
+    engine = banco.cria_engine(config)
+    try:
+        with banco.nova_sessao(engine) as sessao:
+            # A busca por trecho usa o FTS5 e o saldo inicial tem a sua movimentação
+            linhas, _ = servico.lista_produtos(sessao, "smart")
+            assert [linha.nome for linha in linhas] == ["Smart TV"]
+            assert estoque.audita_estoque(sessao) == []
+            assert sessao.get(VersaoDados, 1).versao == len(banco.MIGRACOES_DADOS)
+    finally:
+        engine.dispose()